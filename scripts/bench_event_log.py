@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Benchmark: costo por evento de connection_attempt, logger de texto vs sink JSONL.
+
+"text" es el camino anterior de StructuredLogger.log_connection_attempt
+(dict, datetime.now().isoformat(), json.dumps y logger.info a un
+FileHandler con Formatter); "jsonl" es JsonlEventSink.emit() con el layout
+precompilado. Al final se relee el archivo JSONL con read_events().
+
+Uso: python scripts/bench_event_log.py --events 100000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
+
+from monitoring.events import JsonlEventSink, read_events  # noqa: E402
+from monitoring.logger import CONNECTION_ATTEMPT  # noqa: E402
+
+
+def run(label, events, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    per_event = elapsed / events * 1e6
+    print(f"{label:>8} {events / elapsed:>12.0f} {per_event:>10.2f}")
+    return per_event
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+    n = args.events
+    workdir = Path(tempfile.mkdtemp(prefix="bench_events_"))
+
+    logger = logging.getLogger("bench.text")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.FileHandler(workdir / "text.log", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+    user = os.getenv("USER", "unknown")
+
+    def text_loop():
+        for i in range(n):
+            log_entry = {
+                "timestamp": datetime.now().isoformat(),
+                "event": "connection_attempt",
+                "target_ip": "10.0.0.1",
+                "result": "success" if i % 2 else "failed",
+                "duration_ms": round(i * 0.001234, 2),
+                "user": user,
+            }
+            logger.info(json.dumps(log_entry, ensure_ascii=False))
+
+    sink = JsonlEventSink(workdir / "events.jsonl")
+
+    def jsonl_loop():
+        for i in range(n):
+            sink.emit(
+                CONNECTION_ATTEMPT,
+                "10.0.0.1",
+                "success" if i % 2 else "failed",
+                round(i * 0.001234, 2),
+                user,
+            )
+        sink.flush()
+
+    print(f"eventos: {n}")
+    print(f"{'modo':>8} {'eventos/s':>12} {'µs/evento':>10}")
+    text = run("text", n, text_loop)
+    jsonl = run("jsonl", n, jsonl_loop)
+    sink.close()
+    handler.close()
+
+    start = time.perf_counter()
+    count = sum(1 for _ in read_events(workdir / "events.jsonl", events=["connection_attempt"]))
+    elapsed = time.perf_counter() - start
+    print(f"\njsonl: {text / jsonl:.1f}x más rápido por evento")
+    print(f"read_events: {count} eventos en {elapsed:.2f}s ({count / elapsed:.0f}/s)")
+    for path in workdir.iterdir():
+        path.unlink()
+    workdir.rmdir()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Benchmark: motores "threads", "selector", "asyncio" y "capture" del servidor dummy de knocks.
+
+Arranca el servidor en proceso sobre N puertos libres de loopback, dispara
+knocks TCP desde varios procesos cliente (para no competir por el GIL del
+servidor) y mide knocks procesados/s y CPU del servidor por knock.
+
+El motor "capture" (AF_PACKET, sin accept) sólo se mide si se ejecuta como root.
+
+En hosts con pocos cores los clientes compiten por CPU con el servidor;
+en ese caso la columna "cpu us/knock" es la comparación más fiable.
+
+Uso: python scripts/bench_knock_server.py --ports 20 200 --duration 3
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import asyncio  # noqa: E402
+
+from knockd.server import KnockServer  # noqa: E402
+from knockd.async_server import AsyncKnockServer  # noqa: E402
+
+ENGINES = ("threads", "selector", "asyncio")
+if hasattr(os, "geteuid") and os.geteuid() == 0:
+    ENGINES += ("capture",)
+
+
+def free_ports(count):
+    """Reserva `count` puertos libres de loopback"""
+    socks, ports = [], []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        socks.append(s)
+        ports.append(s.getsockname()[1])
+    for s in socks:
+        s.close()
+    return ports
+
+
+def client_worker(ports, stop, offset):
+    idx = offset
+    while not stop.is_set():
+        port = ports[idx % len(ports)]
+        idx += 1
+        s = socket.socket()
+        # RST al cerrar: evita acumular TIME_WAIT en el cliente y los SYN perdidos
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        s.settimeout(1)
+        try:
+            s.connect(("127.0.0.1", port))
+        except OSError:
+            pass
+        finally:
+            s.close()
+
+
+def run(engine, n_ports, duration, clients, null_handler=False):
+    ports = free_ports(n_ports)
+    (target,) = free_ports(1)
+    # La secuencia no importa: sólo medimos throughput del motor
+    if engine == "asyncio":
+        server = AsyncKnockServer(ports, target, override_interval=1.0)
+    else:
+        server = KnockServer(ports, target, override_interval=1.0, engine=engine)
+    server.open_vpn_port = lambda *a: None
+
+    handled = [0]
+    original = server.handle_knock
+
+    def counting_handle(ip, port, protocol="tcp"):
+        handled[0] += 1
+        if not null_handler:
+            original(ip, port, protocol)
+
+    server.handle_knock = counting_handle
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        baseline_threads = threading.active_count()
+        if engine == "asyncio":
+            aio_thread = threading.Thread(target=asyncio.run, args=(server.serve(),), daemon=True)
+            aio_thread.start()
+        else:
+            server.start(block=False)
+        time.sleep(0.3)
+        server_threads = threading.active_count() - baseline_threads
+
+        stop = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=client_worker, args=(ports, stop, i), daemon=True)
+            for i in range(clients)
+        ]
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        for w in workers:
+            w.start()
+        time.sleep(duration)
+        stop.set()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        server.stop()
+        if engine == "asyncio":
+            aio_thread.join()
+        time.sleep(0.2)
+
+    cpu_per_knock_us = cpu / handled[0] * 1e6 if handled[0] else 0.0
+    return handled[0] / elapsed, cpu_per_knock_us, server_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ports", nargs="+", type=int, default=[20, 200])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument(
+        "--null-handler",
+        action="store_true",
+        help="No procesar la secuencia: mide sólo el costo de recibir cada knock",
+    )
+    args = parser.parse_args()
+
+    print(f"{'engine':<10}{'ports':>8}{'knocks/s':>12}{'cpu us/knock':>14}{'threads':>10}")
+    for n_ports in args.ports:
+        for engine in ENGINES:
+            rate, cpu_us, threads = run(
+                engine, n_ports, args.duration, args.clients, args.null_handler
+            )
+            print(f"{engine:<10}{n_ports:>8}{rate:>12.0f}{cpu_us:>14.1f}{threads:>10}")
+
+
+if __name__ == "__main__":
+    main()
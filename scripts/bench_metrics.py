@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Benchmark: costo de MetricsCollector.record_attempt() para quien llama.
+
+"rewrite" es el camino anterior (reescribir metrics.json completo con
+indent=2 en cada intento); "journal" es el registro append-only con
+escritura por lotes en segundo plano. Al final se cierra el recolector
+(último lote + compactación) y se verifica el total en disco.
+
+Uso: python scripts/bench_metrics.py --attempts 20000
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
+
+from monitoring.metrics import MetricsCollector  # noqa: E402
+
+
+def run(label, attempts, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    per_attempt = elapsed / attempts * 1e6
+    print(f"{label:>8} {attempts / elapsed:>12.0f} {per_attempt:>12.2f}")
+    return per_attempt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.attempts
+    workdir = Path(tempfile.mkdtemp(prefix="bench_metrics_"))
+
+    legacy_file = workdir / "legacy.json"
+    legacy = {
+        "total_attempts": 0,
+        "successful_connections": 0,
+        "failed_attempts": 0,
+        "total_duration": 0.0,
+        "average_duration": 0.0,
+        "firewall_latency": MetricsCollector._empty_firewall_latency(),
+        "last_updated": None,
+    }
+
+    def rewrite_loop():
+        for i in range(n):
+            legacy["total_attempts"] += 1
+            if i % 4:
+                legacy["successful_connections"] += 1
+                legacy["total_duration"] += 1.25
+                legacy["average_duration"] = (
+                    legacy["total_duration"] / legacy["successful_connections"]
+                )
+            else:
+                legacy["failed_attempts"] += 1
+            legacy["last_updated"] = datetime.now().isoformat()
+            with open(legacy_file, "w") as f:
+                json.dump(legacy, f, indent=2, ensure_ascii=False)
+
+    collector = MetricsCollector(str(workdir / "metrics.json"))
+
+    def journal_loop():
+        for i in range(n):
+            collector.record_attempt(bool(i % 4), 1.25)
+
+    print(f"intentos: {n}")
+    print(f"{'modo':>8} {'intentos/s':>12} {'µs/intento':>12}")
+    rewrite = run("rewrite", n, rewrite_loop)
+    journal = run("journal", n, journal_loop)
+
+    start = time.perf_counter()
+    collector.close()
+    elapsed = time.perf_counter() - start
+    reloaded = MetricsCollector(str(workdir / "metrics.json"))
+    total = reloaded.metrics["total_attempts"]
+    reloaded.close()
+    print(f"\njournal: {rewrite / journal:.0f}x más barato para quien llama")
+    print(f"close() (último lote + compactación): {elapsed * 1000:.1f} ms")
+    print(f"total en disco: {total}")
+    for path in workdir.iterdir():
+        path.unlink()
+    workdir.rmdir()
+
+
+if __name__ == "__main__":
+    main()
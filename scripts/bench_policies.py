@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Benchmark: latencia por knock del trie compartido según la cantidad de políticas.
+
+Genera N políticas aleatorias (3-5 knocks TCP/UDP), compila el autómata y
+reproduce una mezcla de secuencias válidas y knocks de ruido desde muchas IPs,
+con el mismo camino que usa KnockServer.handle_knock (step + depth + matches).
+
+Uso: python scripts/bench_policies.py --policies 1 10 100 1000 10000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from knockd.automaton import KnockAutomaton  # noqa: E402
+from knockd.policies import KnockPolicy  # noqa: E402
+
+
+def random_knock(rng):
+    return rng.randint(1024, 65535), rng.choice(("tcp", "udp"))
+
+
+def build_policies(count, rng):
+    return [
+        KnockPolicy(f"p{i}", [random_knock(rng) for _ in range(rng.randint(3, 5))], 1194)
+        for i in range(count)
+    ]
+
+
+def build_traffic(policies, total, sources, rng):
+    """Secuencias válidas intercaladas con ruido, repartidas entre `sources` IPs"""
+    traffic = []
+    while len(traffic) < total:
+        ip = f"10.0.{rng.randrange(sources) >> 8}.{rng.randrange(256)}"
+        if rng.random() < 0.5:
+            knocks = rng.choice(policies).sequence
+        else:
+            knocks = [random_knock(rng) for _ in range(4)]
+        traffic.extend((ip, knock) for knock in knocks)
+    return traffic[:total]
+
+
+def replay(automaton, traffic):
+    state = {}
+    completed = 0
+    start = time.perf_counter()
+    for ip, knock in traffic:
+        current = automaton.step(state.get(ip, 0), knock)
+        automaton.depth(current)
+        if automaton.matches(current):
+            completed += 1
+            if automaton.is_leaf(current):
+                current = 0
+        state[ip] = current
+    elapsed = time.perf_counter() - start
+    return elapsed / len(traffic) * 1e9, completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", nargs="+", type=int, default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--knocks", type=int, default=200_000)
+    parser.add_argument("--sources", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'policies':>9}{'states':>9}{'compile ms':>12}{'ns/knock':>10}{'matches':>9}")
+    for count in args.policies:
+        rng = random.Random(args.seed)
+        policies = build_policies(count, rng)
+        traffic = build_traffic(policies, args.knocks, args.sources, rng)
+
+        start = time.perf_counter()
+        automaton = KnockAutomaton.from_sequences(p.sequence for p in policies)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        ns, completed = replay(automaton, traffic)
+        print(f"{count:>9}{automaton.state_count:>9}{compile_ms:>12.1f}{ns:>10.0f}{completed:>9}")
+
+
+if __name__ == "__main__":
+    main()
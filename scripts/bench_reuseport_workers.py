@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Benchmark: escalado del modo `--workers N` (SO_REUSEPORT) en loopback.
+
+Lanza el servidor con 1..N workers sobre puertos libres y dispara knocks TCP
+desde procesos cliente que usan IPs de origen 127.0.0.X distintas. Cada
+worker cuenta sus knocks en memoria compartida; se reporta knocks/s, el
+reparto entre workers y cuántas IPs de origen vio más de un worker (debe
+ser 0 con el reparto por IP activo).
+
+En hosts con un solo core no hay escalado posible: la columna "knocks/s"
+queda plana y sólo aportan el reparto y la verificación de consistencia.
+
+Uso: python scripts/bench_reuseport_workers.py --workers 1 2 4 --duration 3
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from knockd.server import KnockServer  # noqa: E402
+from knockd.workers import ReusePortWorkers  # noqa: E402
+
+MAX_WORKERS = 16
+SOURCES = 32
+
+
+def free_ports(count):
+    """Reserva `count` puertos libres de loopback"""
+    socks, ports = [], []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        socks.append(s)
+        ports.append(s.getsockname()[1])
+    for s in socks:
+        s.close()
+    return ports
+
+
+def client_worker(ports, stop, sources):
+    idx = 0
+    while not stop.is_set():
+        source = sources[idx % len(sources)]
+        port = ports[idx % len(ports)]
+        idx += 1
+        s = socket.socket()
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        s.settimeout(1)
+        try:
+            s.bind((source, 0))
+            s.connect(("127.0.0.1", port))
+        except OSError:
+            pass
+        finally:
+            s.close()
+
+
+def serve_workers(ports, target, workers, counts, seen):
+    """Proceso del servidor: padre ReusePortWorkers + N workers contando knocks"""
+
+    def make_server(sockets):
+        server = KnockServer(ports, target, override_interval=5, engine="selector", sockets=sockets)
+        if sockets is None:
+            return server
+        index = next(i for i, own in enumerate(cluster.sockets) if own is sockets)
+
+        def counting_handle(ip, port, protocol="tcp"):
+            counts[index] += 1
+            # Marca por IP (último octeto) qué workers la atendieron
+            seen[int(ip.rsplit(".", 1)[1]) % SOURCES] |= 1 << index
+
+        server.handle_knock = counting_handle
+        return server
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cluster = ReusePortWorkers(make_server, workers)
+        cluster.serve_forever()
+
+
+def run(workers, ports_count, clients, duration):
+    ports = free_ports(ports_count)
+    (target,) = free_ports(1)
+    counts = multiprocessing.Array("q", MAX_WORKERS, lock=False)
+    seen = multiprocessing.Array("q", SOURCES, lock=False)
+
+    server = multiprocessing.Process(
+        target=serve_workers, args=(ports, target, workers, counts, seen), daemon=True
+    )
+    server.start()
+    time.sleep(0.5 + 0.1 * workers)
+
+    stop = multiprocessing.Event()
+    sources = [f"127.0.0.{i}" for i in range(2, 2 + SOURCES)]
+    procs = [
+        multiprocessing.Process(
+            target=client_worker, args=(ports, stop, sources[i::clients]), daemon=True
+        )
+        for i in range(clients)
+    ]
+    for p in procs:
+        p.start()
+    time.sleep(0.3)
+    before = sum(counts)
+    start = time.perf_counter()
+    time.sleep(duration)
+    handled = sum(counts) - before
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for p in procs:
+        p.join()
+
+    os.kill(server.pid, 15)
+    server.join(5)
+
+    split = [counts[i] for i in range(workers)]
+    split_ips = sum(1 for mask in seen if bin(mask).count("1") > 1)
+    return handled / elapsed, split, split_ips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--ports", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}  puertos: {args.ports}  clientes: {args.clients}")
+    print(f"{'workers':>8} {'knocks/s':>10}  {'IPs en >1 worker':>16}  reparto")
+    for workers in args.workers:
+        rate, split, split_ips = run(workers, args.ports, args.clients, args.duration)
+        print(f"{workers:>8} {rate:>10.0f}  {split_ips:>16}  {split}")
+
+
+if __name__ == "__main__":
+    main()
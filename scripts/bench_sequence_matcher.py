@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Benchmark: matcher por listas vs autómata KMP (tiempo por knock y memoria por IP).
+
+El modo "list" reproduce el algoritmo anterior de KnockServer: append del knock
+a una lista por IP y comparación contra la secuencia en cada knock. Su costo
+por knock es bajo (list == corta por longitud) pero guarda hasta N knocks por
+IP; el autómata guarda un único entero.
+
+Uso: python scripts/bench_sequence_matcher.py --lengths 2 16 128 1024
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from knockd.automaton import KnockAutomaton  # noqa: E402
+
+
+class ListMatcher:
+    def __init__(self, sequence):
+        self.sequence = list(sequence)
+        self.attempts = {}
+
+    def knock(self, ip, knock):
+        attempts = self.attempts.setdefault(ip, [])
+        attempts.append(knock)
+        if attempts == self.sequence or len(attempts) >= len(self.sequence):
+            self.attempts[ip] = []
+
+
+class AutomatonMatcher:
+    def __init__(self, sequence):
+        self.automaton = KnockAutomaton(sequence)
+        self.state = {}
+
+    def knock(self, ip, knock):
+        state = self.automaton.step(self.state.get(ip, 0), knock)
+        if self.automaton.is_complete(state):
+            state = 0
+        self.state[ip] = state
+
+
+def time_per_knock(matcher_cls, sequence, total):
+    matcher = matcher_cls(sequence)
+    knocks = (sequence * (total // len(sequence) + 1))[:total]
+    start = time.perf_counter()
+    for knock in knocks:
+        matcher.knock("10.0.0.1", knock)
+    return (time.perf_counter() - start) / total * 1e9
+
+
+def bytes_per_source(matcher_cls, sequence, sources):
+    """Memoria retenida con `sources` IPs a mitad de secuencia"""
+    half = sequence[: max(1, len(sequence) // 2)]
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(sources)]
+    tracemalloc.start()
+    matcher = matcher_cls(sequence)
+    base = tracemalloc.get_traced_memory()[0]
+    for ip in ips:
+        for knock in half:
+            matcher.knock(ip, knock)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return used / sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", nargs="+", type=int, default=[2, 16, 128, 1024])
+    parser.add_argument("--knocks", type=int, default=200_000)
+    parser.add_argument("--sources", type=int, default=5_000)
+    args = parser.parse_args()
+
+    print(f"{'length':>8}{'list ns':>10}{'kmp ns':>10}{'list B/ip':>12}{'kmp B/ip':>12}")
+    for length in args.lengths:
+        sequence = [(7000 + i, "tcp") for i in range(length)]
+        row = [
+            time_per_knock(ListMatcher, sequence, args.knocks),
+            time_per_knock(AutomatonMatcher, sequence, args.knocks),
+            bytes_per_source(ListMatcher, sequence, args.sources),
+            bytes_per_source(AutomatonMatcher, sequence, args.sources),
+        ]
+        print(f"{length:>8}{row[0]:>10.0f}{row[1]:>10.0f}{row[2]:>12.0f}{row[3]:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Benchmark: knocks UDP por segundo, socket por knock vs UDPSocketPool.
+
+"per-knock" es el camino anterior de PortKnocker._knock_port (socket(),
+sendto(), close() por knock); "pool" reutiliza un socket por familia y
+"burst" envía la secuencia completa con send_burst(). Los datagramas van
+a un socket UDP local que nunca se lee (el kernel descarta al llenarse).
+
+Uso: python scripts/bench_udp_pool.py --knocks 50000 --payload 16
+"""
+import argparse
+import socket
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# core/config_manager.py importa "src.utils": hacen falta la raíz y src/
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
+
+from core.port_knocker import PortKnocker  # noqa: E402
+from network.udp_pool import UDPSocketPool  # noqa: E402
+
+
+def run(label, knocks, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    rate = knocks / elapsed
+    print(f"{label:>10} {rate:>12.0f} {elapsed / knocks * 1e6:>10.2f}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--knocks", type=int, default=50000)
+    parser.add_argument("--payload", type=int, default=0, help="bytes de payload por knock")
+    args = parser.parse_args()
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    port = sink.getsockname()[1]
+    payload = b"x" * args.payload
+    n = args.knocks
+
+    per_knock = PortKnocker(verbose=False)
+    pool = UDPSocketPool()
+    pooled = PortKnocker(verbose=False, udp_pool=pool)
+
+    print(f"knocks: {n}  payload: {args.payload} bytes")
+    print(f"{'modo':>10} {'knocks/s':>12} {'µs/knock':>10}")
+
+    def knock_loop(knocker):
+        for _ in range(n):
+            knocker._knock_port("127.0.0.1", port, "udp", payload)
+
+    base = run("per-knock", n, lambda: knock_loop(per_knock))
+    rate = run("pool", n, lambda: knock_loop(pooled))
+    burst = run("burst", n, lambda: pool.send_burst(("127.0.0.1", port, payload) for _ in range(n)))
+    print(f"\npool: {rate / base:.1f}x  burst: {burst / base:.1f}x sobre per-knock")
+
+    pool.close()
+    sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Load test: inundación de knocks con IPs de origen falsificadas.
+
+Cada IP aleatoria envía el primer knock de la secuencia (el peor caso: todas
+quedan con progreso). Se mide la memoria retenida por KnockServer cada
+`--step` knocks; con la tabla acotada debe mantenerse plana.
+
+Uso: python scripts/loadtest_source_flood.py --knocks 500000 --capacity 10000
+"""
+import argparse
+import contextlib
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from knockd.server import KnockServer  # noqa: E402
+
+
+class _NullWriter:
+    def write(self, _):
+        return 0
+
+    def flush(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--knocks", type=int, default=500_000)
+    parser.add_argument("--capacity", type=int, default=10_000)
+    parser.add_argument("--step", type=int, default=50_000)
+    args = parser.parse_args()
+
+    server = KnockServer([7000, 8000, 9000], 1194, override_interval=5)
+    server.sources.capacity = args.capacity
+    rng = random.Random(1)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    print(f"{'knocks':>10}{'retained KiB':>14}{'size':>8}{'evictions':>11}{'expirations':>13}")
+    with contextlib.redirect_stdout(_NullWriter()):
+        for i in range(1, args.knocks + 1):
+            ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+            server.handle_knock(ip, 7000, "tcp")
+            if i % args.step == 0:
+                retained = (tracemalloc.get_traced_memory()[0] - base) / 1024
+                stats = server.sources.stats()
+                sys.__stdout__.write(
+                    f"{i:>10}{retained:>14.0f}{stats['size']:>8}"
+                    f"{stats['evictions']:>11}{stats['expirations']:>13}\n"
+                )
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
 """Módulo central del sistema"""
 
 from .port_knocker import PortKnocker
+from .async_knocker import AsyncPortKnocker
+from .knock_scheduler import KnockScheduler
+from .knock_plan import KnockPlan
+from .connection_pipeline import ConnectionPipeline
 from .vpn_manager import VPNManager, get_vpn_manager
 from .config_manager import ConfigManager
 
-__all__ = ["PortKnocker", "VPNManager", "get_vpn_manager", "ConfigManager"]
+__all__ = [
+    "PortKnocker",
+    "AsyncPortKnocker",
+    "KnockScheduler",
+    "KnockPlan",
+    "ConnectionPipeline",
+    "VPNManager",
+    "get_vpn_manager",
+    "ConfigManager",
+]
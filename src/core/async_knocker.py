@@ -0,0 +1,236 @@
+"""
+Cliente de port knocking asíncrono para muchos hosts a la vez
+
+`AsyncPortKnocker.knock_many()` ejecuta la secuencia contra cientos de
+gateways en paralelo sobre un único event loop: la espera del firewall y la
+verificación de todos los hosts se solapan, así que el total se acerca al
+costo de un solo host.
+
+Dentro de cada host los knocks se disparan en instantes absolutos
+(inicio + i * intervalo) del reloj monotónico del loop; el connect de un
+knock corre en segundo plano y nunca retrasa al siguiente.
+"""
+
+import asyncio
+import socket
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from utils.constants import DEFAULT_KNOCK_TIMEOUT, DEFAULT_FIREWALL_PROCESS_TIME
+from monitoring.logger import StructuredLogger
+from network.udp_pool import UDPSocketPool
+from network.resolver import Resolver, address_family, get_resolver, happy_eyeballs
+
+# Hosts procesados a la vez (limita sockets abiertos simultáneos)
+DEFAULT_CONCURRENCY = 256
+
+Target = Union[str, Dict[str, Any]]
+
+
+class AsyncPortKnocker:
+    """Cliente de Port Knocking sobre asyncio"""
+
+    def __init__(
+        self,
+        verbose: bool = False,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        firewall_wait: float = DEFAULT_FIREWALL_PROCESS_TIME,
+        verify_attempts: int = 3,
+        udp_pool: Optional[UDPSocketPool] = None,
+        resolver: Optional[Resolver] = None,
+    ):
+        self.verbose = verbose
+        self.concurrency = concurrency
+        self.firewall_wait = firewall_wait
+        self.verify_attempts = verify_attempts
+        # Un socket UDP por familia para todos los hosts, en vez de uno por knock
+        self._owns_pool = udp_pool is None
+        self.udp_pool = UDPSocketPool() if udp_pool is None else udp_pool
+        # Caché DNS compartida: hosts repetidos no vuelven a resolver
+        self.resolver = resolver if resolver is not None else get_resolver()
+        self.logger = StructuredLogger()
+
+    async def knock_many(
+        self,
+        targets: Iterable[Target],
+        knock_sequence: Optional[List[Tuple[int, str]]] = None,
+        interval: Optional[float] = None,
+        target_port: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Ejecuta la secuencia contra varios hosts en paralelo
+
+        Args:
+            targets: IPs, o dicts con 'target_ip' y opcionalmente
+                'knock_sequence', 'interval' y 'target_port' propios
+            knock_sequence: Secuencia por defecto (puerto, protocolo[, payload])
+            interval: Intervalo por defecto entre knocks en segundos
+            target_port: Puerto final por defecto a verificar
+
+        Returns:
+            Un resultado por host, en el mismo orden que `targets`
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(target: Target) -> Dict[str, Any]:
+            if isinstance(target, str):
+                target = {"target_ip": target}
+            async with semaphore:
+                return await self.execute_sequence(
+                    target["target_ip"],
+                    target.get("knock_sequence", knock_sequence),
+                    target.get("interval", interval),
+                    target.get("target_port", target_port),
+                )
+
+        return list(await asyncio.gather(*(run(t) for t in targets)))
+
+    async def execute_sequence(
+        self,
+        target_ip: str,
+        knock_sequence: List[Tuple[int, str]],
+        interval: float,
+        target_port: int,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta la secuencia contra un host
+
+        Returns:
+            dict con target_ip, target_port, address (IP usada), success, already_open, knocks
+            (planificado vs real por knock), verification, elapsed y error
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result: Dict[str, Any] = {
+            "target_ip": target_ip,
+            "target_port": target_port,
+            "address": None,
+            "success": False,
+            "already_open": False,
+            "knocks": [],
+            "verification": None,
+            "elapsed": 0.0,
+            "error": None,
+        }
+
+        try:
+            if knock_sequence is None or interval is None or target_port is None:
+                raise ValueError("Faltan knock_sequence, interval o target_port")
+
+            ip = await self._select_address(target_ip, target_port)
+            result["address"] = ip
+            result["already_open"] = await self._tcp_ping(ip, target_port)
+
+            # Knocks en instantes absolutos; cada connect sigue en segundo plano
+            origin = loop.time()
+            pending = []
+            for idx, knock in enumerate(knock_sequence):
+                planned = idx * interval
+                delay = origin + planned - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                fired = loop.time() - origin
+                pending.append(loop.create_task(self._knock_port(ip, *knock)))
+                result["knocks"].append(
+                    {"port": knock[0], "protocol": knock[1], "planned": planned, "fired": fired}
+                )
+            for knock, ok in zip(result["knocks"], await asyncio.gather(*pending)):
+                knock["ok"] = ok
+
+            self._log(
+                f"[{target_ip}] Secuencia enviada; esperando {self.firewall_wait}s al firewall"
+            )
+            await asyncio.sleep(self.firewall_wait)
+
+            verification = await self._verify_port_open(ip, target_port)
+            result["verification"] = verification
+            result["success"] = verification["open"]
+        except Exception as e:
+            result["error"] = str(e)
+            self.logger.log_error(f"Error en port knocking a {target_ip}: {e}")
+
+        result["elapsed"] = loop.time() - started
+        self.logger.log_connection_attempt(target_ip, result["success"], result["elapsed"])
+        self._log(f"[{target_ip}] {'[+] ABIERTO' if result['success'] else '[-] CERRADO'}")
+        return result
+
+    async def _select_address(self, host: str, port: int) -> str:
+        """IP para la secuencia: caché del resolver, o resolución en un thread
+
+        En hosts dual-stack elige el camino con happy eyeballs (también en un thread).
+        """
+        loop = asyncio.get_running_loop()
+        addresses = self.resolver.peek(host)
+        if addresses is None:
+            addresses = await loop.run_in_executor(None, self.resolver.resolve, host)
+        if len({family for family, _ in addresses}) == 1:
+            return addresses[0][1]
+        winner = await loop.run_in_executor(None, happy_eyeballs, addresses, port)
+        return winner["ip"] if winner else addresses[0][1]
+
+    async def _knock_port(self, ip: str, port: int, protocol: str, payload: bytes = b"") -> bool:
+        """Ejecuta knock en un puerto específico (payload sólo aplica a UDP)"""
+        loop = asyncio.get_running_loop()
+        try:
+            if protocol == "tcp":
+                sock = socket.socket(address_family(ip), socket.SOCK_STREAM)
+                sock.setblocking(False)
+                try:
+                    # El SYN sale al iniciar el connect; el resultado no importa
+                    await asyncio.wait_for(
+                        loop.sock_connect(sock, (ip, port)), DEFAULT_KNOCK_TIMEOUT
+                    )
+                except (OSError, asyncio.TimeoutError):
+                    pass
+                finally:
+                    sock.close()
+                return True
+            elif protocol == "udp":
+                self.udp_pool.send(ip, port, payload)
+                return True
+            return False
+        except Exception as e:
+            self._log(f"    [{ip}] Error en knock {port}/{protocol}: {e}")
+            return False
+
+    async def _tcp_ping(self, ip: str, port: int, timeout: float = 1) -> bool:
+        """Verifica si puerto TCP está abierto"""
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    async def _verify_port_open(self, ip: str, port: int) -> Dict[str, Any]:
+        """Verifica apertura del puerto con múltiples intentos"""
+        successful_attempts = 0
+        latencies = []
+
+        for _ in range(self.verify_attempts):
+            start_time = time.monotonic()
+            is_open = await self._tcp_ping(ip, port, timeout=2)
+            latency = (time.monotonic() - start_time) * 1000
+
+            if is_open:
+                successful_attempts += 1
+                latencies.append(latency)
+
+            await asyncio.sleep(0.5)
+
+        return {
+            "open": successful_attempts > 0,
+            "success_count": successful_attempts,
+            "total_attempts": self.verify_attempts,
+            "avg_latency": sum(latencies) / len(latencies) if latencies else 0,
+        }
+
+    def close(self):
+        """Libera el pool UDP propio (uno recibido por parámetro lo cierra su dueño)"""
+        if self._owns_pool:
+            self.udp_pool.close()
+
+    def _log(self, message: str):
+        """Log condicional según verbosity"""
+        if self.verbose:
+            print(message)
@@ -0,0 +1,295 @@
+"""
+Caché de configuración del proceso, con recarga en caliente
+
+`ConfigCache` guarda un snapshot validado por archivo, identificado por
+(inodo, tamaño, mtime en ns). `load()` hace un solo stat: si el archivo no
+cambió devuelve el mismo snapshot, sin leer ni validar de nuevo. Si cambió,
+lee, valida y reemplaza la entrada del diccionario de una vez; los lectores
+ven el snapshot anterior o el nuevo completo, nunca uno a medio cargar, y no
+toman ningún lock. Un archivo inválido no se cachea: se reporta el error y
+sigue vigente el último snapshot válido.
+
+`watch()` aplica las ediciones sin reiniciar: en Linux con inotify sobre el
+directorio (cubre también el reemplazo atómico por rename), en el resto con
+un sondeo periódico de stat.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.validators import ConfigValidator
+from src.utils.exceptions import ConfigurationError
+from src.core.knock_plan import KnockPlan
+
+DEFAULT_POLL_INTERVAL = 0.1
+
+# Eventos de inotify(7) que indican un archivo nuevo o reescrito
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+# struct inotify_event: wd, mask, cookie, len (el nombre va a continuación)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def file_stamp(path) -> Optional[tuple]:
+    """Identidad de un archivo: (inodo, tamaño, mtime en ns), o None si no existe"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def validate_config(config: Dict[str, Any]):
+    """Validación estándar de config.json
+
+    Raises:
+        ConfigurationError: con la lista de errores del validador
+    """
+    validator = ConfigValidator()
+    if not validator.validate(config):
+        errors = "\n".join(validator.errors)
+        raise ConfigurationError(f"Configuración inválida:\n{errors}")
+
+
+class ConfigSnapshot:
+    """Configuración validada de un archivo en un momento dado (no se modifica)"""
+
+    __slots__ = ("path", "stamp", "config", "_plan")
+
+    def __init__(self, path: str, stamp: Optional[tuple], config: Dict[str, Any]):
+        self.path = path
+        self.stamp = stamp
+        self.config = config
+        self._plan = None
+
+    @property
+    def plan(self) -> KnockPlan:
+        """Plan de knocks compilado la primera vez que se pide"""
+        if self._plan is None:
+            self._plan = KnockPlan.compile(self.config)
+        return self._plan
+
+    def __repr__(self) -> str:
+        return f"ConfigSnapshot({self.path}, stamp={self.stamp})"
+
+
+class ConfigCache:
+    """Snapshots de configuración por ruta, compartidos por todo el proceso"""
+
+    def __init__(
+        self,
+        validator: Callable[[Dict[str, Any]], None] = validate_config,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_inotify: bool = True,
+    ):
+        """
+        Args:
+            validator: Función que valida un dict de configuración (levanta ConfigurationError)
+            poll_interval: Período del sondeo cuando no hay inotify (segundos)
+            use_inotify: Usar inotify si la plataforma lo ofrece (False fuerza el sondeo)
+        """
+        self.validator = validator
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        # ruta resuelta -> snapshot vigente (se reemplaza entero, nunca se modifica)
+        self._snapshots: Dict[str, ConfigSnapshot] = {}
+        self._load_lock = threading.Lock()
+        self._callbacks: Dict[str, list] = {}
+        # ruta -> stamp de la última versión inválida (se reporta una sola vez)
+        self._failed: Dict[str, Optional[tuple]] = {}
+        self._watch_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._inotify = None
+        self.logger = logging.getLogger("VPNConnect")
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.abspath(os.fspath(path))
+
+    def load(self, path, force: bool = False) -> ConfigSnapshot:
+        """Snapshot vigente de `path`; relee y valida sólo si el archivo cambió
+
+        force=True relee aunque el stamp coincida: el mtime tiene la
+        granularidad del reloj del kernel y dos escrituras del mismo tamaño muy
+        seguidas pueden dejar el mismo stamp.
+
+        Raises:
+            ConfigurationError: si el archivo no se puede leer o no es válido
+        """
+        key = self._key(path)
+        current = self._snapshots.get(key)
+        if not force and current is not None and file_stamp(key) == current.stamp:
+            return current
+        with self._load_lock:
+            # Otro thread pudo recargarlo mientras esperábamos el lock
+            current = self._snapshots.get(key)
+            stamp = file_stamp(key)
+            if not force and current is not None and stamp == current.stamp:
+                return current
+            # stat antes de leer: si el archivo cambia durante la lectura, el
+            # stamp queda viejo y la próxima consulta vuelve a cargarlo
+            snapshot = ConfigSnapshot(key, stamp, self._read(key))
+            self._snapshots[key] = snapshot
+        return snapshot
+
+    def snapshot(self, path) -> Optional[ConfigSnapshot]:
+        """Último snapshot cargado de `path`, sin stat ni lock (None si nunca se cargó)"""
+        return self._snapshots.get(self._key(path))
+
+    def invalidate(self, path=None):
+        """Olvida el snapshot de `path`, o todos"""
+        with self._load_lock:
+            if path is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(self._key(path), None)
+
+    def _read(self, path: str) -> Dict[str, Any]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ConfigurationError(f"Archivo de configuración corrupto: {e}")
+        except Exception as e:
+            raise ConfigurationError(f"Error al leer configuración: {e}")
+        self.validator(config)
+        return config
+
+    def watch(self, path, callback: Optional[Callable[[ConfigSnapshot], None]] = None):
+        """Recarga `path` en cuanto cambie; `callback` recibe cada snapshot nuevo
+
+        Carga el archivo si todavía no estaba en caché (y propaga su error).
+        """
+        self.load(path)
+        key = self._key(path)
+        with self._watch_lock:
+            callbacks = self._callbacks.setdefault(key, [])
+            if callback is not None:
+                callbacks.append(callback)
+            if self._inotify is not None:
+                self._add_inotify_watch(os.path.dirname(key))
+            if self._watcher is None:
+                self._stop.clear()
+                self._inotify = self._open_inotify()
+                if self._inotify is not None:
+                    for watched in self._callbacks:
+                        self._add_inotify_watch(os.path.dirname(watched))
+                self._watcher = threading.Thread(
+                    target=self._watch_loop, name="config-watcher", daemon=True
+                )
+                self._watcher.start()
+
+    def unwatch(self, path, callback: Optional[Callable[[ConfigSnapshot], None]] = None):
+        """Quita `callback` de `path`, o deja de vigilarlo si no se indica (el snapshot queda)"""
+        key = self._key(path)
+        with self._watch_lock:
+            if callback is None:
+                self._callbacks.pop(key, None)
+            elif callback in self._callbacks.get(key, ()):
+                self._callbacks[key].remove(callback)
+
+    def stop(self):
+        """Detiene la vigilancia de todos los archivos"""
+        with self._watch_lock:
+            watcher, self._watcher = self._watcher, None
+            self._stop.set()
+        if watcher is not None:
+            watcher.join(timeout=2)
+        if self._inotify is not None:
+            os.close(self._inotify[0])
+            self._inotify = None
+        self._callbacks.clear()
+
+    @property
+    def watching(self) -> str:
+        """Mecanismo de vigilancia activo: "inotify", "polling" o "" si no hay"""
+        if self._watcher is None:
+            return ""
+        return "inotify" if self._inotify is not None else "polling"
+
+    def _open_inotify(self):
+        """(fd, libc) de inotify, o None si la plataforma no lo ofrece"""
+        if not self.use_inotify or not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        return fd, libc
+
+    def _add_inotify_watch(self, directory: str):
+        fd, libc = self._inotify
+        libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK)
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            inotify = self._inotify
+            if inotify is None:
+                self._stop.wait(self.poll_interval)
+                self._refresh(list(self._callbacks))
+                continue
+            # El timeout sólo acota cuánto tarda stop() en surtir efecto
+            ready, _, _ = select.select([inotify[0]], [], [], 0.5)
+            if not ready:
+                continue
+            try:
+                data = os.read(inotify[0], 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            names = set()
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                names.add(os.fsdecode(data[offset : offset + length].rstrip(b"\0")))
+                offset += length
+            self._refresh([key for key in list(self._callbacks) if os.path.basename(key) in names])
+
+    def _refresh(self, keys):
+        """Recarga los archivos que cambiaron y avisa a sus callbacks"""
+        for key in keys:
+            previous = self._snapshots.get(key)
+            stamp = file_stamp(key)
+            if key in self._failed and self._failed[key] == stamp:
+                continue
+            try:
+                snapshot = self.load(key)
+            except ConfigurationError as e:
+                self._failed[key] = stamp
+                self.logger.error(f"Configuración no recargada ({key}): {e}")
+                continue
+            self._failed.pop(key, None)
+            if snapshot is previous:
+                continue
+            self.logger.info(f"Configuración recargada: {key}")
+            for callback in list(self._callbacks.get(key, ())):
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    self.logger.error(f"Error en callback de recarga ({key}): {e}")
+
+
+_default_cache = ConfigCache()
+
+
+def get_config_cache() -> ConfigCache:
+    """Caché de configuración compartida del proceso"""
+    return _default_cache
@@ -1,22 +1,46 @@
 import json
+import os
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 import sys
 
-from src.utils.validators import ConfigValidator
 from src.utils.exceptions import ConfigurationError
 from src.utils.constants import CONFIG_FILENAME, HIDDEN_CONFIG_FILENAME
+from src.core.knock_plan import KnockPlan
+from src.core.config_cache import ConfigCache, ConfigSnapshot, get_config_cache
+
+
+# Resultado de la búsqueda de config.json por (modo empaquetado, directorio actual)
+_found_configs: Dict[tuple, Path] = {}
 
 
 class ConfigManager:
     """Gestor de configuración del sistema"""
 
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(
+        self,
+        config_path: Optional[str] = None,
+        hot_reload: bool = False,
+        on_reload: Optional[Callable[[ConfigSnapshot], None]] = None,
+        cache: Optional[ConfigCache] = None,
+    ):
+        """
+        Args:
+            config_path: Ruta de config.json (None = buscar en las ubicaciones estándar)
+            hot_reload: Vigilar el archivo y aplicar sus cambios sin reiniciar
+            on_reload: Se llama con cada snapshot nuevo cuando hot_reload está activo
+            cache: ConfigCache a usar (por defecto la compartida del proceso)
+        """
         self._config_path_str = config_path
+        self._cache = cache if cache is not None else get_config_cache()
+        self.hot_reload = hot_reload
+        self._on_reload = on_reload
         self._load_and_validate()
+        if hot_reload:
+            self._cache.watch(self._cache_path, on_reload)
 
     def _load_and_validate(self):
-        """Carga y valida la configuración."""
+        """Carga y valida la configuración (o reutiliza el snapshot en caché)."""
         if self._config_path_str:
             self.config_path = Path(self._config_path_str)
             if not self.config_path.exists():
@@ -26,13 +50,37 @@ class ConfigManager:
         else:
             self.config_path = self._find_config()
 
-        self.config = self._load_config()
-        self._validate_config()
+        # Ruta absoluta como str: la clave de la caché, sin rearmarla en cada lectura
+        self._cache_path = os.path.abspath(self.config_path)
+        self._snapshot = self._cache.load(self._cache_path)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Configuración validada vigente (no modificar: es compartida)"""
+        return (self._cache.snapshot(self._cache_path) or self._snapshot).config
+
+    def get_knock_plan(self) -> KnockPlan:
+        """Plan de knocks compilado; se recompila sólo si cambió el archivo
+
+        Mientras el archivo no cambie, cada conexión reutiliza el mismo plan sin
+        volver a leer, validar ni interpretar la configuración. Con hot_reload
+        ni siquiera hace stat: el watcher ya reemplazó el snapshot.
+        """
+        snapshot = self._cache.snapshot(self._cache_path) if self.hot_reload else None
+        if snapshot is None:
+            snapshot = self._snapshot = self._cache.load(self._cache_path)
+        return snapshot.plan
 
     def _find_config(self) -> Path:
-        """Busca config.json en múltiples ubicaciones"""
+        """Busca config.json en múltiples ubicaciones (una vez por proceso)"""
+        frozen = getattr(sys, "frozen", False)
+        key = (frozen, Path.cwd())
+        found = _found_configs.get(key)
+        if found is not None and found.exists():
+            return found
+
         # Si está empaquetado con PyInstaller
-        if getattr(sys, "frozen", False):
+        if frozen:
             base_path = Path(sys._MEIPASS) if hasattr(sys, "_MEIPASS") else Path(".")
             search_paths = [
                 base_path / CONFIG_FILENAME,
@@ -49,27 +97,11 @@ class ConfigManager:
 
         for path in search_paths:
             if path.exists():
+                _found_configs[key] = path
                 return path
 
         raise ConfigurationError(f"{CONFIG_FILENAME} no encontrado en las ubicaciones esperadas")
 
-    def _load_config(self) -> Dict[str, Any]:
-        """Carga configuración desde archivo"""
-        try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            raise ConfigurationError(f"Archivo de configuración corrupto: {e}")
-        except Exception as e:
-            raise ConfigurationError(f"Error al leer configuración: {e}")
-
-    def _validate_config(self):
-        """Valida la configuración cargada"""
-        validator = ConfigValidator()
-        if not validator.validate(self.config):
-            errors = "\n".join(validator.errors)
-            raise ConfigurationError(f"Configuración inválida:\n{errors}")
-
     def get(self, key: str, default=None):
         """Obtiene valor de configuración"""
         return self.config.get(key, default)
@@ -92,18 +124,30 @@ class ConfigManager:
 
     def update(self, key: str, value: Any):
         """Actualiza valor de configuración"""
-        self.config[key] = value
-        self._save_config()
-
-    def _save_config(self):
-        """Guarda configuración actualizada"""
+        config = dict(self.config)
+        config[key] = value
+        self._save_config(config)
+        self._snapshot = self._cache.load(self._cache_path, force=True)
+
+    def _save_config(self, config: Dict[str, Any]):
+        """Guarda configuración actualizada
+
+        Escribe un temporal y lo renombra encima: quien lea el archivo (o lo
+        vigile) ve la versión anterior o la nueva completa, nunca una a medias.
+        """
+        tmp_path = self.config_path.with_name(f".{self.config_path.name}.tmp")
         try:
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.config_path)
         except Exception as e:
             raise ConfigurationError(f"Error al guardar configuración: {e}")
 
     def reload(self):
         """Recarga configuración desde archivo"""
-        self.config = self._load_config()
-        self._validate_config()
+        self._snapshot = self._cache.load(self._cache_path, force=True)
+
+    def close(self):
+        """Quita el callback de recarga (el archivo sigue vigilado para otros lectores)"""
+        if self.hot_reload and self._on_reload is not None:
+            self._cache.unwatch(self._cache_path, self._on_reload)
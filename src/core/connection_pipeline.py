@@ -0,0 +1,133 @@
+"""
+Pipeline de conexión por etapas: knock, apertura del puerto y lanzamiento de la VPN
+
+Mientras corre la secuencia de knocks, un thread resuelve el perfil y las
+credenciales, arma el comando del cliente VPN y pre-lanza su proceso
+(detenido antes del exec). Apenas el sondeo confirma que el firewall abrió
+el puerto, el proceso recibe la orden de continuar: no hay espera fija ni
+búsqueda de archivos en el camino crítico. Cada etapa reporta su duración.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.constants import DEFAULT_FIREWALL_PROCESS_TIME
+from monitoring.logger import StructuredLogger
+
+STAGES = ("prepare", "knock", "readiness", "launch")
+
+
+class ConnectionPipeline:
+    """Conexión completa con etapas solapadas y tiempos por etapa"""
+
+    def __init__(self, knocker, vpn_manager, config, prespawn: bool = True):
+        """
+        Args:
+            knocker: PortKnocker que ejecuta la secuencia
+            vpn_manager: VPNManager de la plataforma
+            config: ConfigManager (get() y get_knock_plan())
+            prespawn: Pre-lanzar el proceso del cliente VPN durante los knocks
+        """
+        self.knocker = knocker
+        self.vpn_manager = vpn_manager
+        self.config = config
+        self.prespawn = prespawn
+        self.logger = StructuredLogger()
+
+    def run(
+        self,
+        profile_path: str = "profile.ovpn",
+        credentials_path: Optional[str] = "credentials.txt",
+        on_stage: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta knock -> apertura -> VPN
+
+        Args:
+            profile_path: Perfil del cliente VPN
+            credentials_path: Archivo de credenciales (o None)
+            on_stage: Se llama con "knock", "launch" y "connected" al entrar a cada etapa
+
+        Returns:
+            dict con success, failed_stage, error, timings (segundos por etapa,
+            más prepare_wait y total) y readiness (último sondeo del knocker)
+        """
+        notify = on_stage or (lambda stage: None)
+        start = time.monotonic()
+        result: Dict[str, Any] = {
+            "success": False,
+            "failed_stage": None,
+            "error": None,
+            "timings": {},
+            "readiness": None,
+        }
+        timings = result["timings"]
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="vpn-prepare") as pool:
+            prepared = pool.submit(self._prepare, profile_path, credentials_path, timings)
+            try:
+                notify("knock")
+                stage = "knock"
+                knock_start = time.monotonic()
+                # Plan compilado y cacheado por ConfigManager (sin re-parsear por conexión)
+                opened = self.knocker.execute_plan(
+                    self.config.get_knock_plan(),
+                    readiness_probe=True,
+                    readiness_deadline=self.config.get(
+                        "readiness_deadline", DEFAULT_FIREWALL_PROCESS_TIME
+                    ),
+                    precise_timing=self.config.get("precise_timing", True),
+                )
+                knock_elapsed = time.monotonic() - knock_start
+                readiness = self.knocker.last_readiness
+                result["readiness"] = readiness
+                readiness_elapsed = readiness["elapsed"] if readiness else 0.0
+                timings["knock"] = knock_elapsed - readiness_elapsed
+                timings["readiness"] = readiness_elapsed
+                if not opened:
+                    stage = "readiness"
+                    raise RuntimeError("El puerto no abrió tras la secuencia de knocks")
+
+                stage = "prepare"
+                wait_start = time.monotonic()
+                command, gated = prepared.result()
+                timings["prepare_wait"] = time.monotonic() - wait_start
+
+                notify("launch")
+                stage = "launch"
+                launch_start = time.monotonic()
+                launched = self.vpn_manager.launch(command, gated)
+                timings["launch"] = time.monotonic() - launch_start
+                if not launched:
+                    raise RuntimeError("El cliente VPN no arrancó")
+
+                result["success"] = True
+                notify("connected")
+            except Exception as e:
+                result["failed_stage"] = stage
+                result["error"] = str(e)
+                self._discard(prepared)
+
+        timings["total"] = time.monotonic() - start
+        self.logger.log_pipeline(
+            self.config.get("target_ip"), result["success"], result["failed_stage"], timings
+        )
+        return result
+
+    def _prepare(self, profile_path: str, credentials_path: Optional[str], timings: dict):
+        """Etapa en segundo plano: comando del cliente VPN y proceso pre-lanzado"""
+        stage_start = time.monotonic()
+        command = self.vpn_manager.prepare(profile_path, credentials_path)
+        gated = self.vpn_manager.spawn_gated(command) if self.prespawn else None
+        timings["prepare"] = time.monotonic() - stage_start
+        return command, gated
+
+    def _discard(self, prepared):
+        """Libera el proceso pre-lanzado si la conexión no llegó a usarlo"""
+        try:
+            _, gated = prepared.result()
+        except Exception:
+            return
+        if gated is not None and gated.returncode is None:
+            self.vpn_manager.cancel_gated(gated)
@@ -0,0 +1,108 @@
+"""
+Plan de knocks compilado a partir de la configuración validada
+
+`KnockPlan.compile()` convierte una vez el JSON de configuración (listas
+[puerto, "protocolo"(, "payload")]) en tuplas inmutables: knocks listos para
+`_knock_port`, payloads ya codificados, offsets absolutos de cada knock y
+etiquetas "puerto/protocolo" para los logs. También resuelve el host con el
+resolver compartido y guarda las direcciones con su vencimiento.
+
+ConfigManager lo cachea y sólo lo recompila si cambia el archivo de
+configuración; cada conexión reutiliza el mismo objeto.
+"""
+
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from network.resolver import Address, Resolver, get_resolver, parse_literal
+from network.udp_pool import encode_payload
+
+# (puerto, protocolo) o (puerto, "udp", payload en bytes)
+Knock = Tuple
+
+
+class KnockPlan:
+    """Secuencia compilada e inmutable: knocks, offsets y direcciones del destino"""
+
+    __slots__ = (
+        "host",
+        "target_port",
+        "interval",
+        "knocks",
+        "offsets",
+        "labels",
+        "addresses",
+        "families",
+        "addresses_expire",
+    )
+
+    def __init__(
+        self,
+        host: str,
+        target_port: int,
+        interval: float,
+        knocks: Tuple[Knock, ...],
+        addresses: Tuple[Address, ...] = (),
+        addresses_expire: float = 0.0,
+    ):
+        values = {
+            "host": host,
+            "target_port": int(target_port),
+            "interval": float(interval),
+            "knocks": tuple(knocks),
+            "offsets": tuple(i * float(interval) for i in range(len(knocks))),
+            "labels": tuple(f"{knock[0]}/{knock[1]}" for knock in knocks),
+            "addresses": tuple(addresses),
+            "families": tuple(sorted({family for family, _ in addresses})),
+            "addresses_expire": addresses_expire,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KnockPlan es inmutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("KnockPlan es inmutable")
+
+    @classmethod
+    def compile(cls, config: Dict[str, Any], resolver: Optional[Resolver] = None) -> "KnockPlan":
+        """Compila un plan desde una configuración ya validada
+
+        Si el host no resuelve el plan queda sin direcciones y PortKnocker
+        resuelve al ejecutar (y reporta el error ahí).
+        """
+        knocks = []
+        for item in config["knock_sequence"]:
+            port, protocol = int(item[0]), str(item[1]).lower()
+            if len(item) > 2:
+                knocks.append((port, protocol, encode_payload(item[2])))
+            else:
+                knocks.append((port, protocol))
+
+        resolver = resolver if resolver is not None else get_resolver()
+        host = config["target_ip"]
+        try:
+            addresses = resolver.resolve(host)
+            # Una IP literal no vence; un nombre, con el TTL del resolver
+            expire = float("inf") if parse_literal(host) else time.monotonic() + resolver.ttl
+        except socket.gaierror:
+            addresses, expire = [], 0.0
+
+        return cls(host, config["target_port"], config["interval"], knocks, addresses, expire)
+
+    def fresh_addresses(self) -> Optional[List[Address]]:
+        """Direcciones resueltas al compilar, o None si ya vencieron (o no hay)"""
+        if self.addresses and time.monotonic() < self.addresses_expire:
+            return list(self.addresses)
+        return None
+
+    def __len__(self) -> int:
+        return len(self.knocks)
+
+    def __repr__(self) -> str:
+        return (
+            f"KnockPlan({self.host} -> {self.target_port}, "
+            f"[{', '.join(self.labels)}], intervalo={self.interval}s)"
+        )
@@ -0,0 +1,105 @@
+"""
+Planificador de knocks con deadlines absolutos del reloj monotónico
+
+`time.sleep(interval)` después de cada knock suma el tiempo del connect al
+espaciado real (hasta DEFAULT_KNOCK_TIMEOUT en un puerto filtrado) y la
+secuencia se desplaza más allá del interval_max del servidor. Acá cada knock
+tiene un instante planificado (inicio + i * intervalo) y se despacha a un
+thread al llegar su deadline, así un knock lento nunca atrasa al siguiente.
+El reporte compara, por knock, el instante planificado con el logrado.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+
+class KnockScheduler:
+    """Dispara una secuencia de knocks en deadlines absolutos de time.monotonic()"""
+
+    def __init__(self, interval: float, offsets: Optional[Sequence[float]] = None):
+        """
+        Args:
+            interval: Intervalo entre knocks en segundos
+            offsets: Offsets ya calculados (p.ej. de un KnockPlan); si no, i * intervalo
+        """
+        if interval < 0:
+            raise ValueError("El intervalo no puede ser negativo")
+        self.interval = float(interval)
+        self.offsets = offsets
+
+    def plan(self, count: int) -> List[float]:
+        """Offsets planificados (segundos desde el inicio) de cada knock"""
+        if self.offsets is not None and len(self.offsets) >= count:
+            return list(self.offsets[:count])
+        return [i * self.interval for i in range(count)]
+
+    def run(
+        self,
+        knock_sequence: List[Sequence],
+        fire: Callable[..., bool],
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> dict:
+        """
+        Ejecuta fire(*knock) para cada knock en su deadline
+
+        Args:
+            knock_sequence: Lista de (puerto, protocolo[, payload])
+            fire: Recibe los campos del knock y lo envía; retorna True si se envió
+            should_stop: Consultado antes de cada knock; True cancela los restantes
+
+        Returns:
+            dict con knocks (planned/actual/lag/ok por knock, en segundos),
+            max_lag, mean_lag, max_gap_error, completed y duration
+        """
+        planned = self.plan(len(knock_sequence))
+        entries = []
+        futures = []
+
+        def timed_fire(entry, knock):
+            # Instante logrado: cuando el knock realmente sale
+            entry["actual"] = time.monotonic() - origin
+            return fire(*knock)
+
+        with ThreadPoolExecutor(max_workers=max(1, len(knock_sequence))) as pool:
+            origin = time.monotonic()
+            for offset, knock in zip(planned, knock_sequence):
+                if should_stop is not None and entries and should_stop():
+                    break
+                deadline = origin + offset
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    time.sleep(remaining)
+
+                entry = {"port": knock[0], "protocol": knock[1], "planned": offset, "actual": None}
+                entries.append(entry)
+                futures.append(pool.submit(timed_fire, entry, knock))
+
+            for entry, future in zip(entries, futures):
+                try:
+                    entry["ok"] = bool(future.result())
+                except Exception:
+                    entry["ok"] = False
+
+        return self._report(entries, len(knock_sequence), time.monotonic() - origin)
+
+    def _report(self, entries: List[dict], total: int, duration: float) -> dict:
+        lags = []
+        for entry in entries:
+            entry["lag"] = entry["actual"] - entry["planned"]
+            lags.append(entry["lag"])
+
+        # Error del espaciado entre knocks consecutivos (lo que valida interval_max)
+        gaps = [
+            abs((b["actual"] - a["actual"]) - self.interval) for a, b in zip(entries, entries[1:])
+        ]
+        return {
+            "knocks": entries,
+            "completed": len(entries) == total,
+            "max_lag": max(lags) if lags else 0.0,
+            "mean_lag": sum(lags) / len(lags) if lags else 0.0,
+            "max_gap_error": max(gaps) if gaps else 0.0,
+            "duration": duration,
+        }
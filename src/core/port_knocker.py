@@ -1,19 +1,114 @@
+import errno
+import selectors
 import socket
+import struct
+import threading
 import time
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 from utils.exceptions import PortKnockingError
-from utils.constants import DEFAULT_KNOCK_TIMEOUT, DEFAULT_FIREWALL_PROCESS_TIME
+from utils.constants import (
+    DEFAULT_KNOCK_TIMEOUT,
+    DEFAULT_FIREWALL_PROCESS_TIME,
+    DEFAULT_HAPPY_EYEBALLS_TIMEOUT,
+    DEFAULT_READINESS_INITIAL_DELAY,
+    DEFAULT_READINESS_MAX_DELAY,
+    DEFAULT_SYN_HOLD_TIME,
+    DEFAULT_PROGRESSIVE_PROBE_INTERVAL,
+)
 from monitoring.logger import StructuredLogger
+from core.knock_scheduler import KnockScheduler
+from network.udp_pool import UDPSocketPool, encode_payload
+from network.resolver import Address, Resolver, address_family, get_resolver, happy_eyeballs
+
+KNOCK_MODES = ("connect", "syn")
+VERIFY_MODES = ("sequential", "concurrent")
+
+# SO_LINGER {on, 0}: close() aborta la conexión (RST si llegó el SYN-ACK), sin TIME_WAIT
+_LINGER_ABORT = struct.pack("ii", 1, 0)
+
+# Resultados de un connect() no bloqueante que indican que el SYN salió
+_SYN_SENT_ERRNOS = (0, errno.EINPROGRESS, errno.EAGAIN, errno.ECONNREFUSED)
+
+
+class _PortWatcher:
+    """Sondea un puerto TCP en un thread propio hasta que abre o se lo detiene
+
+    Lo usa progressive_check: los knocks siguen su calendario y sólo consultan
+    `opened`, en vez de esperar un ping bloqueante tras cada knock.
+    """
+
+    def __init__(self, probe, ip: str, port: int, interval: float):
+        self.opened = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(probe, ip, port, interval), name="port-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, probe, ip: str, port: int, interval: float):
+        while not self._stop.is_set():
+            if probe(ip, port):
+                self.opened.set()
+                return
+            self._stop.wait(interval)
+
+    def stop(self):
+        self._stop.set()
 
 
 class PortKnocker:
     """Cliente de Port Knocking"""
 
-    def __init__(self, verbose: bool = True):
+    def __init__(
+        self,
+        verbose: bool = True,
+        knock_mode: str = "connect",
+        syn_hold_time: float = DEFAULT_SYN_HOLD_TIME,
+        udp_pool: Optional[UDPSocketPool] = None,
+        verify_mode: str = "sequential",
+        resolver: Optional[Resolver] = None,
+        verify_quorum: int = 1,
+    ):
+        """
+        Args:
+            verbose: Imprimir el progreso
+            knock_mode: "connect" espera el connect TCP (hasta DEFAULT_KNOCK_TIMEOUT);
+                "syn" envía el SYN con un connect no bloqueante y no espera respuesta
+            syn_hold_time: En modo "syn", segundos que cada socket queda abierto
+                antes de abortarlo con SO_LINGER 0
+            udp_pool: Pool compartido para los knocks UDP; sin pool cada knock
+                UDP abre y cierra su propio socket
+            verify_mode: "sequential" hace los pings de verificación uno tras
+                otro; "concurrent" los lanza solapados con un deadline común
+            resolver: Resolver con caché; por defecto el compartido del proceso
+            verify_quorum: Sondeos exitosos necesarios para dar el puerto por
+                abierto (en ambos modos de verificación)
+        """
+        if knock_mode not in KNOCK_MODES:
+            raise ValueError(f"Modo de knock desconocido: {knock_mode}")
+        if verify_mode not in VERIFY_MODES:
+            raise ValueError(f"Modo de verificación desconocido: {verify_mode}")
+        if verify_quorum < 1:
+            raise ValueError(f"Quórum de verificación inválido: {verify_quorum}")
         self.verbose = verbose
+        self.knock_mode = knock_mode
+        self.syn_hold_time = syn_hold_time
+        self.udp_pool = udp_pool
+        self.verify_mode = verify_mode
+        self.verify_quorum = verify_quorum
+        self.resolver = resolver if resolver is not None else get_resolver()
+        # Sockets SYN pendientes de abortar: (instante de cierre, socket)
+        self._pending_syns = []
+        self._pending_lock = threading.Lock()
         self.logger = StructuredLogger()
+        # Resultado del último sondeo de apertura (readiness_probe=True)
+        self.last_readiness = None
+        # Reporte planificado vs logrado de la última secuencia (precise_timing=True)
+        self.last_schedule = None
+        # IP efectivamente usada por la última secuencia (target_ip ya resuelto)
+        self.last_address = None
 
     def execute_sequence(
         self,
@@ -22,25 +117,49 @@ class PortKnocker:
         interval: float,
         target_port: int,
         progressive_check: bool = False,
+        readiness_probe: bool = False,
+        readiness_deadline: float = DEFAULT_FIREWALL_PROCESS_TIME,
+        precise_timing: bool = False,
+        addresses: Optional[List[Address]] = None,
+        offsets: Optional[Tuple[float, ...]] = None,
     ) -> bool:
         """
         Ejecuta secuencia de port knocking
 
         Args:
-            target_ip: IP del servidor
-            knock_sequence: Lista de (puerto, protocolo)
+            target_ip: IP o nombre del servidor (A/AAAA; dual-stack con happy eyeballs)
+            knock_sequence: Lista de (puerto, protocolo) o (puerto, "udp", payload)
             interval: Intervalo entre knocks en segundos
             target_port: Puerto final a verificar
-            progressive_check: Verificar tras cada knock
+            progressive_check: Sondear el puerto en segundo plano durante la
+                secuencia y cancelar los knocks restantes cuando abre
+            readiness_probe: En vez de esperar DEFAULT_FIREWALL_PROCESS_TIME y
+                verificar, sondear el puerto con backoff hasta que abra
+            readiness_deadline: Tiempo máximo de sondeo en segundos
+            precise_timing: Disparar cada knock en su deadline absoluto
+                (inicio + i * intervalo) sin esperar al anterior, y dejar el
+                reporte de jitter en `last_schedule`
+            addresses: Direcciones ya resueltas de target_ip (evita el resolver)
+            offsets: Offsets ya calculados de cada knock para precise_timing
 
         Returns:
             True si exitoso, False si falló
         """
+        self.last_readiness = None
+        self.last_schedule = None
+        watcher = None
         try:
             self._print_header(target_ip, len(knock_sequence), interval)
 
+            # Resolver una sola vez por secuencia (caché TTL compartida) y elegir camino
+            if addresses is None:
+                addresses = self.resolver.resolve(target_ip)
+            ip, initial_open = self._select_path(addresses, target_port)
+            self.last_address = ip
+            if ip != target_ip:
+                self._log(f"[*] {target_ip} -> {ip}")
+
             # Verificar estado inicial
-            initial_open = self._tcp_ping(target_ip, target_port)
             self._log(f"[?] Verificando estado inicial del puerto {target_port}...")
 
             if initial_open:
@@ -51,19 +170,37 @@ class PortKnocker:
             # Ejecutar secuencia
             self._log("\n[>>] Ejecutando secuencia de knocks:\n")
 
-            for idx, (port, protocol) in enumerate(knock_sequence, 1):
-                result = self._knock_port(target_ip, port, protocol)
-                status = "[+]" if result else "[!]"
-                self._log(
-                    f"[{idx}/{len(knock_sequence)}] Knock {protocol.upper()} -> Puerto {port}... {status}"
+            if progressive_check:
+                # Sondeo en paralelo: los knocks nunca esperan al ping
+                watcher = _PortWatcher(
+                    self._tcp_ping, ip, target_port, DEFAULT_PROGRESSIVE_PROBE_INTERVAL
                 )
 
-                if progressive_check:
-                    if self._tcp_ping(target_ip, target_port):
+            if precise_timing:
+                if self._run_scheduled(ip, knock_sequence, interval, target_port, watcher, offsets):
+                    return True
+            else:
+                for idx, knock in enumerate(knock_sequence, 1):
+                    port, protocol = knock[0], knock[1]
+                    result = self._knock_port(ip, *knock)
+                    status = "[+]" if result else "[!]"
+                    self._log(
+                        f"[{idx}/{len(knock_sequence)}] Knock {protocol.upper()} -> Puerto {port}... {status}"
+                    )
+
+                    if watcher is None:
+                        time.sleep(interval)
+                    elif watcher.opened.wait(interval):
+                        # Abrió: se cancelan los knocks restantes
                         self._log(f"\n[SUCCESS] Puerto {target_port} abierto tras knock #{idx}")
                         return True
 
-                time.sleep(interval)
+            if watcher is not None:
+                watcher.stop()
+
+            # Los SYN recientes siguen abiertos hasta su hold: cerrarlos ya (RST)
+            # antes del SYN-ACK haría que el servidor nunca acepte el último knock
+            self._abort_pending_syns()
 
             # Resumen
             self._log(f"\n{'='*70}")
@@ -72,14 +209,34 @@ class PortKnocker:
             )
             self._log(f"{'='*70}\n")
 
-            # Esperar procesamiento del firewall
-            self._log(
-                f"[*] Esperando {DEFAULT_FIREWALL_PROCESS_TIME}s que el firewall procese la address list...\n"
-            )
-            time.sleep(DEFAULT_FIREWALL_PROCESS_TIME)
+            if readiness_probe:
+                # Sondear hasta que el firewall aplique la regla (o venza el deadline)
+                self._log(f"[*] Sondeando puerto {target_port} hasta {readiness_deadline}s...\n")
+                readiness = self._wait_for_port(ip, target_port, readiness_deadline)
+                self.last_readiness = readiness
+                self.logger.log_firewall_latency(
+                    target_ip,
+                    target_port,
+                    readiness["open"],
+                    readiness["elapsed"],
+                    readiness["probes"],
+                )
+                verification_result = {
+                    "open": readiness["open"],
+                    "success_count": 1 if readiness["open"] else 0,
+                    "total_attempts": readiness["probes"],
+                    "avg_latency": readiness["latency"],
+                    "firewall_time": readiness["elapsed"],
+                }
+            else:
+                # Esperar procesamiento del firewall
+                self._log(
+                    f"[*] Esperando {DEFAULT_FIREWALL_PROCESS_TIME}s que el firewall procese la address list...\n"
+                )
+                time.sleep(DEFAULT_FIREWALL_PROCESS_TIME)
 
-            # Verificación final
-            verification_result = self._verify_port_open(target_ip, target_port)
+                # Verificación final
+                verification_result = self._verify_port_open(ip, target_port)
 
             if verification_result["open"]:
                 self._log_success(target_port, verification_result)
@@ -93,19 +250,104 @@ class PortKnocker:
         except Exception as e:
             self.logger.log_error(f"Error en port knocking: {e}")
             raise PortKnockingError(f"Error ejecutando port knocking: {e}")
+        finally:
+            if watcher is not None:
+                watcher.stop()
+            self._release_pending_syns()
+
+    def execute_plan(self, plan, **options) -> bool:
+        """Ejecuta un KnockPlan compilado (ver execute_sequence para `options`)
+
+        Usa los knocks, offsets y direcciones del plan: no reinterpreta la
+        configuración ni vuelve a resolver mientras las direcciones estén vigentes.
+        """
+        return self.execute_sequence(
+            plan.host,
+            plan.knocks,
+            plan.interval,
+            plan.target_port,
+            addresses=plan.fresh_addresses(),
+            offsets=plan.offsets,
+            **options,
+        )
+
+    def _select_path(self, addresses: List[Address], port: int) -> Tuple[str, bool]:
+        """Elige la IP de la secuencia; retorna (ip, puerto_ya_abierto)
+
+        Con una sola familia es la primera dirección. En hosts dual-stack IPv6 e
+        IPv4 compiten (happy eyeballs) sobre el puerto objetivo y gana el primer
+        camino que responde, aunque sea con RST. Nunca se sondean los puertos de
+        knock: un knock extra fuera de la secuencia la reinicia en un knockd
+        estricto. Antes del knock el puerto objetivo suele descartar (DROP), así
+        que la carrera tiene tope DEFAULT_HAPPY_EYEBALLS_TIMEOUT; si ninguna
+        familia contesta se usa la primera dirección, que ya viene en el orden de
+        preferencia RFC 6724. Knocks y verificación usan luego esa misma IP,
+        porque el servidor autoriza por IP de origen.
+        """
+        if len({family for family, _ in addresses}) == 1:
+            ip = addresses[0][1]
+            return ip, self._tcp_ping(ip, port)
+        winner = happy_eyeballs(addresses, port, timeout=DEFAULT_HAPPY_EYEBALLS_TIMEOUT)
+        if winner is None:
+            # La carrera ya fue el sondeo inicial: nadie contestó, el puerto no está abierto
+            return addresses[0][1], False
+        return winner["ip"], winner["connected"]
 
-    def _knock_port(self, ip: str, port: int, protocol: str) -> bool:
-        """Ejecuta knock en un puerto específico"""
+    def _run_scheduled(
+        self,
+        target_ip: str,
+        knock_sequence: List[Tuple[int, str]],
+        interval: float,
+        target_port: int,
+        watcher: Optional[_PortWatcher] = None,
+        offsets: Optional[Tuple[float, ...]] = None,
+    ) -> bool:
+        """Envía la secuencia con KnockScheduler; True si el puerto abrió antes de terminarla"""
+        report = KnockScheduler(interval, offsets).run(
+            knock_sequence,
+            lambda *knock: self._knock_port(target_ip, *knock),
+            should_stop=watcher.opened.is_set if watcher is not None else None,
+        )
+        self.last_schedule = report
+        self.logger.log_knock_schedule(target_ip, report)
+
+        total = len(knock_sequence)
+        for idx, knock in enumerate(report["knocks"], 1):
+            status = "[+]" if knock["ok"] else "[!]"
+            self._log(
+                f"[{idx}/{total}] Knock {knock['protocol'].upper()} -> Puerto {knock['port']}... "
+                f"{status} (t={knock['actual'] * 1000:.1f}ms, plan {knock['planned'] * 1000:.1f}ms)"
+            )
+        self._log(
+            f"[*] Jitter: máx {report['max_lag'] * 1000:.2f}ms, "
+            f"medio {report['mean_lag'] * 1000:.2f}ms, "
+            f"error de espaciado máx {report['max_gap_error'] * 1000:.2f}ms"
+        )
+
+        if watcher is not None and watcher.opened.is_set():
+            self._log(
+                f"\n[SUCCESS] Puerto {target_port} abierto tras knock #{len(report['knocks'])}"
+            )
+            return True
+        return False
+
+    def _knock_port(self, ip: str, port: int, protocol: str, payload: bytes = b"") -> bool:
+        """Ejecuta knock en un puerto específico (payload sólo aplica a UDP)"""
         try:
-            if protocol == "tcp":
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if protocol == "tcp" and self.knock_mode == "syn":
+                return self._send_syn(ip, port)
+            elif protocol == "tcp":
+                sock = socket.socket(address_family(ip), socket.SOCK_STREAM)
                 sock.settimeout(DEFAULT_KNOCK_TIMEOUT)
                 sock.connect_ex((ip, port))
                 sock.close()
                 return True
+            elif protocol == "udp" and self.udp_pool is not None:
+                self.udp_pool.send(ip, port, payload)
+                return True
             elif protocol == "udp":
-                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                sock.sendto(b"", (ip, port))
+                sock = socket.socket(address_family(ip), socket.SOCK_DGRAM)
+                sock.sendto(encode_payload(payload), (ip, port))
                 sock.close()
                 return True
         except Exception as e:
@@ -113,10 +355,56 @@ class PortKnocker:
                 self._log(f"    Error en knock {port}/{protocol}: {e}")
             return False
 
+    def _send_syn(self, ip: str, port: int) -> bool:
+        """Envía el SYN con un connect no bloqueante, sin esperar el handshake
+
+        El socket queda pendiente syn_hold_time y luego se aborta con SO_LINGER 0,
+        así el costo del knock no depende de si el servidor responde, rechaza o filtra.
+        """
+        sock = socket.socket(address_family(ip), socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_ABORT)
+            sock.setblocking(False)
+            result = sock.connect_ex((ip, port))
+        except Exception:
+            sock.close()
+            raise
+        if result not in _SYN_SENT_ERRNOS:
+            sock.close()
+            self._log(f"    Error en knock {port}/tcp: {errno.errorcode.get(result, result)}")
+            return False
+
+        with self._pending_lock:
+            self._pending_syns.append((time.monotonic() + self.syn_hold_time, sock))
+        self._abort_pending_syns()
+        return True
+
+    def _abort_pending_syns(self, force: bool = False):
+        """Cierra (RST) los sockets SYN vencidos, o todos si force"""
+        now = time.monotonic()
+        with self._pending_lock:
+            if force:
+                expired, self._pending_syns = self._pending_syns, []
+            else:
+                expired = [entry for entry in self._pending_syns if entry[0] <= now]
+                self._pending_syns = [entry for entry in self._pending_syns if entry[0] > now]
+        for _, sock in expired:
+            sock.close()
+
+    def _release_pending_syns(self):
+        """Espera a que venza el hold de los SYN pendientes y los cierra todos"""
+        with self._pending_lock:
+            last = max((deadline for deadline, _ in self._pending_syns), default=None)
+        if last is not None:
+            remaining = last - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+        self._abort_pending_syns(force=True)
+
     def _tcp_ping(self, ip: str, port: int, timeout: int = 1) -> bool:
         """Verifica si puerto TCP está abierto"""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock = socket.socket(address_family(ip), socket.SOCK_STREAM)
             sock.settimeout(timeout)
             result = sock.connect_ex((ip, port))
             sock.close()
@@ -126,6 +414,8 @@ class PortKnocker:
 
     def _verify_port_open(self, ip: str, port: int, attempts: int = 3) -> dict:
         """Verifica apertura del puerto con múltiples intentos"""
+        if self.verify_mode == "concurrent":
+            return self._verify_port_concurrent(ip, port, attempts)
         successful_attempts = 0
         latencies = []
 
@@ -141,12 +431,128 @@ class PortKnocker:
             time.sleep(0.5)
 
         return {
-            "open": successful_attempts > 0,
+            "open": successful_attempts >= min(self.verify_quorum, attempts),
             "success_count": successful_attempts,
             "total_attempts": attempts,
             "avg_latency": sum(latencies) / len(latencies) if latencies else 0,
         }
 
+    def _verify_port_concurrent(
+        self,
+        ip: str,
+        port: int,
+        attempts: int = 3,
+        timeout: float = 2,
+        quorum: Optional[int] = None,
+    ) -> dict:
+        """Lanza los pings solapados (connect no bloqueante) con un deadline común
+
+        Corta apenas `quorum` sondeos (por defecto verify_quorum) tienen éxito, o
+        cuando ya no pueden tenerlo; un puerto cerrado o filtrado se informa en
+        un solo timeout. Las latencias (ms) cubren los sondeos completados;
+        pending_count cuenta los que no respondieron antes del corte.
+        """
+        quorum = min(quorum or self.verify_quorum, attempts)
+        selector = selectors.DefaultSelector()
+        start = time.monotonic()
+        deadline = start + timeout
+        successes, failures = 0, 0
+        latencies, success_latencies = [], []
+
+        try:
+            for _ in range(attempts):
+                sock = socket.socket(address_family(ip), socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_ABORT)
+                sock.setblocking(False)
+                result = sock.connect_ex((ip, port))
+                if result in (0, errno.EINPROGRESS, errno.EAGAIN):
+                    selector.register(sock, selectors.EVENT_WRITE)
+                else:
+                    sock.close()
+                    failures += 1
+                    latencies.append((time.monotonic() - start) * 1000)
+
+            while selector.get_map() and successes < quorum and failures <= attempts - quorum:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in selector.select(remaining):
+                    sock = key.fileobj
+                    latency = (time.monotonic() - start) * 1000
+                    selector.unregister(sock)
+                    if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                        successes += 1
+                        success_latencies.append(latency)
+                    else:
+                        failures += 1
+                    latencies.append(latency)
+                    sock.close()
+        finally:
+            # Sondeos sin respuesta al vencer el deadline (o al alcanzar el quórum)
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+
+        latencies.sort()
+        return {
+            "open": successes >= quorum,
+            "success_count": successes,
+            "failure_count": failures,
+            "pending_count": attempts - successes - failures,
+            "total_attempts": attempts,
+            "avg_latency": (
+                sum(success_latencies) / len(success_latencies) if success_latencies else 0
+            ),
+            "latency": {
+                "min": latencies[0] if latencies else 0,
+                "p50": latencies[len(latencies) // 2] if latencies else 0,
+                "max": latencies[-1] if latencies else 0,
+            },
+            "elapsed": time.monotonic() - start,
+        }
+
+    def _wait_for_port(
+        self,
+        ip: str,
+        port: int,
+        deadline: float = DEFAULT_FIREWALL_PROCESS_TIME,
+        initial_delay: float = DEFAULT_READINESS_INITIAL_DELAY,
+        max_delay: float = DEFAULT_READINESS_MAX_DELAY,
+    ) -> dict:
+        """Sondea el puerto con backoff exponencial hasta que abra o venza el deadline
+
+        Retorna open, elapsed (segundos hasta la apertura o hasta rendirse),
+        probes y latency (ms del sondeo exitoso).
+        """
+        start = time.monotonic()
+        end = start + deadline
+        delay = initial_delay
+        probes = 0
+
+        while True:
+            probes += 1
+            probe_start = time.monotonic()
+            timeout = max(0.05, min(1.0, end - probe_start))
+            if self._tcp_ping(ip, port, timeout=timeout):
+                now = time.monotonic()
+                return {
+                    "open": True,
+                    "elapsed": now - start,
+                    "probes": probes,
+                    "latency": (now - probe_start) * 1000,
+                }
+
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return {
+                    "open": False,
+                    "elapsed": time.monotonic() - start,
+                    "probes": probes,
+                    "latency": 0,
+                }
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
     def _print_header(self, ip: str, knock_count: int, interval: float):
         """Imprime encabezado de información"""
         if not self.verbose:
@@ -169,6 +575,14 @@ class PortKnocker:
         self._log(f"Intentos exitosos: {result['success_count']}/{result['total_attempts']}")
         if result["avg_latency"] > 0:
             self._log(f"Latencia promedio: {result['avg_latency']:.2f}ms")
+        if "latency" in result:
+            latency = result["latency"]
+            self._log(
+                f"Latencia min/p50/max: {latency['min']:.2f}/{latency['p50']:.2f}/"
+                f"{latency['max']:.2f}ms"
+            )
+        if "firewall_time" in result:
+            self._log(f"Tiempo de aplicación del firewall: {result['firewall_time'] * 1000:.0f}ms")
         self._log("-" * 70 + "\n")
         self._log("[SUCCESS] PORT KNOCKING EXITOSO - Puerto accesible\n")
 
@@ -180,6 +594,8 @@ class PortKnocker:
         self._log(f"Puerto: {port}")
         self._log("Estado: [-] CERRADO")
         self._log(f"Intentos exitosos: {result['success_count']}/{result['total_attempts']}")
+        if "elapsed" in result:
+            self._log(f"Tiempo de verificación: {result['elapsed'] * 1000:.0f}ms")
         self._log("-" * 70 + "\n")
         self._log("[FAILED] PORT KNOCKING FALLO - Puerto sigue cerrado")
         self._log("   Verifica la secuencia y configuracion del servidor\n")
@@ -1,24 +1,76 @@
+import os
 import platform
 import subprocess
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import sys
 
 from utils.exceptions import VPNConnectionError
 from monitoring.logger import StructuredLogger
 
 
+# Proceso pre-lanzado: espera "go" en stdin y recién entonces hace exec del comando
+_GATED_EXEC = (
+    "import os, sys\n"
+    "if sys.stdin.readline().strip() == 'go':\n"
+    "    os.execvp(sys.argv[1], sys.argv[1:])\n"
+)
+
+
 class VPNManager(ABC):
     """Clase abstracta base para gestores VPN"""
 
+    PLATFORM = ""
+
     def __init__(self):
         self.logger = StructuredLogger()
         self.connected = False
 
-    @abstractmethod
     def connect(self, profile_path: str, credentials_path: Optional[str] = None) -> bool:
         """Conecta a VPN"""
+        try:
+            return self.launch(self.prepare(profile_path, credentials_path))
+        except Exception as e:
+            self.logger.log_error(f"Error en conexión VPN {self.PLATFORM}: {e}")
+            raise VPNConnectionError(f"Error conectando VPN: {e}")
+
+    def prepare(self, profile_path: str, credentials_path: Optional[str] = None) -> List[str]:
+        """Resuelve perfil y credenciales y arma el comando, sin lanzarlo"""
+        profile = self._find_profile(profile_path)
+        if credentials_path:
+            credentials_path = self._resolve_credentials(credentials_path)
+        return self.build_command(profile, credentials_path)
+
+    def spawn_gated(self, command: List[str]) -> Optional[subprocess.Popen]:
+        """Pre-lanza un proceso que hará exec de `command` al recibir "go" por stdin
+
+        Saca la creación del proceso del camino crítico de la conexión. Retorna
+        None donde no aplica (Windows, o ejecutable congelado sin intérprete).
+        """
+        if os.name != "posix" or getattr(sys, "frozen", False):
+            return None
+        return subprocess.Popen(
+            [sys.executable, "-c", _GATED_EXEC, *command],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+    @staticmethod
+    def cancel_gated(gated: subprocess.Popen):
+        """Termina un proceso pre-lanzado sin ejecutar el comando"""
+        gated.communicate("")
+
+    @abstractmethod
+    def build_command(self, profile: Path, credentials_path: Optional[str] = None) -> List[str]:
+        """Comando que lanza el cliente VPN"""
+        pass
+
+    @abstractmethod
+    def launch(self, command: List[str], gated: Optional[subprocess.Popen] = None) -> bool:
+        """Lanza el cliente VPN (con el proceso pre-lanzado si se pasa `gated`)"""
         pass
 
     @abstractmethod
@@ -49,33 +101,47 @@ class VPNManager(ABC):
 
         raise VPNConnectionError(f"Perfil VPN {profile_name} no encontrado")
 
+    def _resolve_credentials(self, credentials_path: str) -> str:
+        """Ruta absoluta de las credenciales si están junto al perfil; si no, la dada"""
+        if Path(credentials_path).is_absolute():
+            return credentials_path
+        try:
+            return str(self._find_profile(credentials_path))
+        except VPNConnectionError:
+            return credentials_path
+
+    def _run_daemon(self, command: List[str], gated: Optional[subprocess.Popen] = None) -> bool:
+        """Ejecuta un cliente que se demoniza (openvpn --daemon) y espera su arranque"""
+        if gated is not None:
+            _, stderr = gated.communicate("go\n")
+            returncode = gated.returncode
+        else:
+            result = subprocess.run(command, capture_output=True, text=True)
+            returncode, stderr = result.returncode, result.stderr
 
-class MacOSVPNManager(VPNManager):
-    """Gestor VPN para macOS"""
+        if returncode == 0:
+            self.connected = True
+            self.logger.log_info(f"VPN conectada exitosamente ({self.PLATFORM})")
+            return True
+        self.logger.log_error(f"Error conectando VPN: {stderr}")
+        return False
 
-    def connect(self, profile_path: str, credentials_path: Optional[str] = None) -> bool:
-        try:
-            profile = self._find_profile(profile_path)
 
-            # Comando para OpenVPN en macOS
-            cmd = ["sudo", "openvpn", "--config", str(profile), "--daemon"]
+class MacOSVPNManager(VPNManager):
+    """Gestor VPN para macOS"""
 
-            if credentials_path:
-                cmd.extend(["--auth-user-pass", credentials_path])
+    PLATFORM = "macOS"
 
-            result = subprocess.run(cmd, capture_output=True, text=True)
+    def build_command(self, profile: Path, credentials_path: Optional[str] = None) -> List[str]:
+        # Comando para OpenVPN en macOS
+        cmd = ["sudo", "openvpn", "--config", str(profile), "--daemon"]
 
-            if result.returncode == 0:
-                self.connected = True
-                self.logger.log_info("VPN conectada exitosamente (macOS)")
-                return True
-            else:
-                self.logger.log_error(f"Error conectando VPN: {result.stderr}")
-                return False
+        if credentials_path:
+            cmd.extend(["--auth-user-pass", credentials_path])
+        return cmd
 
-        except Exception as e:
-            self.logger.log_error(f"Error en conexión VPN macOS: {e}")
-            raise VPNConnectionError(f"Error conectando VPN: {e}")
+    def launch(self, command: List[str], gated: Optional[subprocess.Popen] = None) -> bool:
+        return self._run_daemon(command, gated)
 
     def disconnect(self) -> bool:
         try:
@@ -99,24 +165,20 @@ class MacOSVPNManager(VPNManager):
 class WindowsVPNManager(VPNManager):
     """Gestor VPN para Windows"""
 
-    def connect(self, profile_path: str, credentials_path: Optional[str] = None) -> bool:
-        try:
-            profile = self._find_profile(profile_path)
-
-            # OpenVPN GUI para Windows
-            openvpn_path = r"C:\Program Files\OpenVPN\bin\openvpn-gui.exe"
+    PLATFORM = "Windows"
 
-            cmd = [openvpn_path, "--connect", str(profile)]
+    def build_command(self, profile: Path, credentials_path: Optional[str] = None) -> List[str]:
+        # OpenVPN GUI para Windows
+        openvpn_path = r"C:\Program Files\OpenVPN\bin\openvpn-gui.exe"
 
-            subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return [openvpn_path, "--connect", str(profile)]
 
-            self.connected = True
-            self.logger.log_info("VPN conectada exitosamente (Windows)")
-            return True
+    def launch(self, command: List[str], gated: Optional[subprocess.Popen] = None) -> bool:
+        subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-        except Exception as e:
-            self.logger.log_error(f"Error en conexión VPN Windows: {e}")
-            raise VPNConnectionError(f"Error conectando VPN: {e}")
+        self.connected = True
+        self.logger.log_info("VPN conectada exitosamente (Windows)")
+        return True
 
     def disconnect(self) -> bool:
         try:
@@ -141,36 +203,25 @@ class WindowsVPNManager(VPNManager):
 class LinuxVPNManager(VPNManager):
     """Gestor VPN para Linux"""
 
-    def connect(self, profile_path: str, credentials_path: Optional[str] = None) -> bool:
-        try:
-            profile = self._find_profile(profile_path)
-
-            cmd = [
-                "pkexec",
-                "openvpn",
-                "--config",
-                str(profile),
-                "--daemon",
-                "--log",
-                "/tmp/openvpn.log",
-            ]
-
-            if credentials_path:
-                cmd.extend(["--auth-user-pass", credentials_path])
-
-            result = subprocess.run(cmd, capture_output=True, text=True)
-
-            if result.returncode == 0:
-                self.connected = True
-                self.logger.log_info("VPN conectada exitosamente (Linux)")
-                return True
-            else:
-                self.logger.log_error(f"Error conectando VPN: {result.stderr}")
-                return False
-
-        except Exception as e:
-            self.logger.log_error(f"Error en conexión VPN Linux: {e}")
-            raise VPNConnectionError(f"Error conectando VPN: {e}")
+    PLATFORM = "Linux"
+
+    def build_command(self, profile: Path, credentials_path: Optional[str] = None) -> List[str]:
+        cmd = [
+            "pkexec",
+            "openvpn",
+            "--config",
+            str(profile),
+            "--daemon",
+            "--log",
+            "/tmp/openvpn.log",
+        ]
+
+        if credentials_path:
+            cmd.extend(["--auth-user-pass", credentials_path])
+        return cmd
+
+    def launch(self, command: List[str], gated: Optional[subprocess.Popen] = None) -> bool:
+        return self._run_daemon(command, gated)
 
     def disconnect(self) -> bool:
         try:
@@ -0,0 +1,10 @@
+"""Servidor dummy de port knocking (knockd)
+
+Componentes reutilizables por `server_knock.py` y por los harness de pruebas.
+"""
+
+from .server import KnockServer
+from .async_server import AsyncKnockServer
+from .selector_loop import SelectorKnockLoop
+
+__all__ = ["KnockServer", "AsyncKnockServer", "SelectorKnockLoop"]
@@ -0,0 +1,224 @@
+"""
+Servidor de port knocking sobre asyncio (knocks TCP y UDP)
+
+Pensado para embeberse en harness de pruebas:
+
+    server = AsyncKnockServer([7000, "8000/udp"], 1194)
+    task = asyncio.create_task(server.serve())
+    await server.wait_started()
+    ...
+    server.stop()
+    await task
+"""
+
+import asyncio
+import socket
+from typing import List, Optional
+
+from .selector_loop import drain_accept
+from .server import KnockServer
+
+
+class _TCPKnockProtocol(asyncio.Protocol):
+    """Fallback para loops sin add_reader (Proactor en Windows)"""
+
+    __slots__ = ("server", "port")
+
+    def __init__(self, server: KnockServer, port: int):
+        self.server = server
+        self.port = port
+
+    def connection_made(self, transport):
+        peer = transport.get_extra_info("peername")
+        transport.close()
+        if peer:
+            self.server.handle_knock(peer[0], self.port, "tcp")
+
+
+class _UDPKnockProtocol(asyncio.DatagramProtocol):
+    """Cada datagrama recibido cuenta como knock (el payload se ignora)"""
+
+    def __init__(self, server: KnockServer, port: int):
+        self.server = server
+        self.port = port
+
+    def datagram_received(self, data, addr):
+        self.server.handle_knock(addr[0], self.port, "udp")
+
+    def error_received(self, exc):
+        # ICMP port unreachable y similares no afectan al listener
+        pass
+
+
+class AsyncKnockServer(KnockServer):
+    """KnockServer cuyo motor es un event loop asyncio (sin threads por socket)
+
+    Los listeners TCP se atienden con loop.add_reader() y accept() en lote:
+    create_server()/start_server() crean una Task y un transport por conexión,
+    lo que triplica el costo por knock. Si el loop no soporta add_reader se
+    usa create_server() como fallback.
+    """
+
+    def __init__(
+        self,
+        knock_ports,
+        target_port,
+        config_path=None,
+        override_interval=None,
+        host="127.0.0.1",
+        backlog=128,
+        window=None,
+        log=None,
+        log_rate=None,
+    ):
+        super().__init__(
+            knock_ports,
+            target_port,
+            config_path=config_path,
+            override_interval=override_interval,
+            host=host,
+            window=window,
+            log=log,
+            log_rate=log_rate,
+        )
+        self.engine = "asyncio"
+        self.backlog = backlog
+        self._aio_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.max_batch = 64
+        self._tcp_servers: List[asyncio.AbstractServer] = []
+        self._tcp_sockets: List[socket.socket] = []
+        self._udp_transports: List[asyncio.DatagramTransport] = []
+        self._started: Optional[asyncio.Event] = None
+        self._closed: Optional[asyncio.Event] = None
+        self._tick_handle: Optional[asyncio.TimerHandle] = None
+
+    def _ensure_events(self):
+        # Los Event se crean dentro del loop (requisito en Python 3.9)
+        if self._started is None:
+            self._started = asyncio.Event()
+            self._closed = asyncio.Event()
+
+    async def start_serving(self):
+        """Abre todos los listeners TCP/UDP y retorna sin bloquear"""
+        self._ensure_events()
+        self._aio_loop = asyncio.get_running_loop()
+        self._running = True
+
+        for port, protocol in self.listen_knocks:
+            if protocol == "udp":
+                transport, _ = await self._aio_loop.create_datagram_endpoint(
+                    lambda port=port: _UDPKnockProtocol(self, port),
+                    local_addr=(self.host, port),
+                )
+                self._udp_transports.append(transport)
+            else:
+                await self._listen_tcp(port)
+            self.log(f"[knockd] Escuchando knocks en puerto {port}/{protocol}")
+
+        self._tick_handle = self._aio_loop.call_later(self.timers.tick, self._on_tick)
+        self._started.set()
+
+    def _on_tick(self):
+        """Avanza la rueda de timers desde el propio loop y reprograma el tick"""
+        self.timers.advance()
+        if self._running:
+            self._tick_handle = self._aio_loop.call_later(self.timers.tick, self._on_tick)
+
+    async def _listen_tcp(self, port: int):
+        """Registra un listener TCP no bloqueante en el loop"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, port))
+        sock.listen(self.backlog)
+        sock.setblocking(False)
+
+        try:
+            self._aio_loop.add_reader(
+                sock.fileno(),
+                drain_accept,
+                sock,
+                port,
+                self.handle_knock,
+                self.max_batch,
+                self.log,
+            )
+        except NotImplementedError:
+            server = await self._aio_loop.create_server(
+                lambda: _TCPKnockProtocol(self, port), sock=sock
+            )
+            self._tcp_servers.append(server)
+            return
+        self._tcp_sockets.append(sock)
+
+    def _watch_protected(self, sock, port):
+        """Atiende el puerto protegido desde el mismo loop"""
+        if self._aio_loop is None:
+            return super()._watch_protected(sock, port)
+        sock.setblocking(False)
+        try:
+            self._aio_loop.add_reader(sock.fileno(), self._drain_protected, sock, port)
+        except NotImplementedError:
+            sock.setblocking(True)
+            super()._watch_protected(sock, port)
+
+    def _unwatch_protected(self, sock):
+        if self._aio_loop is not None and sock.fileno() >= 0:
+            try:
+                self._aio_loop.remove_reader(sock.fileno())
+            except NotImplementedError:
+                pass
+
+    async def wait_started(self):
+        """Espera a que serve() haya abierto todos los listeners"""
+        self._ensure_events()
+        await self._started.wait()
+
+    async def serve(self):
+        """Atiende knocks hasta que se llame a stop() o se cancele la tarea"""
+        self._ensure_events()
+        if not self._started.is_set():
+            await self.start_serving()
+            self._print_banner()
+        try:
+            await self._closed.wait()
+        finally:
+            await self.aclose()
+
+    def stop(self):
+        """Solicita la detención de serve() (seguro desde cualquier thread)"""
+        self._running = False
+        if self._aio_loop is not None and self._closed is not None:
+            self._aio_loop.call_soon_threadsafe(self._closed.set)
+
+    async def aclose(self):
+        """Cierra todos los listeners"""
+        self._running = False
+        if self._tick_handle is not None:
+            self._tick_handle.cancel()
+            self._tick_handle = None
+        for sock in self._tcp_sockets:
+            self._aio_loop.remove_reader(sock.fileno())
+            sock.close()
+        for server in self._tcp_servers:
+            server.close()
+        for server in self._tcp_servers:
+            await server.wait_closed()
+        for transport in self._udp_transports:
+            transport.close()
+        self._tcp_sockets = []
+        self._tcp_servers = []
+        self._udp_transports = []
+        self.sampler.flush()
+        with self._vpn_lock:
+            self.grants.clear()
+            for port in list(self.vpn_sockets):
+                self._close_vpn_port(port)
+
+    def start(self, block=True):
+        """Compatibilidad con KnockServer: ejecuta serve() en un loop propio"""
+        if not block:
+            raise ValueError("AsyncKnockServer: usar 'await serve()' para modo no bloqueante")
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\n\nServidor detenido.")
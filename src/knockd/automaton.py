@@ -0,0 +1,110 @@
+"""
+Autómata de prefijos (Aho-Corasick) para reconocer secuencias de knock
+
+Cada IP de origen guarda un único entero: el nodo del trie compartido que
+representa el sufijo más largo de sus knocks que es prefijo de alguna
+secuencia. Cada knock avanza el estado con a lo sumo dos búsquedas en
+diccionario, sin importar el largo ni la cantidad de secuencias, y un knock
+equivocado retrocede al prefijo solapado más largo en vez de descartar todo
+el progreso. Con una sola secuencia el autómata equivale a KMP.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .sequence import Knock
+
+
+class KnockAutomaton:
+    """DFA compilado sobre pares (puerto, protocolo)"""
+
+    __slots__ = ("sequences", "length", "_root", "_rows", "_depth", "_matches", "_leaf")
+
+    def __init__(self, sequence: Iterable[Knock]):
+        self._build([tuple(sequence)])
+
+    @classmethod
+    def from_sequences(cls, sequences: Iterable[Sequence[Knock]]) -> "KnockAutomaton":
+        """Compila varias secuencias en un único trie compartido"""
+        automaton = cls.__new__(cls)
+        automaton._build([tuple(seq) for seq in sequences])
+        return automaton
+
+    def _build(self, sequences: List[Tuple[Knock, ...]]):
+        if not sequences or any(len(seq) == 0 for seq in sequences):
+            raise ValueError("La secuencia de knocks no puede estar vacía")
+
+        self.sequences = tuple(sequences)
+        self.length = max(len(seq) for seq in sequences)
+
+        # 1) Trie de todas las secuencias (estado 0 = raíz)
+        goto: List[Dict[Knock, int]] = [{}]
+        depth = [0]
+        ends: List[List[int]] = [[]]
+        for index, seq in enumerate(sequences):
+            state = 0
+            for knock in seq:
+                nxt = goto[state].get(knock)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][knock] = nxt
+                    goto.append({})
+                    depth.append(depth[state] + 1)
+                    ends.append([])
+                state = nxt
+            ends[state].append(index)
+
+        # 2) Enlaces de fallo por BFS. Cada fila guarda las transiciones que no
+        #    salen de la raíz; las de la raíz se consultan aparte en step(), así
+        #    ninguna fila hereda el abanico completo de primeros knocks.
+        fail = [0] * len(goto)
+        rows: List[Dict[Knock, int]] = [{} for _ in goto]
+        matches: List[Tuple[int, ...]] = [()] * len(goto)
+        queue = deque(goto[0].values())
+        for child in queue:
+            rows[child] = dict(goto[child])
+            matches[child] = tuple(ends[child])
+        while queue:
+            state = queue.popleft()
+            for knock, child in goto[state].items():
+                fallback = rows[fail[state]].get(knock)
+                if fallback is None:
+                    fallback = goto[0].get(knock, 0)
+                fail[child] = fallback
+                rows[child] = {**rows[fail[child]], **goto[child]}
+                matches[child] = tuple(ends[child]) + matches[fail[child]]
+                queue.append(child)
+
+        self._root = goto[0]
+        self._rows = rows
+        self._depth = depth
+        self._matches = matches
+        self._leaf = [not children for children in goto]
+
+    def step(self, state: int, knock: Knock) -> int:
+        """Avanza el estado con un knock (O(1))"""
+        nxt = self._rows[state].get(knock)
+        if nxt is None:
+            return self._root.get(knock, 0)
+        return nxt
+
+    def depth(self, state: int) -> int:
+        """Cantidad de knocks reconocidos en el estado"""
+        return self._depth[state]
+
+    def matches(self, state: int) -> Tuple[int, ...]:
+        """Índices de las secuencias que terminan en el estado"""
+        return self._matches[state]
+
+    def is_complete(self, state: int) -> bool:
+        """True si alguna secuencia termina en el estado"""
+        return bool(self._matches[state])
+
+    def is_leaf(self, state: int) -> bool:
+        """True si ninguna secuencia continúa desde el estado"""
+        return self._leaf[state]
+
+    @property
+    def state_count(self) -> int:
+        """Cantidad de nodos del trie (incluida la raíz)"""
+        return len(self._rows)
@@ -0,0 +1,255 @@
+"""
+Detección de knocks por captura (AF_PACKET + BPF clásico), sin accept()
+
+Un único socket AF_PACKET recibe sólo los paquetes que pasan un filtro BPF
+compilado para los puertos de knock: SYN TCP (sin ACK) y datagramas UDP
+dirigidos a esos puertos. Nunca hay listener en los puertos de knock: el
+kernel responde RST / ICMP unreachable, así que para un escáner se ven
+cerrados y no se asigna un socket por knock.
+
+Las cabeceras se leen con recv_into() sobre un buffer reutilizable y
+struct.unpack_from() sobre un memoryview, sin copias por paquete.
+Requiere Linux y CAP_NET_RAW (root). Sólo IPv4.
+
+`build_source_filter()` arma el filtro del puerto protegido: adjunto al
+socket en escucha, el kernel descarta el SYN de las IPs sin autorización
+antes del handshake.
+"""
+
+import ctypes
+import socket
+import struct
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .sequence import Knock
+
+# Constantes de <linux/if_ether.h>, <linux/filter.h> y <linux/if_packet.h>
+ETH_P_IP = 0x0800
+SO_ATTACH_FILTER = getattr(socket, "SO_ATTACH_FILTER", 26)
+PACKET_OUTGOING = getattr(socket, "PACKET_OUTGOING", 4)
+_SKF_AD_PKTTYPE = (-0x1000 + 4) & 0xFFFFFFFF
+# En sockets TCP/UDP los datos arrancan en el transporte; la cabecera IP va desde SKF_NET_OFF
+_SKF_NET_OFF = -0x100000
+
+_LD_W_ABS = 0x20
+_LD_H_ABS = 0x28
+_LD_B_ABS = 0x30
+_LDX_B_MSH = 0xB1  # X = 4 * (pkt[k] & 0x0f): largo de la cabecera IP
+_LD_H_IND = 0x48
+_LD_B_IND = 0x50
+_ALU_AND_K = 0x54
+_JEQ_K = 0x15
+_JSET_K = 0x45
+_RET_K = 0x06
+_JA = 0x05
+
+_TCP_SYN = 0x02
+_TCP_ACK = 0x10
+
+# Límite de instrucciones de un programa BPF clásico (BPF_MAXINSNS)
+_MAX_INSNS = 4096
+
+# Cabecera IP máxima (60) + cabecera TCP hasta los flags: alcanza para parsear
+SNAPLEN = 96
+
+_PORT = struct.Struct("!H")
+
+Instruction = Tuple[int, int, int, int]
+
+
+def _assemble(program: List[tuple]) -> List[Instruction]:
+    """Resuelve etiquetas de salto: cada entrada es (op, k, jt, jf) o un nombre de etiqueta
+
+    En BPF_JA el destino va en `k` (32 bits); jt/jf sólo saltan hasta 255 instrucciones.
+    """
+    labels: Dict[str, int] = {}
+    code: List[tuple] = []
+    for item in program:
+        if isinstance(item, str):
+            labels[item] = len(code)
+        else:
+            code.append(item)
+
+    def offset(target, index, limit=255):
+        if target is None:
+            return 0
+        jump = labels[target] - index - 1
+        if not 0 <= jump <= limit:
+            raise ValueError("Demasiados puertos de knock para un filtro BPF")
+        return jump
+
+    assembled = []
+    for i, (op, k, jt, jf) in enumerate(code):
+        if op == _JA:
+            k = offset(k, i, 0xFFFFFFFF)
+        assembled.append((op, k, offset(jt, i), offset(jf, i)))
+    return assembled
+
+
+def build_knock_filter(knocks: Iterable[Knock], host: Optional[str] = None) -> List[Instruction]:
+    """Compila el filtro BPF para los knocks dados (datos desde la cabecera IP)
+
+    Retorna instrucciones (code, k, jt, jf). Si `host` es una IP concreta,
+    sólo acepta paquetes dirigidos a ella. Admite hasta ~250 puertos por protocolo.
+    """
+    tcp_ports = sorted({port for port, protocol in knocks if protocol == "tcp"})
+    udp_ports = sorted({port for port, protocol in knocks if protocol == "udp"})
+
+    program: List[tuple] = [
+        # Descartar la copia saliente (en loopback cada paquete se ve dos veces)
+        (_LD_W_ABS, _SKF_AD_PKTTYPE, None, None),
+        (_JEQ_K, PACKET_OUTGOING, "drop", None),
+    ]
+    if host and host != "0.0.0.0":
+        address = struct.unpack("!I", socket.inet_aton(host))[0]
+        program += [(_LD_W_ABS, 16, None, None), (_JEQ_K, address, None, "drop")]
+    program += [
+        # Fragmentos no iniciales no traen cabecera de transporte
+        (_LD_H_ABS, 6, None, None),
+        (_JSET_K, 0x1FFF, "drop", None),
+        (_LD_B_ABS, 9, None, None),
+        (_JEQ_K, socket.IPPROTO_TCP, "tcp", None),
+        (_JEQ_K, socket.IPPROTO_UDP, None, "drop"),
+        (_JA, "udp", None, None),
+        "drop",
+        (_RET_K, 0, None, None),
+        # TCP: sólo SYN sin ACK (el primer paquete del handshake)
+        "tcp",
+        (_LDX_B_MSH, 0, None, None),
+        (_LD_B_IND, 13, None, None),
+        (_ALU_AND_K, _TCP_SYN | _TCP_ACK, None, None),
+        (_JEQ_K, _TCP_SYN, None, "tcp_miss"),
+        (_LD_H_IND, 2, None, None),
+    ]
+    program += [(_JEQ_K, port, "tcp_hit", None) for port in tcp_ports]
+    program += [
+        "tcp_miss",
+        (_RET_K, 0, None, None),
+        "tcp_hit",
+        (_RET_K, SNAPLEN, None, None),
+        "udp",
+        (_LDX_B_MSH, 0, None, None),
+        (_LD_H_IND, 2, None, None),
+    ]
+    program += [(_JEQ_K, port, "udp_hit", None) for port in udp_ports]
+    program += [
+        (_RET_K, 0, None, None),
+        "udp_hit",
+        (_RET_K, SNAPLEN, None, None),
+    ]
+    return _assemble(program)
+
+
+def build_source_filter(sources: Optional[Iterable[str]]) -> List[Instruction]:
+    """Compila el filtro de un socket en escucha que sólo deja pasar a `sources`
+
+    El resto de los paquetes (incluido el SYN) se descarta antes del
+    handshake: para quien no está autorizado el puerto no contesta. Sin
+    fuentes descarta todo; con sources=None acepta todo. Sólo IPv4.
+
+    Raises:
+        ValueError: si hay más fuentes de las que entran en un programa BPF
+    """
+    if sources is None:
+        return [(_RET_K, 0xFFFFFFFF, 0, 0)]
+    addresses = sorted({struct.unpack("!I", socket.inet_aton(ip))[0] for ip in sources})
+    if 2 * len(addresses) + 2 > _MAX_INSNS:
+        raise ValueError("Demasiadas IPs autorizadas para un filtro BPF")
+    program: List[Instruction] = [(_LD_W_ABS, (_SKF_NET_OFF + 12) & 0xFFFFFFFF, 0, 0)]
+    for address in addresses:
+        # Coincide: sigue a la instrucción que acepta; si no, la salta
+        program += [(_JEQ_K, address, 0, 1), (_RET_K, 0xFFFFFFFF, 0, 0)]
+    program.append((_RET_K, 0, 0, 0))
+    return program
+
+
+def attach_filter(sock: socket.socket, program: List[Instruction]):
+    """Adjunta un programa BPF clásico al socket (SO_ATTACH_FILTER)"""
+    raw = b"".join(struct.pack("HBBI", code, jt, jf, k) for code, k, jt, jf in program)
+    filters = ctypes.create_string_buffer(raw, len(raw))
+    # struct sock_fprog { unsigned short len; struct sock_filter *filter; }
+    fprog = struct.pack("HP", len(program), ctypes.addressof(filters))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+
+def parse_knock_packet(view: memoryview, length: int) -> Optional[Tuple[str, int, str]]:
+    """Extrae (ip_origen, puerto_destino, protocolo) de un paquete IPv4
+
+    Retorna None si el paquete no es un knock (truncado, no SYN, otro protocolo).
+    """
+    if length < 20 or view[0] >> 4 != 4:
+        return None
+    ihl = (view[0] & 0x0F) * 4
+    proto = view[9]
+    if proto == socket.IPPROTO_TCP:
+        if length < ihl + 14 or view[ihl + 13] & (_TCP_SYN | _TCP_ACK) != _TCP_SYN:
+            return None
+        protocol = "tcp"
+    elif proto == socket.IPPROTO_UDP:
+        if length < ihl + 4:
+            return None
+        protocol = "udp"
+    else:
+        return None
+    (port,) = _PORT.unpack_from(view, ihl + 2)
+    return socket.inet_ntoa(view[12:16]), port, protocol
+
+
+class PacketCapture:
+    """Socket AF_PACKET con filtro BPF que entrega knocks ya parseados"""
+
+    def __init__(
+        self,
+        knocks: Iterable[Knock],
+        host: Optional[str] = None,
+        interface: Optional[str] = None,
+        max_batch: int = 64,
+    ):
+        if not hasattr(socket, "AF_PACKET"):
+            raise RuntimeError("El motor capture requiere AF_PACKET (Linux)")
+        self.knocks = list(knocks)
+        self.max_batch = max_batch
+        self._buffer = bytearray(SNAPLEN)
+        self._view = memoryview(self._buffer)
+
+        try:
+            self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_DGRAM, socket.htons(ETH_P_IP))
+        except PermissionError:
+            raise PermissionError("El motor capture requiere CAP_NET_RAW (ejecutar como root)")
+        try:
+            attach_filter(self.sock, build_knock_filter(self.knocks, host))
+            if interface:
+                self.sock.bind((interface, socket.htons(ETH_P_IP)))
+            self.sock.setblocking(False)
+            # Descartar lo que se encoló antes de que el filtro estuviera puesto
+            while True:
+                self.sock.recv_into(self._buffer)
+        except BlockingIOError:
+            pass
+        except Exception:
+            self.sock.close()
+            raise
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def drain(self, on_knock: Callable[[str, int, str], None]) -> int:
+        """Lee paquetes hasta EAGAIN (o max_batch) y notifica cada knock"""
+        handled = 0
+        recv_into = self.sock.recv_into
+        buffer, view = self._buffer, self._view
+        for _ in range(self.max_batch):
+            try:
+                length = recv_into(buffer)
+            except BlockingIOError:
+                break
+            except InterruptedError:
+                continue
+            knock = parse_knock_packet(view, length)
+            if knock is not None:
+                handled += 1
+                on_knock(*knock)
+        return handled
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,106 @@
+"""
+Autorizaciones por cliente sobre los puertos protegidos
+
+Cada secuencia completada otorga una ventana (ip, puerto, vencimiento) sólo
+a la IP que golpeó. La tabla está indexada por (ip, puerto): verificar una
+conexión entrante al puerto protegido es una búsqueda O(1) en un dict, sin
+importar cuántas autorizaciones haya vigentes. Además lleva la cuenta de
+autorizaciones por puerto para saber cuándo cerrarlo.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class Grant:
+    """Autorización vigente de una IP sobre un puerto"""
+
+    __slots__ = ("ip", "port", "expiry", "policy", "timer")
+
+    def __init__(self, ip: str, port: int, expiry: float, policy: Optional[str] = None):
+        self.ip = ip
+        self.port = port
+        self.expiry = expiry
+        self.policy = policy
+        self.timer = None
+
+    def __repr__(self):
+        return f"Grant({self.ip!r}, {self.port}, expiry={self.expiry:.3f})"
+
+
+class GrantTable:
+    """Autorizaciones indexadas por (ip, puerto) con conteo por puerto"""
+
+    def __init__(self):
+        self._grants: Dict[Tuple[str, int], Grant] = {}
+        self._per_port: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._grants)
+
+    def __contains__(self, key: Tuple[str, int]) -> bool:
+        return key in self._grants
+
+    def get(self, ip: str, port: int) -> Optional[Grant]:
+        """Autorización de la IP sobre el puerto (aunque ya haya vencido) o None"""
+        return self._grants.get((ip, port))
+
+    def grant(
+        self, ip: str, port: int, expiry: float, policy: Optional[str] = None
+    ) -> Tuple[Grant, bool]:
+        """Otorga o extiende la ventana. Retorna (autorización, es_nueva)"""
+        with self._lock:
+            grant = self._grants.get((ip, port))
+            if grant is not None:
+                grant.expiry = max(grant.expiry, expiry)
+                grant.policy = policy
+                return grant, False
+            grant = self._grants[(ip, port)] = Grant(ip, port, expiry, policy)
+            self._per_port[port] = self._per_port.get(port, 0) + 1
+            return grant, True
+
+    def allows(self, ip: str, port: int, now: Optional[float] = None) -> bool:
+        """True si la IP tiene una ventana vigente sobre el puerto"""
+        grant = self._grants.get((ip, port))
+        if grant is None:
+            return False
+        if now is None:
+            now = time.monotonic()
+        return now < grant.expiry
+
+    def revoke(self, ip: str, port: int) -> int:
+        """Quita la autorización. Retorna cuántas quedan sobre el puerto"""
+        with self._lock:
+            grant = self._grants.pop((ip, port), None)
+            if grant is None:
+                return self._per_port.get(port, 0)
+            if grant.timer is not None:
+                grant.timer.cancel()
+                grant.timer = None
+            remaining = self._per_port[port] - 1
+            if remaining:
+                self._per_port[port] = remaining
+            else:
+                del self._per_port[port]
+            return remaining
+
+    def active_on(self, port: int) -> int:
+        """Cantidad de autorizaciones sobre el puerto"""
+        return self._per_port.get(port, 0)
+
+    def sources(self, port: int) -> List[str]:
+        """IPs con autorización sobre el puerto (para el filtro del listener)"""
+        with self._lock:
+            return [ip for ip, granted_port in self._grants if granted_port == port]
+
+    def clear(self):
+        """Revoca todas las autorizaciones"""
+        with self._lock:
+            for grant in self._grants.values():
+                if grant.timer is not None:
+                    grant.timer.cancel()
+                    grant.timer = None
+            self._grants.clear()
+            self._per_port.clear()
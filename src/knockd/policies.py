@@ -0,0 +1,90 @@
+"""
+Políticas de knock: secuencia -> puerto protegido, TTL y redes permitidas
+
+Formato en config.json:
+
+    "policies": [
+        {
+            "name": "equipo-a",
+            "knock_sequence": [[7000, "tcp"], [8000, "udp"]],
+            "target_port": 1194,
+            "ttl": 30,          # opcional; por defecto "grant_window" (30 s)
+            "allowed_cidrs": ["10.0.0.0/8"]
+        }
+    ]
+"""
+
+import ipaddress
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .sequence import Knock, normalize_sequence
+
+DEFAULT_POLICY_TTL = 30.0
+
+
+class KnockPolicy:
+    """Una secuencia que abre un puerto durante `ttl` segundos"""
+
+    __slots__ = ("name", "sequence", "target_port", "ttl", "allowed")
+
+    def __init__(
+        self,
+        name: str,
+        sequence: Iterable,
+        target_port: int,
+        ttl: float = DEFAULT_POLICY_TTL,
+        allowed_cidrs: Optional[Iterable[str]] = None,
+    ):
+        self.name = name
+        self.sequence: Tuple[Knock, ...] = tuple(normalize_sequence(sequence))
+        if not self.sequence:
+            raise ValueError(f"Política {name}: secuencia vacía")
+        self.target_port = int(target_port)
+        if not 1 <= self.target_port <= 65535:
+            raise ValueError(f"Política {name}: puerto objetivo inválido {target_port}")
+        self.ttl = float(ttl)
+        if self.ttl <= 0:
+            raise ValueError(f"Política {name}: ttl debe ser positivo")
+        # Tupla vacía = sin restricción de origen
+        self.allowed = tuple(ipaddress.ip_network(c, strict=False) for c in allowed_cidrs or ())
+
+    def allows(self, ip: str) -> bool:
+        """True si la IP de origen pertenece a alguna red permitida"""
+        if not self.allowed:
+            return True
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        return any(address in network for network in self.allowed)
+
+    def __repr__(self):
+        return f"KnockPolicy({self.name!r}, target_port={self.target_port}, ttl={self.ttl})"
+
+
+def policy_from_dict(
+    data: Dict[str, Any], index: int = 0, default_ttl: float = DEFAULT_POLICY_TTL
+) -> KnockPolicy:
+    """Construye una política desde su representación en config.json"""
+    try:
+        return KnockPolicy(
+            name=str(data.get("name", f"policy-{index}")),
+            sequence=data["knock_sequence"],
+            target_port=data["target_port"],
+            ttl=data.get("ttl", default_ttl),
+            allowed_cidrs=data.get("allowed_cidrs"),
+        )
+    except KeyError as e:
+        raise ValueError(f"Política #{index}: campo requerido faltante: {e.args[0]}")
+
+
+def load_policies(cfg: Dict[str, Any], default_ttl: Optional[float] = None) -> List[KnockPolicy]:
+    """Lee la lista `policies` de la configuración (vacía si no existe)
+
+    Las políticas sin `ttl` usan `default_ttl` o, si no se indica, `grant_window`.
+    """
+    if default_ttl is None:
+        default_ttl = cfg.get("grant_window", DEFAULT_POLICY_TTL)
+    return [
+        policy_from_dict(item, i, default_ttl) for i, item in enumerate(cfg.get("policies", []))
+    ]
@@ -0,0 +1,183 @@
+"""
+Muestreo de los eventos de alto volumen del servidor de knocks
+
+Durante un escaneo cada knock de cada IP generaba una línea ("Knock
+recibido", "Secuencia incorrecta", conexiones rechazadas...). `LogSampler`
+limita esas líneas con un token bucket por IP de origen más uno global, y
+cuenta lo que descarta: cada `interval` segundos emite un resumen
+"N eventos suprimidos" por IP (las que más suprimieron) y uno agregado para
+el resto. Los eventos de seguridad (secuencias completas, autorizaciones,
+vencimientos) no pasan por el sampler y se registran siempre.
+
+Uso: `if sampler.allow(ip, "knock"): log(...)`; la línea sólo se formatea
+si se va a escribir.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Líneas por segundo y ráfaga por IP de origen
+DEFAULT_LOG_RATE = 2.0
+DEFAULT_LOG_BURST = 20
+# Tope de líneas muestreadas por segundo entre todas las IPs (0 = sin tope)
+DEFAULT_LOG_GLOBAL_RATE = 100.0
+# Cada cuánto se resumen los eventos suprimidos (segundos)
+DEFAULT_SUMMARY_INTERVAL = 10.0
+# IPs con bucket propio; las menos recientes se desalojan (LRU)
+DEFAULT_SAMPLED_SOURCES = 4096
+# IPs con línea propia en cada resumen; el resto va agregado
+DEFAULT_SUMMARY_TOP = 5
+
+
+class _Bucket:
+    """Token bucket de una IP y sus eventos suprimidos por tipo"""
+
+    __slots__ = ("tokens", "stamp", "suppressed")
+
+    def __init__(self, tokens: float, stamp: float):
+        self.tokens = tokens
+        self.stamp = stamp
+        self.suppressed: Optional[Dict[str, int]] = None
+
+
+def _merge(target: Dict[str, int], counts: Dict[str, int]):
+    for kind, count in counts.items():
+        target[kind] = target.get(kind, 0) + count
+
+
+def _describe(counts: Dict[str, int]) -> Tuple[int, str]:
+    """Total y detalle "tipo: N" ordenado de mayor a menor"""
+    ordered = sorted(counts.items(), key=lambda item: -item[1])
+    return sum(counts.values()), ", ".join(f"{kind}: {count}" for kind, count in ordered)
+
+
+class LogSampler:
+    """Token buckets por IP (y global) con resúmenes periódicos de lo suprimido"""
+
+    def __init__(
+        self,
+        log: Callable[[str], None],
+        rate: float = DEFAULT_LOG_RATE,
+        burst: int = DEFAULT_LOG_BURST,
+        global_rate: float = DEFAULT_LOG_GLOBAL_RATE,
+        interval: float = DEFAULT_SUMMARY_INTERVAL,
+        max_sources: int = DEFAULT_SAMPLED_SOURCES,
+        top: int = DEFAULT_SUMMARY_TOP,
+        schedule: Optional[Callable] = None,
+    ):
+        """
+        Args:
+            log: Salida de las líneas de resumen (la misma del servidor)
+            rate: Líneas por segundo por IP (0 = sin muestreo, todo pasa)
+            burst: Líneas seguidas que una IP puede emitir antes de limitarse
+            global_rate: Líneas por segundo entre todas las IPs (0 = sin tope)
+            interval: Segundos entre resúmenes de eventos suprimidos
+            max_sources: IPs con bucket propio (LRU)
+            top: IPs con línea propia en cada resumen
+            schedule: call_later(delay, callback) para agendar el resumen (p. ej.
+                      TimerWheel.call_later); sin él, el resumen sale con el
+                      siguiente evento pasado el intervalo
+        """
+        if rate < 0 or global_rate < 0 or burst < 1 or interval <= 0 or max_sources < 1:
+            raise ValueError("Parámetros de muestreo inválidos")
+        self.log = log
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.global_rate = float(global_rate)
+        self.interval = float(interval)
+        self.max_sources = max_sources
+        self.top = top
+        self.schedule = schedule
+        self.enabled = self.rate > 0
+        # Total histórico de líneas suprimidas
+        self.suppressed = 0
+
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self._global = _Bucket(max(self.burst, self.global_rate), time.monotonic())
+        # Suprimidos de IPs desalojadas antes del resumen
+        self._orphaned: Dict[str, int] = {}
+        self._pending = False
+        self._summary_due = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self, ip: str, kind: str, now: Optional[float] = None) -> bool:
+        """True si la línea de `ip` debe escribirse; si no, la cuenta como suprimida"""
+        if not self.enabled:
+            return True
+        if now is None:
+            now = time.monotonic()
+        schedule_summary = False
+        with self._lock:
+            bucket = self._buckets.get(ip)
+            if bucket is None:
+                if len(self._buckets) >= self.max_sources:
+                    _, evicted = self._buckets.popitem(last=False)
+                    if evicted.suppressed:
+                        _merge(self._orphaned, evicted.suppressed)
+                bucket = self._buckets[ip] = _Bucket(self.burst, now)
+            else:
+                self._buckets.move_to_end(ip)
+                refill = max(0.0, now - bucket.stamp) * self.rate
+                bucket.tokens = min(self.burst, bucket.tokens + refill)
+                bucket.stamp = now
+
+            glob = self._global
+            if self.global_rate:
+                refill = max(0.0, now - glob.stamp) * self.global_rate
+                glob.tokens = min(max(self.burst, self.global_rate), glob.tokens + refill)
+                glob.stamp = now
+
+            if bucket.tokens >= 1 and (not self.global_rate or glob.tokens >= 1):
+                bucket.tokens -= 1
+                glob.tokens -= 1
+                allowed = True
+            else:
+                if bucket.suppressed is None:
+                    bucket.suppressed = {}
+                bucket.suppressed[kind] = bucket.suppressed.get(kind, 0) + 1
+                self.suppressed += 1
+                allowed = False
+                if not self._pending:
+                    self._pending = True
+                    self._summary_due = now + self.interval
+                    schedule_summary = self.schedule is not None
+
+            summary_now = self.schedule is None and self._pending and now >= self._summary_due
+
+        # Fuera del lock: el timer puede disparar flush() desde otro thread
+        if schedule_summary:
+            self.schedule(self.interval, self.flush)
+        if summary_now:
+            self.flush()
+        return allowed
+
+    def flush(self) -> List[str]:
+        """Emite el resumen de lo suprimido desde el último resumen y lo retorna"""
+        with self._lock:
+            pending = []
+            for ip, bucket in self._buckets.items():
+                if bucket.suppressed:
+                    pending.append((ip, bucket.suppressed))
+                    bucket.suppressed = None
+            others = self._orphaned
+            self._orphaned = {}
+            self._pending = False
+
+        pending.sort(key=lambda item: -sum(item[1].values()))
+        lines = []
+        for ip, counts in pending[: self.top]:
+            total, detail = _describe(counts)
+            lines.append(f"[knockd] {total} eventos suprimidos de {ip} ({detail})")
+        rest = pending[self.top :]
+        # Las IPs desalojadas ya no se pueden contar: se informan como "otros orígenes"
+        sources = "otros orígenes" if others else f"{len(rest)} IPs más"
+        for _, counts in rest:
+            _merge(others, counts)
+        if others:
+            total, detail = _describe(others)
+            lines.append(f"[knockd] {total} eventos suprimidos de {sources} ({detail})")
+        for line in lines:
+            self.log(line)
+        return lines
@@ -0,0 +1,171 @@
+"""
+Bucle de eventos único (selectors/epoll) para los puertos de knock
+
+Si recibe una `TimerWheel`, el mismo loop la avanza: el timeout de select()
+se acorta hasta el próximo tick en lugar de usar threads para los timers.
+"""
+
+import errno
+import selectors
+import socket
+from typing import Callable, Dict, Optional, Tuple
+
+# Errores de accept() que afectan a una sola conexión y no al listener
+_TRANSIENT_ACCEPT_ERRORS = (errno.ECONNABORTED, errno.EPROTO, errno.EINTR)
+
+
+def drain_accept(
+    sock: socket.socket,
+    port: int,
+    on_knock: Callable[[str, int, str], None],
+    max_batch: int,
+    log: Callable[[str], None] = print,
+) -> int:
+    """Acepta y cierra conexiones de un listener no bloqueante hasta EAGAIN
+
+    Cada conexión aceptada se notifica como knock TCP; los errores van a `log`.
+    Retorna cuántas se atendieron.
+    """
+    handled = 0
+    while handled < max_batch:
+        try:
+            conn, addr = sock.accept()
+        except BlockingIOError:
+            break
+        except OSError as e:
+            if e.errno in _TRANSIENT_ACCEPT_ERRORS:
+                continue
+            log(f"Error en puerto {port}: {e}")
+            break
+
+        conn.close()
+        handled += 1
+        on_knock(addr[0], port, "tcp")
+    return handled
+
+
+class SelectorKnockLoop:
+    """Atiende todos los listeners de knock desde un único hilo"""
+
+    def __init__(
+        self,
+        on_knock: Callable[[str, int, str], None],
+        host: str = "127.0.0.1",
+        backlog: int = 128,
+        max_batch: int = 64,
+        timers=None,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self.on_knock = on_knock
+        self.timers = timers
+        # Salida de errores de los listeners (la misma del servidor)
+        self.log = log or print
+        self.host = host
+        self.backlog = backlog
+        # Tope de accepts por evento para no monopolizar el loop con un solo puerto
+        self.max_batch = max_batch
+        self.selector = selectors.DefaultSelector()
+        self.listeners: Dict[Tuple[int, str], socket.socket] = {}
+        self._running = False
+
+    def add_listener(
+        self, port: int, protocol: str = "tcp", sock: Optional[socket.socket] = None
+    ) -> socket.socket:
+        """Crea un listener no bloqueante y lo registra en el selector
+
+        Si se pasa `sock` (ya enlazado, ej. heredado de un proceso padre) se usa tal cual.
+        """
+        if sock is None:
+            if protocol == "udp":
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            else:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.host, port))
+            if protocol != "udp":
+                sock.listen(self.backlog)
+        sock.setblocking(False)
+
+        self.selector.register(sock, selectors.EVENT_READ, data=(port, protocol))
+        self.listeners[(port, protocol)] = sock
+        return sock
+
+    def watch(self, sock: socket.socket, callback: Callable[[socket.socket], None]):
+        """Registra un socket extra (ej. puerto protegido); callback(sock) al estar listo"""
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ, data=callback)
+
+    def unwatch(self, sock: socket.socket):
+        """Quita un socket registrado con watch()"""
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+
+    def run_once(self, timeout: Optional[float] = None) -> int:
+        """Procesa los eventos pendientes. Retorna la cantidad de knocks atendidos"""
+        handled = 0
+        for key, _ in self.selector.select(timeout):
+            if callable(key.data):
+                key.data(key.fileobj)
+                continue
+            port, protocol = key.data
+            if protocol == "udp":
+                handled += self._drain_udp(key.fileobj, port)
+            else:
+                handled += self._drain(key.fileobj, port)
+        return handled
+
+    def _drain(self, sock: socket.socket, port: int) -> int:
+        """Acepta conexiones en lote hasta EAGAIN (o hasta max_batch)"""
+        return drain_accept(sock, port, self.on_knock, self.max_batch, self.log)
+
+    def _drain_udp(self, sock: socket.socket, port: int) -> int:
+        """Lee datagramas en lote hasta EAGAIN (o hasta max_batch)"""
+        handled = 0
+        while handled < self.max_batch:
+            try:
+                _, addr = sock.recvfrom(2048)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                # ICMP port unreachable previo u otros errores por datagrama
+                if e.errno in _TRANSIENT_ACCEPT_ERRORS + (errno.ECONNREFUSED,):
+                    continue
+                self.log(f"Error en puerto {port}/udp: {e}")
+                break
+
+            handled += 1
+            self.on_knock(addr[0], port, "udp")
+        return handled
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        """Ejecuta el loop hasta que se llame a stop()"""
+        self._running = True
+        try:
+            while self._running:
+                timeout = poll_interval
+                if self.timers is not None:
+                    until_tick = self.timers.time_until_next_tick()
+                    if until_tick is not None:
+                        timeout = min(timeout, until_tick)
+                self.run_once(timeout)
+                if self.timers is not None:
+                    self.timers.advance()
+        finally:
+            self.close()
+
+    def stop(self):
+        """Solicita la detención del loop (efectiva en el próximo poll)"""
+        self._running = False
+
+    def close(self):
+        """Cierra listeners y selector"""
+        for sock in self.listeners.values():
+            try:
+                self.selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
+            sock.close()
+        self.listeners.clear()
+        self.selector.close()
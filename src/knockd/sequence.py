@@ -0,0 +1,43 @@
+"""
+Normalización de secuencias de knock a pares (puerto, protocolo)
+"""
+
+from typing import Iterable, List, Tuple
+
+PROTOCOLS = ("tcp", "udp")
+
+Knock = Tuple[int, str]
+
+
+def parse_knock(value) -> Knock:
+    """Convierte 7000, "7000", "7000/udp", [7000, "udp"] o (7000, "udp") en (puerto, protocolo)
+
+    Un tercer elemento (payload del cliente, p.ej. [7000, "udp", "abc"]) se ignora:
+    el servidor identifica knocks sólo por puerto y protocolo.
+    """
+    if isinstance(value, (list, tuple)):
+        if len(value) not in (2, 3):
+            raise ValueError(f"Knock inválido: {value!r}")
+        port, protocol = value[0], value[1]
+    elif isinstance(value, str) and "/" in value:
+        port, protocol = value.split("/", 1)
+    else:
+        port, protocol = value, "tcp"
+
+    port = int(port)
+    protocol = str(protocol).lower()
+    if not 1 <= port <= 65535:
+        raise ValueError(f"Puerto fuera de rango: {port}")
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"Protocolo no soportado: {protocol}")
+    return port, protocol
+
+
+def normalize_sequence(items: Iterable) -> List[Knock]:
+    """Normaliza una secuencia completa de knocks"""
+    return [parse_knock(item) for item in items]
+
+
+def format_knock(knock: Knock) -> str:
+    """Representación compacta "puerto/protocolo" para logs"""
+    return f"{knock[0]}/{knock[1]}"
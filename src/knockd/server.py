@@ -0,0 +1,581 @@
+"""
+Servidor dummy de port knocking
+
+Expone `KnockServer` con tres motores de escucha:
+- "threads": un hilo bloqueante por puerto de knock (modo original)
+- "selector": un único loop selectors/epoll para todos los puertos
+- "capture": SYN/UDP leídos de un socket AF_PACKET con filtro BPF, sin
+  listeners en los puertos de knock (requiere root)
+
+El motor asyncio vive en `async_server.AsyncKnockServer`.
+Los knocks se identifican como pares (puerto, protocolo); una secuencia
+puede mezclar knocks TCP y UDP. Varias políticas (`policies` en config.json)
+se reconocen a la vez con un único autómata compartido.
+"""
+
+import socket
+import struct
+import threading
+import time
+import json
+from datetime import datetime
+from pathlib import Path
+
+from .selector_loop import SelectorKnockLoop
+from .automaton import KnockAutomaton
+from .capture import PacketCapture, attach_filter, build_source_filter
+from .grants import GrantTable
+from .policies import DEFAULT_POLICY_TTL, KnockPolicy, load_policies
+from .sampling import DEFAULT_LOG_BURST, DEFAULT_LOG_RATE, DEFAULT_SUMMARY_INTERVAL, LogSampler
+from .sequence import format_knock
+from .state_table import SourceStateTable
+from .timer_wheel import TimerWheel
+
+ENGINES = ("threads", "selector", "capture")
+
+# Máximo de IPs con secuencia en curso que se recuerdan a la vez
+DEFAULT_MAX_SOURCES = 65536
+
+# open_vpn_port() sin IP autoriza a cualquier origen (comportamiento original)
+ANY_SOURCE = "*"
+
+# SO_LINGER {on, 0}: close() envía RST a las conexiones no autorizadas
+_LINGER_RESET = struct.pack("ii", 1, 0)
+
+
+class KnockServer:
+    def __init__(
+        self,
+        knock_ports,
+        target_port,
+        config_path=None,
+        override_interval=None,
+        engine="threads",
+        host="127.0.0.1",
+        policies=None,
+        window=None,
+        sockets=None,
+        log=None,
+        log_rate=None,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"Motor desconocido: {engine} (opciones: {', '.join(ENGINES)})")
+        if sockets and engine != "selector":
+            raise ValueError("Los sockets heredados requieren el motor selector")
+
+        self.engine = engine
+        self.host = host
+        # Salida de eventos (knocks, secuencias, accesos); p. ej. un logger asíncrono
+        self.log = log or print
+        self.vpn_sockets = {}
+        self._vpn_lock = threading.Lock()
+        # Autorizaciones (ip, puerto, vencimiento) de quienes completaron una secuencia
+        self.grants = GrantTable()
+        # Filtro BPF por IP en el puerto protegido (se desactiva si el SO no lo admite)
+        self._source_filter = hasattr(socket, "AF_PACKET")
+        self._listeners = []
+        # Sockets ya enlazados por (puerto, protocolo), ej. de workers SO_REUSEPORT.
+        # Un puerto protegido heredado escucha siempre; su filtro sólo deja pasar a los autorizados
+        self._inherited = dict(sockets or {})
+        self._loop = None
+        self._capture = None
+        self._loop_thread = None
+        self._ticker_thread = None
+        self._running = False
+        # Vencimientos de secuencias y cierres de puertos (sin un thread por timer)
+        self.timers = TimerWheel(log=self.log)
+
+        # Cargar configuración (desde ruta proporcionada o local)
+        try:
+            if config_path:
+                cfg_path = Path(config_path)
+            else:
+                cfg_path = Path(__file__).parent.parent / "config.json"
+
+            if cfg_path.exists():
+                with open(cfg_path, "r", encoding="utf-8") as f:
+                    cfg = json.load(f)
+            else:
+                cfg = {}
+        except Exception:
+            cfg = {}
+
+        # Ventana de acceso por defecto: argumento > 'grant_window' en config.json > 30 s
+        if window is None:
+            window = cfg.get("grant_window", DEFAULT_POLICY_TTL)
+        self.GRANT_WINDOW = float(window)
+
+        # Políticas: argumento explícito > 'policies' en config.json > secuencia única
+        if policies is None:
+            policies = load_policies(cfg, self.GRANT_WINDOW)
+        if not policies:
+            policies = [KnockPolicy("default", knock_ports, target_port, ttl=self.GRANT_WINDOW)]
+        self.policies = list(policies)
+
+        self.knock_sequence = list(self.policies[0].sequence)
+        self.knock_ports = [port for port, _ in self.knock_sequence]
+        self.target_port = self.policies[0].target_port
+        # Puertos únicos por protocolo de todas las políticas, en orden de aparición
+        self.listen_knocks = list(
+            dict.fromkeys(knock for policy in self.policies for knock in policy.sequence)
+        )
+        # Trie compartido: el costo por knock no depende de la cantidad de políticas
+        self.automaton = KnockAutomaton.from_sequences(p.sequence for p in self.policies)
+
+        # Líneas de knocks/rechazos por IP y segundo: argumento > 'log_rate' en config.json.
+        # Las secuencias completas y las autorizaciones no se muestrean
+        if log_rate is None:
+            log_rate = cfg.get("log_rate", DEFAULT_LOG_RATE)
+        self.sampler = LogSampler(
+            self.log,
+            rate=float(log_rate),
+            burst=int(cfg.get("log_burst", DEFAULT_LOG_BURST)),
+            interval=float(cfg.get("log_summary_interval", DEFAULT_SUMMARY_INTERVAL)),
+            schedule=self.timers.call_later,
+        )
+
+        # Timeout general para expirar secuencias (en segundos)
+        self.SEQUENCE_TIMEOUT = float(cfg.get("sequence_timeout", 5))
+
+        # Estado por IP de origen (nodo del trie + último knock), acotado en memoria
+        self.sources = SourceStateTable(
+            capacity=int(cfg.get("max_sources", DEFAULT_MAX_SOURCES)), ttl=self.SEQUENCE_TIMEOUT
+        )
+
+        # Cálculo de INTERVAL_MAX (más robusto): prioridad
+        # 1) override_interval (argumento de línea de comandos)
+        # 2) valor explícito en config.json -> 'interval'
+        # 3) si no existe, se calcula como SEQUENCE_TIMEOUT / (n_steps)
+        #    para distribuir el timeout entre los pasos de la secuencia
+        if override_interval is not None:
+            self.INTERVAL_MAX = float(override_interval)
+            self._interval_source = f"override ({self.INTERVAL_MAX}s)"
+        elif "interval" in cfg:
+            self.INTERVAL_MAX = float(cfg.get("interval"))
+            self._interval_source = "config.json"
+        else:
+            steps = max(1, (self.automaton.length - 1))
+            if steps == 0:
+                allowed = self.SEQUENCE_TIMEOUT
+            else:
+                allowed = float(self.SEQUENCE_TIMEOUT) / steps
+            self.INTERVAL_MAX = allowed
+            self._interval_source = f"computed (SEQUENCE_TIMEOUT/{steps} = {self.INTERVAL_MAX}s)"
+
+        # Sin knocks durante este lapso la secuencia en curso ya no puede avanzar
+        self._idle_limit = min(self.INTERVAL_MAX, self.SEQUENCE_TIMEOUT)
+
+    def handle_knock(self, ip, port, protocol="tcp"):
+        """Procesa un knock recibido (compartido por todos los motores)"""
+        now = time.monotonic()
+        sampler = self.sampler
+        entry = self.sources.get(ip)
+        state = entry.state if entry else 0
+
+        # Limpiar progreso antiguo (timeout)
+        if entry is not None:
+            time_delta = now - entry.last_seen
+            # Si ha pasado demasiado tiempo desde el último knock, reiniciar
+            if time_delta > self.SEQUENCE_TIMEOUT:
+                state = 0
+                if sampler.allow(ip, "timeout", now):
+                    self.log(f"[knockd] Secuencia de {ip} expiró por timeout general. Reiniciando.")
+
+            # Validación por intervalo entre knocks: si el delta supera
+            # el intervalo configurado, reiniciamos la secuencia.
+            elif time_delta > self.INTERVAL_MAX:
+                state = 0
+                if sampler.allow(ip, "intervalo", now):
+                    self.log(
+                        f"[knockd] Intervalo entre knocks ({time_delta:.3f}s) excede interval_max ({self.INTERVAL_MAX}s). Reiniciando secuencia de {ip}."
+                    )
+
+        previous = self.automaton.depth(state)
+        state = self.automaton.step(state, (port, protocol))
+        progress = self.automaton.depth(state)
+
+        if sampler.allow(ip, "knock", now):
+            timestamp = datetime.now().strftime("%H:%M:%S")
+            self.log(
+                f"[{timestamp}] Knock recibido de {ip} en puerto {port}/{protocol} | Progreso: {progress}/{self.automaton.length}"
+            )
+
+        # Verificar secuencia (puede completar más de una política a la vez)
+        matched = self.automaton.matches(state)
+        for index in matched:
+            policy = self.policies[index]
+            if not policy.allows(ip):
+                self.log(
+                    f"[knockd] ✗ {ip} completó '{policy.name}' pero no está en las redes permitidas"
+                )
+                continue
+
+            self.log(f"\n{'='*60}")
+            self.log(f"[knockd] ✓ SECUENCIA CORRECTA de {ip}! (política '{policy.name}')")
+            self.log(f"        Abriendo puerto {policy.target_port} para VPN")
+            self.log(f"{'='*60}\n")
+
+            self.open_vpn_port(policy, ip)
+
+        if matched:
+            # Reset, salvo que otra política más larga continúe desde aquí
+            if self.automaton.is_leaf(state):
+                state = 0
+        elif previous and progress != previous + 1:
+            # Knock fuera de secuencia: el autómata conserva el solapamiento válido
+            if sampler.allow(ip, "secuencia incorrecta", now):
+                if progress:
+                    self.log(
+                        f"[knockd] ✗ Secuencia incorrecta de {ip}. Se conserva prefijo {progress}."
+                    )
+                else:
+                    self.log(f"[knockd] ✗ Secuencia incorrecta de {ip}. Reiniciando.")
+
+        entry = self.sources.put(ip, state, now)
+        if entry is not None:
+            # Reprogramar el vencimiento de la secuencia en curso
+            if entry.timer is not None:
+                entry.timer.cancel()
+            entry.timer = self.timers.schedule(
+                now + self._idle_limit, self._expire_source, ip, entry
+            )
+
+    def _expire_source(self, ip, entry):
+        """Descarta la secuencia en curso de una IP que dejó de golpear"""
+        if self.sources.get(ip) is not entry:
+            return
+        if entry.timer is not None and entry.timer.active:
+            # Llegó un knock mientras el timer vencía; ese knock ya reprogramó
+            return
+        self.sources.put(ip, 0)
+        if self.sampler.allow(ip, "expirada"):
+            self.log(f"[knockd] Secuencia de {ip} expiró sin completarse. Reiniciando.")
+
+    def listen_knock(self, port):
+        """Escucha intentos de conexión en un puerto de knock"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, port))
+        sock.listen(5)
+        self._listeners.append(sock)
+
+        self.log(f"[knockd] Escuchando knocks en puerto {port}")
+
+        while self._running:
+            try:
+                conn, addr = sock.accept()
+                conn.close()
+                self.handle_knock(addr[0], port)
+            except Exception as e:
+                if not self._running:
+                    break
+                self.log(f"Error en puerto {port}: {e}")
+
+    def listen_knock_udp(self, port):
+        """Escucha knocks UDP (cualquier datagrama cuenta como knock)"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, port))
+        self._listeners.append(sock)
+
+        self.log(f"[knockd] Escuchando knocks UDP en puerto {port}")
+
+        while self._running:
+            try:
+                _, addr = sock.recvfrom(2048)
+                self.handle_knock(addr[0], port, "udp")
+            except Exception as e:
+                if not self._running:
+                    break
+                self.log(f"Error en puerto {port}/udp: {e}")
+
+    @property
+    def vpn_port_open(self):
+        """True si hay algún puerto protegido abierto"""
+        return bool(self.vpn_sockets)
+
+    def open_vpn_port(self, policy=None, ip=None):
+        """Autoriza a `ip` sobre el puerto protegido durante la ventana de la política
+
+        El puerto se abre con la primera autorización y se cierra cuando vence
+        la última. Cada IP tiene su propia ventana; volver a completar la
+        secuencia la extiende. El filtro del listener sólo deja pasar el SYN
+        de las IPs autorizadas.
+        """
+        port = policy.target_port if policy else self.target_port
+        window = policy.ttl if policy else self.GRANT_WINDOW
+        ip = ip or ANY_SOURCE
+
+        with self._vpn_lock:
+            grant, new = self.grants.grant(
+                ip, port, time.monotonic() + window, policy.name if policy else None
+            )
+            if port in self.vpn_sockets:
+                if new:
+                    self._filter_sources(port)
+            elif not self._open_protected_port(port):
+                self.grants.revoke(ip, port)
+                return
+            if grant.timer is not None:
+                grant.timer.cancel()
+            grant.timer = self.timers.schedule(grant.expiry, self._expire_grant, grant)
+
+        action = "autorizado" if new else "extendido"
+        self.log(f"[VPN] Acceso de {ip} a puerto {port} {action} por {window:g}s")
+
+    def _open_protected_port(self, port):
+        """Abre el listener del puerto protegido (llamar con _vpn_lock tomado)"""
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.host, port))
+            # Filtro antes de listen(): ningún SYN sin autorización llega a completar el handshake
+            self._filter_sources(port, sock)
+            sock.listen(128)
+        except Exception as e:
+            self.log(f"[VPN] Error: {e}")
+            return False
+
+        self.vpn_sockets[port] = sock
+        self._watch_protected(sock, port)
+
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.log(f"[{timestamp}] [VPN] Puerto {port} ABIERTO ✓")
+        return True
+
+    def _filter_sources(self, port, sock=None):
+        """Ajusta el filtro BPF del listener a las IPs autorizadas (con _vpn_lock tomado)
+
+        Sin filtro (otro SO, o más IPs de las que entran en un programa BPF)
+        el handshake se completa y _admit() rechaza tras accept() con RST.
+        """
+        sock = sock or self.vpn_sockets.get(port)
+        if sock is None or not self._source_filter:
+            return
+        sources = self.grants.sources(port)
+        try:
+            try:
+                program = build_source_filter(None if ANY_SOURCE in sources else sources)
+            except ValueError:
+                program = build_source_filter(None)
+            attach_filter(sock, program)
+        except OSError as e:
+            self._source_filter = False
+            self.log(f"[VPN] Aviso: sin filtro por IP en el puerto {port} ({e})")
+
+    def _watch_protected(self, sock, port):
+        """Atiende el puerto protegido con el motor activo"""
+        if self._loop is not None:
+            self._loop.watch(sock, lambda s: self._drain_protected(s, port))
+        else:
+            t = threading.Thread(target=self._serve_protected, args=(sock, port), daemon=True)
+            t.start()
+
+    def _unwatch_protected(self, sock):
+        if self._loop is not None:
+            self._loop.unwatch(sock)
+
+    def _serve_protected(self, sock, port):
+        """Motor de threads: acepta conexiones al puerto protegido hasta su cierre"""
+        while True:
+            try:
+                conn, addr = sock.accept()
+            except OSError:
+                break
+            self._admit(conn, addr[0], port)
+
+    def _drain_protected(self, sock, port):
+        """Motores de loop: acepta conexiones al puerto protegido hasta EAGAIN"""
+        for _ in range(64):
+            try:
+                conn, addr = sock.accept()
+            except BlockingIOError:
+                break
+            except OSError as e:
+                self.log(f"[VPN] Error en puerto {port}: {e}")
+                break
+            self._admit(conn, addr[0], port)
+
+    def _admit(self, conn, ip, port):
+        """Deja pasar la conexión sólo si la IP tiene una ventana vigente (O(1))"""
+        if self.grants.allows(ip, port) or self.grants.allows(ANY_SOURCE, port):
+            self.log(f"[VPN] Conexión de {ip} a puerto {port} autorizada")
+        else:
+            try:
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RESET)
+            except OSError:
+                pass
+            if self.sampler.allow(ip, "rechazada"):
+                self.log(f"[VPN] ✗ Conexión de {ip} a puerto {port} rechazada (sin autorización)")
+        conn.close()
+
+    def _expire_grant(self, grant):
+        """Revoca una autorización vencida y cierra el puerto si era la última"""
+        with self._vpn_lock:
+            if self.grants.get(grant.ip, grant.port) is not grant:
+                return
+            grant.timer = None
+            remaining = self.grants.revoke(grant.ip, grant.port)
+            self.log(f"[VPN] Acceso de {grant.ip} a puerto {grant.port} vencido")
+            if not remaining and (grant.port, "tcp") not in self._inherited:
+                self._close_vpn_port(grant.port)
+            else:
+                self._filter_sources(grant.port)
+
+    def _close_vpn_port(self, port):
+        """Cierra el puerto protegido (llamar con _vpn_lock tomado)"""
+        sock = self.vpn_sockets.pop(port, None)
+        if sock is None:
+            return
+        self._unwatch_protected(sock)
+        try:
+            # shutdown() desbloquea el accept() del motor de threads
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.log(f"[{timestamp}] [VPN] Puerto {port} cerrado (sin autorizaciones vigentes)")
+
+    def _run_timers(self):
+        """Motor de threads: un único ticker avanza la rueda de timers"""
+        while self._running:
+            time.sleep(self.timers.tick)
+            self.timers.advance()
+
+    def _start_threads(self):
+        """Motor original: un thread por puerto de knock"""
+        for port, protocol in self.listen_knocks:
+            target = self.listen_knock_udp if protocol == "udp" else self.listen_knock
+            t = threading.Thread(target=target, args=(port,), daemon=True)
+            t.start()
+        self._ticker_thread = threading.Thread(target=self._run_timers, daemon=True)
+        self._ticker_thread.start()
+
+    def _start_selector(self):
+        """Motor selector: todos los listeners en un único loop"""
+        self._loop = SelectorKnockLoop(
+            self.handle_knock, host=self.host, timers=self.timers, log=self.log
+        )
+        for port, protocol in self.listen_knocks:
+            self._loop.add_listener(port, protocol, sock=self._inherited.get((port, protocol)))
+            self.log(f"[knockd] Escuchando knocks en puerto {port}/{protocol}")
+        for port in self._inherited_protected_ports():
+            sock = self._inherited[(port, "tcp")]
+            self.vpn_sockets[port] = sock
+            with self._vpn_lock:
+                self._filter_sources(port)
+            self._watch_protected(sock, port)
+
+    def _start_capture(self):
+        """Motor capture: knocks desde un socket AF_PACKET, sin handshake ni accept()"""
+        self._loop = SelectorKnockLoop(
+            self.handle_knock, host=self.host, timers=self.timers, log=self.log
+        )
+        self._capture = PacketCapture(self.listen_knocks, host=self.host)
+        self._loop.watch(self._capture.sock, lambda _: self._capture.drain(self.handle_knock))
+        for port, protocol in self.listen_knocks:
+            self.log(f"[knockd] Capturando knocks en puerto {port}/{protocol}")
+
+    def _inherited_protected_ports(self):
+        """Puertos protegidos cuyo socket fue heredado"""
+        ports = dict.fromkeys(policy.target_port for policy in self.policies)
+        return [port for port in ports if (port, "tcp") in self._inherited]
+
+    def _print_banner(self):
+        """Imprime el resumen de configuración al iniciar"""
+        print("\n" + "=" * 60)
+        print("  Servidor de Port Knocking (dummy) iniciado")
+        print("=" * 60)
+        if len(self.policies) == 1:
+            print(f"  Puertos de knock: {[format_knock(k) for k in self.knock_sequence]}")
+            print(f"  Puerto VPN: {self.target_port}")
+        else:
+            print(
+                f"  Políticas: {len(self.policies)} ({self.automaton.state_count} nodos en el trie)"
+            )
+            print(f"  Puertos de knock: {len(self.listen_knocks)}")
+        print(f"  Motor: {self.engine}")
+        print(f"  Timeout de secuencia: {self.SEQUENCE_TIMEOUT}s")
+        print(f"  Máximo de orígenes en seguimiento: {self.sources.capacity}")
+        print(f"  Ventana de acceso por cliente: {self.GRANT_WINDOW:g}s")
+        print(f"  Intervalo máximo permitido entre knocks (interval_max): {self.INTERVAL_MAX}s")
+        if self.sampler.enabled:
+            print(
+                f"  Logs de knocks por IP: {self.sampler.rate:g}/s (ráfaga {self.sampler.burst:g})"
+            )
+        print(f"  Interval source: {getattr(self, '_interval_source', 'unknown')}")
+        print("\n  Presiona Ctrl+C para detener")
+        print("=" * 60 + "\n")
+
+    def start(self, block=True):
+        """Inicia todos los listeners
+
+        Con block=False retorna tras arrancar los listeners (útil en tests y
+        benchmarks); detener luego con stop().
+        """
+        self._running = True
+        if self.engine == "selector":
+            self._start_selector()
+        elif self.engine == "capture":
+            self._start_capture()
+        else:
+            self._start_threads()
+
+        self._print_banner()
+
+        if not block:
+            if self._loop is not None:
+                self._loop_thread = threading.Thread(target=self._loop.serve_forever, daemon=True)
+                self._loop_thread.start()
+            return
+
+        try:
+            if self._loop is not None:
+                self._loop.serve_forever()
+            else:
+                while True:
+                    time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n\nServidor detenido.")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Detiene los listeners activos"""
+        self._running = False
+        if self._loop is not None:
+            self._loop.stop()
+            if (
+                self._loop_thread is not None
+                and self._loop_thread is not threading.current_thread()
+            ):
+                self._loop_thread.join()
+                self._loop_thread = None
+        if (
+            self._ticker_thread is not None
+            and self._ticker_thread is not threading.current_thread()
+        ):
+            self._ticker_thread.join()
+            self._ticker_thread = None
+        if self._capture is not None:
+            self._capture.close()
+            self._capture = None
+        for sock in self._listeners:
+            try:
+                # shutdown() desbloquea el accept() pendiente del thread
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._listeners = []
+        # Resumen final de lo suprimido desde el último intervalo
+        self.sampler.flush()
+        with self._vpn_lock:
+            self.grants.clear()
+            for port in list(self.vpn_sockets):
+                self._close_vpn_port(port)
@@ -0,0 +1,125 @@
+"""
+Tabla acotada de estado por IP de origen
+
+Reemplaza a los diccionarios por IP que crecían sin límite: la tabla tiene
+capacidad máxima, expira entradas inactivas tras `ttl` segundos y, si se
+llena, desaloja la IP usada hace más tiempo (LRU). Sólo se guardan IPs con
+progreso en alguna secuencia; un knock que no inicia ninguna no ocupa lugar.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class SourceState:
+    """Registro compacto por IP: nodo del autómata, último knock y timer de vencimiento"""
+
+    __slots__ = ("state", "last_seen", "timer")
+
+    def __init__(self, state: int, last_seen: float):
+        self.state = state
+        self.last_seen = last_seen
+        self.timer = None
+
+    def release(self):
+        """Cancela el timer asociado (al salir de la tabla)"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+
+class SourceStateTable:
+    """Estado por IP con capacidad máxima, expiración por TTL y desalojo LRU"""
+
+    # Entradas vencidas que se revisan en cada escritura (barrido amortizado)
+    SWEEP_BATCH = 4
+
+    def __init__(self, capacity: int = 65536, ttl: float = 5.0):
+        if capacity <= 0:
+            raise ValueError("La capacidad debe ser positiva")
+        self.capacity = capacity
+        self.ttl = float(ttl)
+        self.evictions = 0
+        self.expirations = 0
+        # Orden = último uso; como last_seen es monótono, el frente es lo más viejo
+        self._entries: "OrderedDict[str, SourceState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self._entries
+
+    def get(self, ip: str) -> Optional[SourceState]:
+        """Retorna el registro de la IP (incluso si ya venció) o None"""
+        return self._entries.get(ip)
+
+    def state_of(self, ip: str) -> int:
+        """Nodo del autómata de la IP (0 si no tiene progreso)"""
+        entry = self._entries.get(ip)
+        return entry.state if entry else 0
+
+    def put(self, ip: str, state: int, now: Optional[float] = None) -> Optional[SourceState]:
+        """Guarda el estado de la IP y retorna su registro; estado 0 libera la entrada"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            self._expire(now, self.SWEEP_BATCH)
+            if not state:
+                entry = self._entries.pop(ip, None)
+                if entry is not None:
+                    entry.release()
+                return None
+
+            entry = self._entries.get(ip)
+            if entry is not None:
+                entry.state = state
+                entry.last_seen = now
+                self._entries.move_to_end(ip)
+                return entry
+
+            if len(self._entries) >= self.capacity:
+                _, evicted = self._entries.popitem(last=False)
+                evicted.release()
+                self.evictions += 1
+            entry = self._entries[ip] = SourceState(state, now)
+            return entry
+
+    def expire(self, now: Optional[float] = None, limit: Optional[int] = None) -> int:
+        """Elimina entradas inactivas por más de `ttl`. Retorna cuántas expiró"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            return self._expire(now, limit)
+
+    def _expire(self, now: float, limit: Optional[int]) -> int:
+        deadline = now - self.ttl
+        expired = 0
+        entries = self._entries
+        while entries and (limit is None or expired < limit):
+            ip = next(iter(entries))
+            if entries[ip].last_seen >= deadline:
+                break
+            entries.pop(ip).release()
+            expired += 1
+        self.expirations += expired
+        return expired
+
+    def clear(self):
+        """Vacía la tabla (las estadísticas se conservan)"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.release()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Tamaño, capacidad, desalojos LRU y expiraciones por TTL"""
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,166 @@
+"""
+Timer wheel jerárquico para vencimientos del servidor de knocks
+
+Agenda vencimientos de secuencias (sequence_timeout / interval_max) y cierres
+de ventanas de puerto con inserción y cancelación O(1) y vencimiento O(1)
+amortizado por timer, sin un thread por timer. Lo avanza el loop del motor
+(selector, asyncio) o un único thread ticker en el motor de threads.
+
+Nivel 0: `slots` casilleros de `tick` segundos. Cada nivel superior cubre
+`slots` veces más tiempo; al completar una vuelta los timers del casillero
+correspondiente bajan (cascada) al nivel inferior.
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class Timer:
+    """Timer agendado; cancel() lo quita de la rueda en O(1)"""
+
+    __slots__ = ("deadline", "callback", "args", "_tick", "_bucket", "_wheel")
+
+    def __init__(self, deadline: float, callback: Callable, args: tuple, wheel: "TimerWheel"):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self._tick = 0
+        self._bucket: Optional[Dict["Timer", None]] = None
+        self._wheel = wheel
+
+    @property
+    def active(self) -> bool:
+        """True mientras el timer siga agendado"""
+        return self._bucket is not None
+
+    def cancel(self):
+        """Cancela el timer (no-op si ya venció o fue cancelado)"""
+        self._wheel.cancel(self)
+
+
+class TimerWheel:
+    """Rueda de timers jerárquica con `levels` niveles de `slots` casilleros"""
+
+    def __init__(
+        self,
+        tick: float = 0.05,
+        slots: int = 256,
+        levels: int = 4,
+        now: Optional[float] = None,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        if tick <= 0 or slots < 2 or levels < 1:
+            raise ValueError("Parámetros de timer wheel inválidos")
+        self.tick = float(tick)
+        self.slots = slots
+        self.levels = levels
+        self._origin = time.monotonic() if now is None else now
+        # Último tick procesado: todo timer con _tick <= _current ya venció
+        self._current = 0
+        self._wheels: List[List[Dict[Timer, None]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        # Timers más allá del último nivel; se reubican en cada vuelta completa
+        self._overflow: Dict[Timer, None] = {}
+        self._count = 0
+        self._lock = threading.RLock()
+        # Salida de los errores de callbacks (la misma del servidor)
+        self.log = log or print
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self, deadline: float, callback: Callable, *args) -> Timer:
+        """Agenda callback(*args) para el instante monotónico `deadline`"""
+        timer = Timer(deadline, callback, args, self)
+        with self._lock:
+            timer._tick = max(math.ceil((deadline - self._origin) / self.tick), self._current + 1)
+            self._place(timer)
+            self._count += 1
+        return timer
+
+    def call_later(self, delay: float, callback: Callable, *args) -> Timer:
+        """Agenda callback(*args) dentro de `delay` segundos"""
+        return self.schedule(time.monotonic() + delay, callback, *args)
+
+    def cancel(self, timer: Timer):
+        """Quita un timer de su casillero"""
+        with self._lock:
+            bucket = timer._bucket
+            if bucket is not None:
+                del bucket[timer]
+                timer._bucket = None
+                self._count -= 1
+
+    def _place(self, timer: Timer):
+        delta = timer._tick - self._current
+        granularity = 1
+        for level in range(self.levels):
+            if delta < granularity * self.slots:
+                bucket = self._wheels[level][(timer._tick // granularity) % self.slots]
+                break
+            granularity *= self.slots
+        else:
+            bucket = self._overflow
+        bucket[timer] = None
+        timer._bucket = bucket
+
+    def _cascade(self, bucket: Dict[Timer, None]):
+        timers = list(bucket)
+        bucket.clear()
+        for timer in timers:
+            self._place(timer)
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Ejecuta los timers vencidos hasta `now`. Retorna cuántos ejecutó"""
+        if now is None:
+            now = time.monotonic()
+        target = int((now - self._origin) // self.tick)
+
+        due: List[Timer] = []
+        with self._lock:
+            if self._count == 0:
+                self._current = max(self._current, target)
+                return 0
+
+            while self._current < target:
+                self._current += 1
+                current = self._current
+
+                # Cascada desde el nivel más alto para que los timers bajen en orden
+                if self._overflow and current % (self.slots**self.levels) == 0:
+                    self._cascade(self._overflow)
+                for level in range(self.levels - 1, 0, -1):
+                    granularity = self.slots**level
+                    if current % granularity == 0:
+                        self._cascade(self._wheels[level][(current // granularity) % self.slots])
+
+                bucket = self._wheels[0][current % self.slots]
+                if bucket:
+                    for timer in bucket:
+                        timer._bucket = None
+                    due.extend(bucket)
+                    self._count -= len(bucket)
+                    bucket.clear()
+
+                if self._count == 0:
+                    self._current = target
+                    break
+
+        for timer in due:
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                self.log(f"[knockd] Error en timer {getattr(timer.callback, '__name__', '?')}: {e}")
+        return len(due)
+
+    def time_until_next_tick(self, now: Optional[float] = None) -> Optional[float]:
+        """Segundos hasta el próximo tick, o None si no hay timers agendados"""
+        if self._count == 0:
+            return None
+        if now is None:
+            now = time.monotonic()
+        next_tick = self._origin + (self._current + 1) * self.tick
+        return max(0.0, next_tick - now)
@@ -0,0 +1,243 @@
+"""
+Modo multiproceso: N workers con SO_REUSEPORT sobre los mismos puertos
+
+Un proceso Python queda limitado a un núcleo. Con `--workers N` el proceso
+padre crea, para cada worker y en el mismo orden, un socket SO_REUSEPORT por
+puerto (knocks y puertos protegidos) y luego hace fork de los workers; cada
+uno corre el motor selector sobre sus propios sockets.
+
+El reparto por defecto del kernel usa el 4-tupla completo, así que dos knocks
+de la misma IP (con distinto puerto de origen) podrían caer en workers
+distintos y romper la secuencia. Para mantener el estado por IP consistente
+se adjunta a cada grupo un programa BPF clásico (SO_ATTACH_REUSEPORT_CBPF)
+que elige el socket `ip_origen % N`. Como todos los grupos se arman en el
+mismo orden, una IP cae siempre en el mismo worker, en todos los puertos.
+
+Los puertos protegidos escuchan durante toda la vida del proceso, así que
+cada socket protegido nace con un filtro BPF que descarta todos los SYN
+(adjunto antes de listen()); cada worker lo reemplaza por el de sus
+autorizaciones. Sin una secuencia válida el puerto no completa el handshake,
+igual que en los demás modos.
+
+El padre conserva sus copias de los sockets: si un worker muere, el índice
+de su socket en el grupo no cambia y se relanza otro worker con los mismos
+sockets. Sólo IPv4 (el servidor escucha en AF_INET).
+"""
+
+import ctypes
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .capture import Instruction, attach_filter, build_source_filter
+
+# Valores de <asm-generic/socket.h> / <linux/filter.h> (Python no los expone)
+SO_ATTACH_REUSEPORT_CBPF = getattr(socket, "SO_ATTACH_REUSEPORT_CBPF", 51)
+_SKF_NET_OFF = -0x100000
+_BPF_LD_W_ABS = 0x20  # A = *(u32 *)(pkt + k)
+_BPF_ALU_MOD_K = 0x94  # A %= k
+_BPF_RET_A = 0x16  # return A
+
+Endpoint = Tuple[int, str]
+
+
+def source_steering_program(workers: int) -> List[Tuple[int, int, int, int]]:
+    """Programa cBPF que retorna `ip_origen % workers` (índice en el grupo)"""
+    return [
+        # Dirección IPv4 de origen: offset 12 desde la cabecera de red
+        (_BPF_LD_W_ABS, 0, 0, (_SKF_NET_OFF + 12) & 0xFFFFFFFF),
+        (_BPF_ALU_MOD_K, 0, 0, workers),
+        (_BPF_RET_A, 0, 0, 0),
+    ]
+
+
+def attach_source_steering(sock: socket.socket, workers: int):
+    """Adjunta el programa de reparto por IP al grupo SO_REUSEPORT de `sock`"""
+    program = source_steering_program(workers)
+    raw = b"".join(struct.pack("HBBI", *insn) for insn in program)
+    filters = ctypes.create_string_buffer(raw, len(raw))
+    # struct sock_fprog { unsigned short len; struct sock_filter *filter; }
+    fprog = struct.pack("HP", len(program), ctypes.addressof(filters))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_REUSEPORT_CBPF, fprog)
+
+
+def reuseport_socket(
+    host: str,
+    port: int,
+    protocol: str,
+    backlog: int = 128,
+    program: Optional[List[Instruction]] = None,
+) -> socket.socket:
+    """Crea un socket enlazado con SO_REUSEPORT (y en escucha si es TCP)
+
+    `program` es un filtro BPF que se adjunta antes de escuchar.
+    """
+    kind = socket.SOCK_DGRAM if protocol == "udp" else socket.SOCK_STREAM
+    sock = socket.socket(socket.AF_INET, kind)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    if program is not None:
+        attach_filter(sock, program)
+    if protocol != "udp":
+        # El socket se suma al grupo al escuchar: el orden de listen() fija su índice
+        sock.listen(backlog)
+    return sock
+
+
+def _raise_interrupt(signum, frame):
+    # SIGTERM en el padre se trata igual que Ctrl+C
+    raise KeyboardInterrupt
+
+
+class ReusePortWorkers:
+    """Proceso padre: arma los grupos SO_REUSEPORT y supervisa los workers
+
+    `make_server(sockets)` construye el KnockServer (motor selector) de un
+    worker a partir de sus sockets {(puerto, protocolo): socket}; con
+    sockets=None sólo se usa para leer qué puertos abrir.
+    """
+
+    def __init__(
+        self,
+        make_server: Callable[[Optional[Dict[Endpoint, socket.socket]]], object],
+        workers: int,
+        host: str = "127.0.0.1",
+        backlog: int = 128,
+    ):
+        if workers < 1:
+            raise ValueError("La cantidad de workers debe ser positiva")
+        if not hasattr(socket, "SO_REUSEPORT") or not hasattr(os, "fork"):
+            raise RuntimeError("El modo --workers requiere SO_REUSEPORT y fork() (Linux)")
+        self.make_server = make_server
+        self.workers = workers
+        self.host = host
+        self.backlog = backlog
+        self.endpoints: List[Endpoint] = []
+        self.sockets: List[Dict[Endpoint, socket.socket]] = []
+        self.steering = False
+        self._pids: Dict[int, int] = {}
+        self._running = False
+
+    def bind(self):
+        """Crea los sockets de todos los workers y adjunta el reparto por IP"""
+        template = self.make_server(None)
+        protected = dict.fromkeys(policy.target_port for policy in template.policies)
+        self.endpoints = list(template.listen_knocks) + [(port, "tcp") for port in protected]
+        # Sin autorizaciones todavía: los puertos protegidos descartan todo SYN
+        drop_all = build_source_filter([])
+
+        for _ in range(self.workers):
+            self.sockets.append(
+                {
+                    (port, protocol): reuseport_socket(
+                        self.host,
+                        port,
+                        protocol,
+                        self.backlog,
+                        program=drop_all if protocol == "tcp" and port in protected else None,
+                    )
+                    for port, protocol in self.endpoints
+                }
+            )
+
+        self.steering = True
+        if self.workers > 1:
+            try:
+                for endpoint in self.endpoints:
+                    attach_source_steering(self.sockets[0][endpoint], self.workers)
+            except OSError as e:
+                # Sin BPF el kernel reparte por 4-tupla: una IP puede cambiar de worker
+                self.steering = False
+                print(f"[knockd] Aviso: no se pudo adjuntar el reparto por IP ({e})")
+
+    def _spawn(self, index: int) -> int:
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid:
+            self._pids[pid] = index
+            return pid
+
+        # Proceso hijo: cerrar las copias de los demás workers y atender las propias
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            for i, own in enumerate(self.sockets):
+                if i != index:
+                    for sock in own.values():
+                        sock.close()
+            server = self.make_server(self.sockets[index])
+            print(f"[knockd] Worker {index} (pid {os.getpid()}) iniciado")
+            server.start()
+        except KeyboardInterrupt:
+            pass
+        except BaseException as e:
+            print(f"[knockd] Worker {index} terminó con error: {e}")
+            code = 1
+        finally:
+            sys.stdout.flush()
+            os._exit(code)
+
+    def serve_forever(self):
+        """Lanza los workers y los relanza si mueren, hasta Ctrl+C o SIGTERM"""
+        if not self.sockets:
+            self.bind()
+        self._running = True
+        signal.signal(signal.SIGTERM, _raise_interrupt)
+
+        print(
+            f"[knockd] {self.workers} workers SO_REUSEPORT"
+            f" (reparto por IP de origen: {'sí' if self.steering else 'no'})"
+        )
+        for index in range(self.workers):
+            self._spawn(index)
+
+        try:
+            while self._running:
+                try:
+                    pid, status = os.waitpid(-1, 0)
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+                index = self._pids.pop(pid, None)
+                if index is not None and self._running:
+                    print(f"[knockd] Worker {index} (pid {pid}) terminó ({status}); relanzando")
+                    time.sleep(0.1)
+                    self._spawn(index)
+        except KeyboardInterrupt:
+            print("\n\nServidor detenido.")
+        finally:
+            self.stop()
+            self.close()
+
+    def stop(self):
+        """Detiene a todos los workers"""
+        self._running = False
+        for pid in list(self._pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._pids.pop(pid, None)
+        deadline = time.monotonic() + 5
+        while self._pids and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self._pids.pop(pid, None)
+            else:
+                time.sleep(0.05)
+
+    def close(self):
+        """Cierra las copias de los sockets que guarda el padre"""
+        for own in self.sockets:
+            for sock in own.values():
+                sock.close()
+        self.sockets = []
@@ -0,0 +1,235 @@
+"""
+Eventos estructurados en JSONL (una línea JSON por evento)
+
+Cada tipo de evento se declara una vez como `EventLayout`: el nombre y las
+claves ya quedan codificadas en bytes, así que emitir un evento sólo
+serializa los valores. El timestamp se formatea una vez por segundo
+(`TimestampCache`) y las líneas se escriben como bytes en un archivo con
+buffer: no hay un write() por evento, ni Formatter, ni json.dumps del dict
+completo.
+
+Con una `LogRotation` el sink cambia de archivo por día y por tamaño, como
+el log de texto. `read_events()` lee esos archivos (también los .gz
+rotados) en streaming para análisis.
+"""
+
+import atexit
+import gzip
+import json
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+from utils.constants import DEFAULT_EVENT_BUFFER_SIZE
+from .rotation import LogRotation
+
+
+def encode_value(value: Any) -> bytes:
+    """Valor JSON en bytes; los tipos comunes sin pasar por json.dumps"""
+    kind = type(value)
+    if kind is str:
+        # Texto ASCII imprimible sin comillas ni barras: no hace falta escapar
+        if value.isascii() and value.isprintable() and '"' not in value and "\\" not in value:
+            return b'"' + value.encode("ascii") + b'"'
+        return json.dumps(value, ensure_ascii=False).encode("utf-8")
+    if kind is int:
+        return str(value).encode("ascii")
+    if kind is float and math.isfinite(value):
+        return repr(value).encode("ascii")
+    if value is None:
+        return b"null"
+    if kind is bool:
+        return b"true" if value else b"false"
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class EventLayout:
+    """Tipo de evento con sus campos en orden fijo y las claves ya codificadas"""
+
+    __slots__ = ("event", "fields", "_head", "_keys")
+
+    def __init__(self, event: str, fields: Sequence[str]):
+        self.event = event
+        self.fields = tuple(fields)
+        self._head = b'","event":' + encode_value(event)
+        self._keys = tuple(b"," + encode_value(name) + b":" for name in self.fields)
+
+    def encode(self, timestamp: bytes, values: Sequence[Any]) -> bytes:
+        """Línea JSONL (con salto de línea) para `values` en el orden de `fields`"""
+        if len(values) != len(self._keys):
+            raise ValueError(
+                f"El evento {self.event} espera {len(self._keys)} valores, recibió {len(values)}"
+            )
+        parts = [b'{"timestamp":"', timestamp, self._head]
+        for key, value in zip(self._keys, values):
+            parts.append(key)
+            parts.append(encode_value(value))
+        parts.append(b"}\n")
+        return b"".join(parts)
+
+    def __repr__(self) -> str:
+        return f"EventLayout({self.event}, {list(self.fields)})"
+
+
+class TimestampCache:
+    """Hora local ISO 8601 con microsegundos; fecha y hora se arman una vez por segundo"""
+
+    def __init__(self):
+        # (segundo, "AAAA-MM-DDTHH:MM:SS" en bytes), reemplazado entero
+        self._cached: Tuple[int, bytes] = (-1, b"")
+
+    def now(self) -> bytes:
+        return self.format(time.time())
+
+    def format(self, now: float) -> bytes:
+        second = int(now)
+        cached_second, prefix = self._cached
+        if second != cached_second:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second)).encode("ascii")
+            self._cached = (second, prefix)
+        return prefix + b".%06d" % int((now - second) * 1_000_000)
+
+
+class JsonlEventSink:
+    """Archivo JSONL con buffer; seguro entre threads
+
+    El archivo se abre (en modo append) con el primer evento. Los eventos
+    quedan en el buffer hasta llenarlo, hasta flush() o hasta close().
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        buffer_size: int = DEFAULT_EVENT_BUFFER_SIZE,
+        rotation: Optional[LogRotation] = None,
+    ):
+        """
+        Args:
+            path: Archivo de eventos (con rotation, el activo lo decide la rotación)
+            buffer_size: Bytes en memoria antes de escribir
+            rotation: Rotación por día/tamaño con compresión y retención
+        """
+        if path is None and rotation is None:
+            raise ValueError("JsonlEventSink necesita path o rotation")
+        self.rotation = rotation
+        self.path = rotation.current_path() if rotation is not None else Path(path)
+        self.buffer_size = buffer_size
+        self.clock = TimestampCache()
+        self._file = None
+        self._size = 0
+        self._rollover_at = float("inf")
+        self._lock = threading.Lock()
+
+    def emit(self, layout: EventLayout, *values: Any, flush: bool = False):
+        """Escribe un evento; flush=True lo baja al archivo enseguida (p. ej. auditoría)"""
+        now = time.time()
+        line = layout.encode(self.clock.format(now), values)
+        with self._lock:
+            if self._file is None:
+                self._open(now)
+            elif self.rotation is not None and (
+                now >= self._rollover_at
+                or (self.rotation.max_bytes and self._size >= self.rotation.max_bytes)
+            ):
+                self._file.close()
+                self.path = self.rotation.rollover(self.path, now)
+                self._open(now)
+            self._file.write(line)
+            self._size += len(line)
+            if flush:
+                self._file.flush()
+
+    def _open(self, now: float):
+        if self.rotation is not None:
+            self.path = self.rotation.current_path(now)
+            self._rollover_at = self.rotation.next_midnight(now)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab", buffering=self.buffer_size)
+        self._size = self._file.tell()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_sinks: Dict[Path, JsonlEventSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_event_sink(
+    path: Union[str, Path], rotation: Optional[LogRotation] = None
+) -> JsonlEventSink:
+    """Sink compartido del proceso para `path` (un solo descriptor y buffer por archivo)
+
+    Con rotation, `path` es la plantilla (directorio/plantilla) que identifica al sink.
+    """
+    key = Path(path).absolute()
+    sink = _sinks.get(key)
+    if sink is None:
+        with _sinks_lock:
+            sink = _sinks.get(key)
+            if sink is None:
+                sink = _sinks[key] = JsonlEventSink(None if rotation else key, rotation=rotation)
+    return sink
+
+
+@atexit.register
+def close_event_sinks():
+    """Baja al disco y cierra todos los sinks compartidos"""
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+    for sink in sinks:
+        sink.close()
+
+
+def read_events(
+    source: Union[str, Path, Iterable[bytes]],
+    events: Optional[Iterable[str]] = None,
+    strict: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Recorre un archivo JSONL evento por evento, sin cargarlo entero
+
+    Args:
+        source: Ruta del archivo (.gz se descomprime al vuelo), o un iterable de
+                líneas en bytes (archivo abierto)
+        events: Sólo estos tipos de evento (se filtran antes de parsear el JSON)
+        strict: Levantar ValueError ante una línea inválida en vez de saltearla
+                (una última línea cortada por un cierre abrupto es lo habitual)
+    """
+    if isinstance(source, (str, Path)):
+        opener = gzip.open if str(source).endswith(".gz") else open
+        with opener(source, "rb") as f:
+            yield from read_events(f, events, strict)
+        return
+
+    wanted = frozenset(events) if events else None
+    markers = tuple(b'"event":' + encode_value(name) for name in wanted) if wanted else None
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        if markers is not None and not any(marker in line for marker in markers):
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError as e:
+            if strict:
+                raise ValueError(f"Línea {number} inválida: {e}") from e
+            continue
+        if wanted is not None and event.get("event") not in wanted:
+            continue
+        yield event
@@ -1,32 +1,250 @@
 """
 Sistema de logging estructurado
+
+Los mensajes de texto van al logger "VPNConnect" (archivo y consola); los
+eventos (intentos de conexión, latencias, auditoría) van como JSONL al
+archivo de eventos del día (ver monitoring.events). Ambos rotan por día y
+por tamaño, con compresión y retención en segundo plano (monitoring.rotation).
+
+En modo asíncrono (`async_mode=True` o `enable_async_logging()`) el logger
+sólo tiene un QueueHandler: quien loguea arma el mensaje y lo encola, y un
+QueueListener en segundo plano formatea y escribe en archivo y consola.
 """
 
+import atexit
 import logging
-import json
-from datetime import datetime
+import logging.handlers
+import queue
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 import os
 
-from utils.constants import LOG_DIRECTORY
+from utils.constants import (
+    LOG_DIRECTORY,
+    DEFAULT_LOG_QUEUE_SIZE,
+    DEFAULT_LOG_BLOCK_TIMEOUT,
+    DEFAULT_LOG_MAX_BYTES,
+    DEFAULT_LOG_RETENTION_DAYS,
+)
+from .events import EventLayout, get_event_sink
+from .rotation import DailyRotatingFileHandler, LogRotation
+
+# Qué hacer con un registro cuando la cola está llena
+OVERFLOW_POLICIES = ("drop", "block")
+
+
+# Eventos estructurados (timestamp y event van primero en cada línea)
+CONNECTION_ATTEMPT = EventLayout(
+    "connection_attempt", ("target_ip", "result", "duration_ms", "user")
+)
+FIREWALL_LATENCY = EventLayout(
+    "firewall_latency", ("target_ip", "target_port", "result", "elapsed_ms", "probes")
+)
+CONNECTION_PIPELINE = EventLayout(
+    "connection_pipeline", ("target_ip", "result", "failed_stage", "stages_ms")
+)
+KNOCK_SCHEDULE = EventLayout(
+    "knock_schedule",
+    ("target_ip", "completed", "max_lag_ms", "mean_lag_ms", "max_gap_error_ms", "knocks"),
+)
+AUDIT = EventLayout("audit", ("action", "details", "user"))
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler con cola acotada y política de desborde
+
+    "drop" descarta el registro nuevo; "block" espera lugar hasta block_timeout
+    (contrapresión sobre quien loguea) y recién ahí lo descarta. Los descartes
+    se cuentan y se informan con un aviso apenas la cola vuelve a tener lugar.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+        overflow: str = "drop",
+        block_timeout: float = DEFAULT_LOG_BLOCK_TIMEOUT,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Política de desborde desconocida: {overflow} (opciones: {', '.join(OVERFLOW_POLICIES)})"
+            )
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        # Total descartado y descartes todavía no informados
+        self.dropped = 0
+        self._unreported = 0
+        self._drop_lock = threading.Lock()
+
+    def handle(self, record):
+        # La cola ya es thread-safe: no hace falta el lock del handler
+        accepted = self.filter(record)
+        if accepted:
+            self.emit(record)
+        return accepted
+
+    def prepare(self, record):
+        """Deja en el registro sólo lo que no puede esperar al listener
+
+        El mensaje final y el traceback se arman acá (los argumentos y el
+        traceback pueden cambiar o liberarse); fecha y Formatter corren en el
+        listener. A diferencia de la clase base no copia el registro.
+        """
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.overflow == "block":
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            self._report_dropped(record.name)
+
+    def _report_dropped(self, name: str):
+        with self._drop_lock:
+            count, self._unreported = self._unreported, 0
+        notice = logging.LogRecord(
+            name,
+            logging.WARNING,
+            __file__,
+            0,
+            f"Cola de logging llena: se descartaron {count} registros",
+            None,
+            None,
+        )
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._drop_lock:
+                self._unreported += count
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera a que el listener escriba todo lo encolado; False si no llegó a tiempo"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        if self.listener is not None:
+            for handler in self.listener.handlers:
+                handler.flush()
+        return True
+
+
+class _BlockingQueueListener(logging.handlers.QueueListener):
+    """QueueListener cuyo stop() espera lugar para el centinela si la cola está llena"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+def get_queue_handler(logger: logging.Logger) -> Optional[BoundedQueueHandler]:
+    """QueueHandler del modo asíncrono de `logger`, o None si escribe directo"""
+    for handler in logger.handlers:
+        if isinstance(handler, BoundedQueueHandler):
+            return handler
+    return None
+
+
+def enable_async_logging(
+    logger: logging.Logger,
+    queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+    overflow: str = "drop",
+    block_timeout: float = DEFAULT_LOG_BLOCK_TIMEOUT,
+) -> BoundedQueueHandler:
+    """Pasa los handlers de `logger` detrás de una cola con un writer en segundo plano
+
+    Si ya estaba en modo asíncrono retorna el handler existente (con su
+    configuración). Al salir del proceso se vacía la cola.
+    """
+    handler = get_queue_handler(logger)
+    if handler is not None:
+        return handler
+    handler = BoundedQueueHandler(queue_size, overflow, block_timeout)
+    listener = _BlockingQueueListener(handler.queue, *logger.handlers, respect_handler_level=True)
+    handler.listener = listener
+    listener.start()
+    logger.handlers[:] = [handler]
+    atexit.register(disable_async_logging, logger)
+    return handler
+
+
+def disable_async_logging(logger: logging.Logger):
+    """Vuelve a la escritura directa: escribe lo encolado y detiene el listener"""
+    handler = get_queue_handler(logger)
+    if handler is None:
+        return
+    listener = handler.listener
+    # Los registros nuevos van directo; el listener termina de escribir la cola
+    logger.handlers[:] = [h for h in logger.handlers if h is not handler] + list(listener.handlers)
+    listener.stop()
+    handler.listener = None
+    for real in listener.handlers:
+        real.flush()
 
 
 class StructuredLogger:
     """Logger estructurado para auditoría y debugging"""
 
-    def __init__(self, log_file: Optional[str] = None):
+    def __init__(
+        self,
+        log_file: Optional[str] = None,
+        async_mode: bool = False,
+        queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+        overflow: str = "drop",
+        events_file: Optional[str] = None,
+        max_bytes: int = DEFAULT_LOG_MAX_BYTES,
+        retention_days: float = DEFAULT_LOG_RETENTION_DAYS,
+    ):
+        """
+        Args:
+            log_file: Archivo dentro de logs/ (por defecto uno por día)
+            async_mode: Escribir desde un thread en segundo plano (ver enable_async_logging)
+            queue_size: Registros en cola en modo asíncrono
+            overflow: "drop" o "block" cuando la cola está llena
+            events_file: Archivo JSONL de eventos dentro de logs/ (por defecto uno por día)
+            max_bytes: Tamaño a partir del cual se rota cada archivo (0 = sin tope)
+            retention_days: Días que se conservan los archivos rotados (comprimidos)
+
+        Los nombres pueden llevar "{date}" (AAAAMMDD): el archivo activo cambia
+        solo al pasar el día. Sin "{date}" el archivo del día anterior se
+        renombra a "<nombre>.N".
+        """
+        self.async_mode = async_mode
+        self.queue_size = queue_size
+        self.overflow = overflow
         self.log_dir = Path(LOG_DIRECTORY)
         self.log_dir.mkdir(exist_ok=True)
 
-        if log_file is None:
-            log_file = self.log_dir / f"vpn_connect_{datetime.now().strftime('%Y%m%d')}.log"
-        else:
-            log_file = self.log_dir / log_file
-
-        self.log_file = log_file
+        log_path = self.log_dir / (log_file or "vpn_connect_{date}.log")
+        self.rotation = LogRotation(log_path.parent, log_path.name, max_bytes, retention_days)
+        self.log_file = self.rotation.current_path()
         self.logger = self._setup_logger()
 
+        events_path = self.log_dir / (events_file or "events_{date}.jsonl")
+        self.events = get_event_sink(
+            events_path,
+            LogRotation(events_path.parent, events_path.name, max_bytes, retention_days),
+        )
+        self.user = os.getenv("USER", "unknown")
+
     def _setup_logger(self):
         logger = logging.getLogger("VPNConnect")
         logger.setLevel(logging.DEBUG)
@@ -34,10 +252,14 @@ class StructuredLogger:
         # Formato común para handlers
         formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
+        # En modo asíncrono los handlers reales están en el QueueListener
+        queue_handler = get_queue_handler(logger)
+        handlers = list(queue_handler.listener.handlers) if queue_handler else list(logger.handlers)
+
         # Inspeccionar handlers existentes
         existing_file_handler = None
         existing_stream_handler = None
-        for h in logger.handlers:
+        for h in handlers:
             if isinstance(h, logging.FileHandler):
                 existing_file_handler = h
             elif isinstance(h, logging.StreamHandler):
@@ -52,36 +274,36 @@ class StructuredLogger:
                 existing_path = None
 
             if existing_path != self.log_file.resolve():
-                logger.removeHandler(existing_file_handler)
+                handlers.remove(existing_file_handler)
                 try:
                     existing_file_handler.close()
                 except Exception:
                     pass
-                fh = logging.FileHandler(self.log_file, encoding="utf-8")
+                fh = DailyRotatingFileHandler(self.rotation)
                 fh.setLevel(logging.DEBUG)
                 fh.setFormatter(formatter)
-                logger.addHandler(fh)
+                handlers.append(fh)
         else:
             # No existe FileHandler -> crear uno
-            fh = logging.FileHandler(self.log_file, encoding="utf-8")
+            fh = DailyRotatingFileHandler(self.rotation)
             fh.setLevel(logging.DEBUG)
             fh.setFormatter(formatter)
-            logger.addHandler(fh)
+            handlers.append(fh)
 
         # Añadir StreamHandler si no existe
         if not existing_stream_handler:
             ch = logging.StreamHandler()
             ch.setLevel(logging.INFO)
             ch.setFormatter(formatter)
-            logger.addHandler(ch)
+            handlers.append(ch)
 
         # Asegurar que solo haya un StreamHandler apuntando al mismo stream
-        stream_handlers = [h for h in logger.handlers if isinstance(h, logging.StreamHandler)]
+        stream_handlers = [h for h in handlers if isinstance(h, logging.StreamHandler)]
         if len(stream_handlers) > 1:
             # conservar el primero y eliminar el resto
             for h in stream_handlers[1:]:
                 try:
-                    logger.removeHandler(h)
+                    handlers.remove(h)
                 except Exception:
                     pass
                 try:
@@ -89,22 +311,69 @@ class StructuredLogger:
                 except Exception:
                     pass
 
+        if queue_handler is not None:
+            queue_handler.listener.handlers = tuple(handlers)
+        else:
+            logger.handlers[:] = handlers
+            if self.async_mode:
+                enable_async_logging(logger, self.queue_size, self.overflow)
+
         # Evitar propagación al logger raíz (evita duplicados por propagation)
         logger.propagate = False
 
         return logger
 
     def log_connection_attempt(self, ip: str, success: bool, duration: float):
-        """Log de intento de conexión"""
-        log_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "event": "connection_attempt",
-            "target_ip": ip,
-            "result": "success" if success else "failed",
-            "duration_ms": round(duration * 1000, 2),
-            "user": os.getenv("USER", "unknown"),
-        }
-        self.logger.info(json.dumps(log_entry, ensure_ascii=False))
+        """Evento de intento de conexión"""
+        self.events.emit(
+            CONNECTION_ATTEMPT,
+            ip,
+            "success" if success else "failed",
+            round(duration * 1000, 2),
+            self.user,
+        )
+
+    def log_firewall_latency(self, ip: str, port: int, opened: bool, elapsed: float, probes: int):
+        """Evento con el tiempo que tardó el firewall en abrir el puerto tras la secuencia"""
+        self.events.emit(
+            FIREWALL_LATENCY,
+            ip,
+            port,
+            "open" if opened else "timeout",
+            round(elapsed * 1000, 2),
+            probes,
+        )
+
+    def log_pipeline(self, ip: str, success: bool, failed_stage, timings: dict):
+        """Evento de una conexión por etapas con la duración de cada etapa"""
+        self.events.emit(
+            CONNECTION_PIPELINE,
+            ip,
+            "success" if success else "failed",
+            failed_stage,
+            {stage: round(t * 1000, 2) for stage, t in timings.items()},
+        )
+
+    def log_knock_schedule(self, ip: str, report: dict):
+        """Evento con los instantes planificados vs logrados de una secuencia de knocks"""
+        self.events.emit(
+            KNOCK_SCHEDULE,
+            ip,
+            report["completed"],
+            round(report["max_lag"] * 1000, 3),
+            round(report["mean_lag"] * 1000, 3),
+            round(report["max_gap_error"] * 1000, 3),
+            [
+                {
+                    "port": k["port"],
+                    "protocol": k["protocol"],
+                    "planned_ms": round(k["planned"] * 1000, 3),
+                    "actual_ms": round(k["actual"] * 1000, 3),
+                    "ok": k["ok"],
+                }
+                for k in report["knocks"]
+            ],
+        )
 
     def log_info(self, message: str):
         """Log de información"""
@@ -122,13 +391,16 @@ class StructuredLogger:
         """Log crítico"""
         self.logger.critical(message)
 
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Baja los eventos al archivo y espera a que se escriba el texto encolado"""
+        self.events.flush()
+        handler = get_queue_handler(self.logger)
+        if handler is not None:
+            return handler.flush(timeout)
+        for h in self.logger.handlers:
+            h.flush()
+        return True
+
     def log_audit(self, action: str, details: str):
-        """Log de auditoría"""
-        audit_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "event": "audit",
-            "action": action,
-            "details": details,
-            "user": os.getenv("USER", "unknown"),
-        }
-        self.logger.info(f"[AUDIT] {json.dumps(audit_entry, ensure_ascii=False)}")
+        """Evento de auditoría (se baja al archivo enseguida)"""
+        self.events.emit(AUDIT, action, details, self.user, flush=True)
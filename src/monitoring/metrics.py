@@ -1,60 +1,253 @@
+"""
+Métricas de conexión con registro append-only y compactación
+
+Cada intento (o medición de latencia del firewall) actualiza los totales en
+memoria y deja una línea JSONL pendiente: el thread que llama no toca el
+disco. Un thread de fondo agrega las líneas pendientes a `metrics.jsonl`
+por lotes (cada `flush_interval` segundos o al juntar `batch_size`) y cada
+tanto compacta el registro en la instantánea `metrics.json`.
+
+La instantánea se escribe en un temporal y se renombra, así que un corte
+nunca deja un JSON a medias. Varios procesos pueden registrar a la vez: los
+lotes se agregan con O_APPEND bajo un flock compartido y la compactación
+toma el flock exclusivo. Los totales en disco son instantánea + registro.
+"""
+
+import atexit
 import json
-from datetime import datetime
+import os
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, un solo proceso por archivo
+    fcntl = None
+
+from utils.constants import (
+    DEFAULT_METRICS_BATCH_SIZE,
+    DEFAULT_METRICS_COMPACT_BYTES,
+    DEFAULT_METRICS_COMPACT_INTERVAL,
+    DEFAULT_METRICS_FLUSH_INTERVAL,
+)
+from .events import EventLayout, TimestampCache, read_events
+
+ATTEMPT = EventLayout("attempt", ("success", "duration"))
+FIREWALL_SAMPLE = EventLayout("firewall_latency", ("opened", "elapsed"))
+
+# Clave de la instantánea: número de la última compactación (ver compact())
+_GENERATION_KEY = "journal_generation"
+
+_collectors: "weakref.WeakSet[MetricsCollector]" = weakref.WeakSet()
 
 
 class MetricsCollector:
     """Recolector de métricas de conexión"""
 
-    def __init__(self, metrics_file: str = "logs/metrics.json"):
+    def __init__(
+        self,
+        metrics_file: str = "logs/metrics.json",
+        flush_interval: float = DEFAULT_METRICS_FLUSH_INTERVAL,
+        batch_size: int = DEFAULT_METRICS_BATCH_SIZE,
+        compact_interval: float = DEFAULT_METRICS_COMPACT_INTERVAL,
+        compact_bytes: int = DEFAULT_METRICS_COMPACT_BYTES,
+    ):
+        """
+        Args:
+            metrics_file: Instantánea JSON; el registro va al lado con extensión .jsonl
+            flush_interval: Segundos máximos que un registro espera en memoria
+            batch_size: Registros pendientes que disparan una escritura anticipada
+            compact_interval: Segundos entre compactaciones
+            compact_bytes: Tamaño del registro que dispara una compactación anticipada
+        """
         self.metrics_file = Path(metrics_file)
         self.metrics_file.parent.mkdir(exist_ok=True)
-        self.metrics = self._load_metrics()
+        self.journal_file = self.metrics_file.with_suffix(".jsonl")
+        self._lock_file = self.metrics_file.with_suffix(".lock")
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.compact_interval = compact_interval
+        self.compact_bytes = compact_bytes
 
-    def _load_metrics(self) -> Dict[str, Any]:
-        """Carga métricas existentes"""
-        if self.metrics_file.exists():
-            try:
-                with open(self.metrics_file, "r") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, OSError):
-                pass
+        self.clock = TimestampCache()
+        # Líneas aún no escritas; protegidas por _lock junto con metrics
+        self._pending = []
+        self._lock = threading.Lock()
+        # Serializa escrituras y compactaciones de este proceso
+        self._io_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        self._last_compaction = time.monotonic()
 
+        self.metrics = self._load_metrics()
+        _collectors.add(self)
+
+    @staticmethod
+    def _empty_metrics() -> Dict[str, Any]:
         return {
             "total_attempts": 0,
             "successful_connections": 0,
             "failed_attempts": 0,
             "total_duration": 0.0,
             "average_duration": 0.0,
+            "firewall_latency": MetricsCollector._empty_firewall_latency(),
             "last_updated": None,
         }
 
+    @staticmethod
+    def _empty_firewall_latency() -> Dict[str, Any]:
+        return {"samples": 0, "timeouts": 0, "total": 0.0, "average": 0.0, "max": 0.0, "last": None}
+
+    def _load_metrics(self) -> Dict[str, Any]:
+        """Carga métricas existentes (instantánea + registro)"""
+        with self._file_lock(exclusive=False):
+            metrics, generation = self._read_snapshot()
+            # Registro retirado por una compactación que no llegó a escribir la instantánea
+            for path in (self._retired_file(generation + 1), self.journal_file):
+                if path.exists():
+                    _replay(metrics, read_events(path))
+        return metrics
+
+    def _read_snapshot(self):
+        """Instantánea en disco y su número de compactación"""
+        metrics = self._empty_metrics()
+        if self.metrics_file.exists():
+            try:
+                with open(self.metrics_file, "r") as f:
+                    metrics.update(json.load(f))
+            except (json.JSONDecodeError, OSError):
+                pass
+        return metrics, metrics.pop(_GENERATION_KEY, 0)
+
+    def _retired_file(self, generation: int) -> Path:
+        """Registro retirado por la compactación número `generation` (ej. metrics.3.jsonl)"""
+        return self.metrics_file.with_name(f"{self.metrics_file.stem}.{generation}.jsonl")
+
     def record_attempt(self, success: bool, duration: float):
-        """Registra intento de conexión"""
-        self.metrics["total_attempts"] += 1
-
-        if success:
-            self.metrics["successful_connections"] += 1
-            self.metrics["total_duration"] += duration
-            self._update_average()
-        else:
-            self.metrics["failed_attempts"] += 1
-
-        self.metrics["last_updated"] = datetime.now().isoformat()
-        self._save_metrics()
-
-    def _update_average(self):
-        """Actualiza duración promedio"""
-        if self.metrics["successful_connections"] > 0:
-            self.metrics["average_duration"] = (
-                self.metrics["total_duration"] / self.metrics["successful_connections"]
+        """Registra intento de conexión (sin I/O en el thread que llama)"""
+        timestamp = self.clock.now()
+        line = ATTEMPT.encode(timestamp, (success, duration))
+        with self._lock:
+            _apply_attempt(self.metrics, success, duration, timestamp.decode("ascii"))
+            self._enqueue(line)
+
+    def record_firewall_latency(self, opened: bool, elapsed: float):
+        """Registra cuánto tardó el firewall en abrir el puerto (para ajustar el deadline)"""
+        timestamp = self.clock.now()
+        line = FIREWALL_SAMPLE.encode(timestamp, (opened, elapsed))
+        with self._lock:
+            _apply_firewall(self.metrics, opened, elapsed, timestamp.decode("ascii"))
+            self._enqueue(line)
+
+    def _enqueue(self, line: bytes):
+        """Deja la línea pendiente y despierta al writer si el lote se llenó (con _lock)"""
+        self._pending.append(line)
+        if self._writer is None and not self._closed:
+            self._writer = threading.Thread(
+                target=self._run_writer, name="metrics-writer", daemon=True
             )
+            self._writer.start()
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
 
-    def _save_metrics(self):
-        """Guarda métricas"""
-        with open(self.metrics_file, "w") as f:
-            json.dump(self.metrics, f, indent=2, ensure_ascii=False)
+    def _run_writer(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._closed:
+                break
+            try:
+                size = self.flush()
+                due = time.monotonic() - self._last_compaction >= self.compact_interval
+                if size >= self.compact_bytes or (due and size):
+                    self.compact()
+            except OSError:
+                # Disco lleno o sin permisos: los registros siguen pendientes en memoria
+                time.sleep(self.flush_interval)
+
+    def flush(self) -> int:
+        """Agrega al registro las líneas pendientes; retorna el tamaño del registro"""
+        with self._io_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return _size(self.journal_file)
+            try:
+                with self._file_lock(exclusive=False):
+                    # Se abre por lote: una compactación puede haber retirado el archivo
+                    fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    try:
+                        os.write(fd, b"".join(batch))
+                        return os.fstat(fd).st_size
+                    finally:
+                        os.close(fd)
+            except OSError:
+                with self._lock:
+                    self._pending[:0] = batch
+                raise
+
+    def compact(self):
+        """Incorpora el registro a la instantánea y lo vacía
+
+        Con el flock exclusivo, la compactación N+1 renombra el registro a
+        "metrics.<N+1>.jsonl", escribe la instantánea con generación N+1
+        (temporal + fsync + rename) y recién después borra el renombrado. Si el
+        proceso muere a mitad, el número dice si ese archivo ya está incorporado.
+        """
+        with self._io_lock:
+            with self._file_lock(exclusive=True):
+                metrics, generation = self._read_snapshot()
+                stale = self._retired_file(generation)
+                if stale.exists():
+                    # Ya incorporado: la compactación anterior se cortó antes de borrarlo
+                    stale.unlink()
+                retired = self._retired_file(generation + 1)
+                if not retired.exists() and self.journal_file.exists():
+                    os.replace(self.journal_file, retired)
+                if retired.exists():
+                    _replay(metrics, read_events(retired))
+                    snapshot = {**metrics, _GENERATION_KEY: generation + 1}
+                    partial = self.metrics_file.with_name(f".{self.metrics_file.name}.tmp")
+                    with open(partial, "w") as f:
+                        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(partial, self.metrics_file)
+                    retired.unlink()
+            self._last_compaction = time.monotonic()
+
+            # Totales de todos los procesos más lo propio aún no escrito
+            with self._lock:
+                _replay(metrics, read_events(self._pending))
+                self.metrics = metrics
+
+    def close(self):
+        """Escribe lo pendiente, compacta y detiene el writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join()
+        self.flush()
+        self.compact()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _file_lock(self, exclusive: bool):
+        """flock del archivo .lock (entre procesos); no-op sin fcntl"""
+        if fcntl is None:
+            return _NullLock()
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self._lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        return _FileLock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
 
     def get_success_rate(self) -> float:
         """Calcula tasa de éxito"""
@@ -65,3 +258,81 @@ class MetricsCollector:
     def export_report(self) -> Dict[str, Any]:
         """Exporta reporte de métricas"""
         return {**self.metrics, "success_rate": round(self.get_success_rate(), 2)}
+
+
+class _FileLock:
+    __slots__ = ("fd", "operation")
+
+    def __init__(self, fd: int, operation: int):
+        self.fd = fd
+        self.operation = operation
+
+    def __enter__(self):
+        fcntl.flock(self.fd, self.operation)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+
+class _NullLock:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+def _apply_attempt(metrics: Dict[str, Any], success: bool, duration: float, timestamp: str):
+    metrics["total_attempts"] += 1
+    if success:
+        metrics["successful_connections"] += 1
+        metrics["total_duration"] += duration
+        _update_average(metrics)
+    else:
+        metrics["failed_attempts"] += 1
+    metrics["last_updated"] = timestamp
+
+
+def _apply_firewall(metrics: Dict[str, Any], opened: bool, elapsed: float, timestamp: str):
+    stats = metrics.setdefault("firewall_latency", MetricsCollector._empty_firewall_latency())
+    if opened:
+        stats["samples"] += 1
+        stats["total"] += elapsed
+        stats["average"] = stats["total"] / stats["samples"]
+        stats["max"] = max(stats["max"], elapsed)
+        stats["last"] = elapsed
+    else:
+        stats["timeouts"] += 1
+    metrics["last_updated"] = timestamp
+
+
+def _update_average(metrics: Dict[str, Any]):
+    if metrics["successful_connections"] > 0:
+        metrics["average_duration"] = metrics["total_duration"] / metrics["successful_connections"]
+
+
+def _replay(metrics: Dict[str, Any], records: Iterable[Dict[str, Any]]):
+    """Aplica registros del journal (ya parseados) sobre `metrics`"""
+    for record in records:
+        event = record.get("event")
+        if event == ATTEMPT.event:
+            _apply_attempt(metrics, record["success"], record["duration"], record["timestamp"])
+        elif event == FIREWALL_SAMPLE.event:
+            _apply_firewall(metrics, record["opened"], record["elapsed"], record["timestamp"])
+
+
+def _size(path: Path) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+@atexit.register
+def close_metrics():
+    """Escribe y compacta las métricas de todos los recolectores abiertos"""
+    for collector in list(_collectors):
+        try:
+            collector.close()
+        except OSError:
+            pass
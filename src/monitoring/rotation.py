@@ -0,0 +1,203 @@
+"""
+Rotación de logs por tamaño y por día, con compresión y retención
+
+`LogRotation` define la familia de archivos de un log a partir de una
+plantilla (ej. "vpn_connect_{date}.log"): el archivo activo del día, los
+rotados por tamaño ("vpn_connect_20261018.1.log") y sus versiones ".gz".
+Rotar en el thread que escribe es sólo cerrar, renombrar y abrir; la
+compresión gzip y el borrado de los archivos vencidos corren en un thread
+en segundo plano.
+
+`DailyRotatingFileHandler` es el FileHandler de logging con esa política;
+`JsonlEventSink` acepta la misma política para el archivo de eventos.
+"""
+
+import gzip
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import BaseRotatingHandler
+from pathlib import Path
+from typing import List, Optional, Union
+
+from utils.constants import (
+    DEFAULT_LOG_MAX_BYTES,
+    DEFAULT_LOG_RETENTION_DAYS,
+    DEFAULT_LOG_MAX_BACKUPS,
+)
+
+# Un único worker: compresiones y podas en orden, sin competir por disco
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-rotation")
+
+
+class LogRotation:
+    """Nombres, rotación, compresión y retención de una familia de archivos de log"""
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        template: str,
+        max_bytes: int = DEFAULT_LOG_MAX_BYTES,
+        retention_days: float = DEFAULT_LOG_RETENTION_DAYS,
+        max_backups: int = DEFAULT_LOG_MAX_BACKUPS,
+        compress: bool = True,
+    ):
+        """
+        Args:
+            directory: Carpeta de los logs
+            template: Nombre del archivo activo; "{date}" se reemplaza por AAAAMMDD
+            max_bytes: Tamaño a partir del cual se rota (0 = sin tope)
+            retention_days: Antigüedad máxima de un archivo rotado (0 = sin límite)
+            max_backups: Archivos rotados a conservar (0 = sin límite)
+            compress: Comprimir con gzip los archivos rotados
+        """
+        self.directory = Path(directory)
+        self.template = template
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.max_backups = max_backups
+        self.compress = compress
+
+        stem, dot, suffix = template.rpartition(".")
+        if not dot:
+            stem, suffix = template, ""
+        self._suffix = dot + suffix
+        pattern = re.escape(stem).replace(re.escape("{date}"), r"\d{8}")
+        # Activo o rotado, comprimido o no: ej. vpn_connect_20261018(.3).log(.gz)
+        self._family = re.compile(rf"^{pattern}(\.\d+)?{re.escape(self._suffix)}(\.gz)?$")
+        self._lock = threading.Lock()
+
+    def current_path(self, now: Optional[float] = None) -> Path:
+        """Archivo activo para el instante `now` (por defecto, ahora)"""
+        date = time.strftime("%Y%m%d", time.localtime(now))
+        return self.directory / self.template.replace("{date}", date)
+
+    @staticmethod
+    def next_midnight(now: float) -> float:
+        """Epoch de la próxima medianoche local después de `now`"""
+        day = time.localtime(now)
+        return time.mktime((day.tm_year, day.tm_mon, day.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+    def rollover(self, path: Path, now: float) -> Path:
+        """Retira `path` y retorna el archivo activo que lo reemplaza
+
+        Si el nombre activo no cambia (rotación por tamaño, o plantilla sin
+        fecha) el archivo se renombra al siguiente ".N" libre. La compresión y
+        la poda quedan en segundo plano.
+        """
+        path = Path(path)
+        current = self.current_path(now)
+        retired = path
+        if current == path and path.exists():
+            with self._lock:
+                retired = self._next_backup_name(path)
+                os.rename(path, retired)
+        _background.submit(self._finish, retired, current)
+        return current
+
+    def _next_backup_name(self, path: Path) -> Path:
+        stem = path.name[: len(path.name) - len(self._suffix)] if self._suffix else path.name
+        index = 1
+        while True:
+            candidate = path.with_name(f"{stem}.{index}{self._suffix}")
+            if not candidate.exists() and not Path(f"{candidate}.gz").exists():
+                return candidate
+            index += 1
+
+    def _finish(self, retired: Path, active: Path):
+        if self.compress and retired != active and retired.exists():
+            compress_file(retired)
+        self.prune(active)
+
+    def backups(self, active: Optional[Path] = None) -> List[Path]:
+        """Archivos de la familia distintos del activo, del más nuevo al más viejo"""
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return []
+        active_name = (active or self.current_path()).name
+        found = []
+        for entry in entries:
+            # Un .gz a medio escribir (".<nombre>.gz.tmp") no entra en la familia
+            if entry.name == active_name or not self._family.match(entry.name):
+                continue
+            try:
+                found.append((entry.stat().st_mtime, Path(entry.path)))
+            except OSError:
+                continue
+        found.sort(reverse=True)
+        return [path for _, path in found]
+
+    def prune(self, active: Optional[Path] = None) -> List[Path]:
+        """Borra los archivos rotados fuera de la retención; retorna los borrados"""
+        backups = self.backups(active)
+        doomed = []
+        if self.max_backups:
+            doomed.extend(backups[self.max_backups :])
+            backups = backups[: self.max_backups]
+        if self.retention_days:
+            limit = time.time() - self.retention_days * 86400
+            for path in backups:
+                try:
+                    if path.stat().st_mtime < limit:
+                        doomed.append(path)
+                except OSError:
+                    continue
+        for path in doomed:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        return doomed
+
+
+def compress_file(path: Path) -> Path:
+    """Comprime `path` a `path`.gz (vía temporal + rename) y borra el original"""
+    target = Path(f"{path}.gz")
+    partial = target.with_name(f".{target.name}.tmp")
+    with open(path, "rb") as source, gzip.open(partial, "wb") as dest:
+        shutil.copyfileobj(source, dest, 1024 * 1024)
+    # Conserva la fecha del contenido para la retención
+    stat = os.stat(path)
+    os.utime(partial, (stat.st_atime, stat.st_mtime))
+    os.replace(partial, target)
+    os.unlink(path)
+    return target
+
+
+def wait_for_rotation(timeout: float = 10.0) -> bool:
+    """Espera a que terminen las compresiones y podas encoladas (útil en tests)"""
+    return _background.submit(lambda: None).result(timeout) is None
+
+
+class DailyRotatingFileHandler(BaseRotatingHandler):
+    """FileHandler que cambia de archivo cada día y al superar el tamaño máximo"""
+
+    def __init__(self, rotation: LogRotation, encoding: str = "utf-8"):
+        self.rotation = rotation
+        now = time.time()
+        rotation.directory.mkdir(parents=True, exist_ok=True)
+        super().__init__(os.fspath(rotation.current_path(now)), "a", encoding=encoding)
+        self.rollover_at = rotation.next_midnight(now)
+
+    def shouldRollover(self, record) -> bool:
+        if record.created >= self.rollover_at:
+            return True
+        # Se rota apenas se supera el tope (sin formatear el registro dos veces)
+        return bool(
+            self.rotation.max_bytes
+            and self.stream is not None
+            and self.stream.tell() >= self.rotation.max_bytes
+        )
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        now = time.time()
+        self.baseFilename = os.fspath(self.rotation.rollover(Path(self.baseFilename), now))
+        self.rollover_at = self.rotation.next_midnight(now)
+        self.stream = self._open()
@@ -1,4 +1,13 @@
 from .diagnostics import NetworkDiagnostics
 from .circuit_breaker import CircuitBreaker
+from .udp_pool import UDPSocketPool
+from .resolver import Resolver, get_resolver, happy_eyeballs
 
-__all__ = ["NetworkDiagnostics", "CircuitBreaker"]
+__all__ = [
+    "NetworkDiagnostics",
+    "CircuitBreaker",
+    "UDPSocketPool",
+    "Resolver",
+    "get_resolver",
+    "happy_eyeballs",
+]
@@ -1,8 +1,11 @@
+import ipaddress
 import socket
 import subprocess
 import platform
 from typing import List, Dict
 
+from .resolver import get_resolver, happy_eyeballs
+
 
 class NetworkDiagnostics:
     """Herramientas de diagnóstico de red"""
@@ -28,13 +31,10 @@ class NetworkDiagnostics:
 
     @staticmethod
     def check_port_open(host: str, port: int, timeout: int = 2) -> bool:
-        """Verifica si puerto está abierto"""
+        """Verifica si puerto está abierto (IPv4/IPv6 en paralelo si el host es dual-stack)"""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            return result == 0
+            addresses = get_resolver().resolve(host)
+            return happy_eyeballs(addresses, port, timeout=timeout, require_open=True) is not None
         except Exception:
             return False
 
@@ -61,9 +61,9 @@ class NetworkDiagnostics:
         if not self.check_port_open(target_ip, target_port):
             issues.append(f"Puerto {target_port} no accesible")
 
-        # Test 3: DNS (si es hostname)
+        # Test 3: DNS (si es hostname; A o AAAA)
         try:
-            socket.gethostbyname(target_ip)
+            get_resolver().resolve(target_ip)
         except socket.gaierror:
             if not self._is_ip(target_ip):
                 issues.append("Error de resolución DNS")
@@ -74,9 +74,9 @@ class NetworkDiagnostics:
     def _is_ip(address: str) -> bool:
         """Verifica si es dirección IP válida"""
         try:
-            socket.inet_aton(address)
+            ipaddress.ip_address(address)
             return True
-        except Exception:
+        except ValueError:
             return False
 
     def get_diagnostic_report(self, target_ip: str, target_port: int) -> Dict:
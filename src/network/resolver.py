@@ -0,0 +1,230 @@
+"""
+Resolución de nombres con caché TTL y conexión happy eyeballs (RFC 8305)
+
+`Resolver.resolve()` devuelve las direcciones (familia, ip) de un host con
+A y AAAA intercaladas según RFC 8305 §4, partiendo del orden de preferencia
+de getaddrinfo() (RFC 6724). Las IPs literales no pasan por DNS ni ocupan
+caché. getaddrinfo() no expone el TTL de los registros, así que cada entrada
+vive un TTL fijo; los fallos se recuerdan por un TTL negativo más corto.
+
+`happy_eyeballs()` lanza connects escalonados sobre esas direcciones y se
+queda con el primero que responde.
+"""
+
+import errno
+import ipaddress
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from utils.constants import (
+    DEFAULT_DNS_TTL,
+    DEFAULT_DNS_NEGATIVE_TTL,
+    DEFAULT_HAPPY_EYEBALLS_DELAY,
+)
+
+# (familia, ip)
+Address = Tuple[int, str]
+
+# SO_LINGER {on, 0}: los sondeos se cierran con RST, sin TIME_WAIT
+_LINGER_ABORT = struct.pack("ii", 1, 0)
+
+
+def address_family(ip: str) -> int:
+    """AF_INET6 para direcciones IPv6 literales, AF_INET para el resto"""
+    return socket.AF_INET6 if ":" in ip else socket.AF_INET
+
+
+def parse_literal(host: str) -> Optional[Address]:
+    """(familia, ip) si `host` ya es una IP literal"""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return None
+    return (socket.AF_INET6 if address.version == 6 else socket.AF_INET), str(address)
+
+
+def interleave(addresses: List[Address]) -> List[Address]:
+    """Alterna familias empezando por la preferida (RFC 8305 §4), sin duplicados"""
+    by_family: "OrderedDict[int, List[str]]" = OrderedDict()
+    for family, ip in addresses:
+        ips = by_family.setdefault(family, [])
+        if ip not in ips:
+            ips.append(ip)
+
+    result = []
+    queues = [[(family, ip) for ip in ips] for family, ips in by_family.items()]
+    while any(queues):
+        for queue in queues:
+            if queue:
+                result.append(queue.pop(0))
+    return result
+
+
+class Resolver:
+    """Resolución A/AAAA con caché acotada por TTL y por cantidad de hosts"""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_DNS_TTL,
+        negative_ttl: float = DEFAULT_DNS_NEGATIVE_TTL,
+        max_entries: int = 256,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # host -> (vencimiento, direcciones o error de la última resolución)
+        self._cache: "OrderedDict[str, Tuple[float, Union[List[Address], OSError]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, host: str) -> Optional[List[Address]]:
+        """Direcciones sin tocar la red: IP literal o entrada vigente en caché"""
+        literal = parse_literal(host)
+        if literal is not None:
+            return [literal]
+        with self._lock:
+            entry = self._cache.get(host)
+            if entry is None or entry[0] <= time.monotonic() or isinstance(entry[1], OSError):
+                return None
+            self._cache.move_to_end(host)
+            return list(entry[1])
+
+    def resolve(self, host: str) -> List[Address]:
+        """Direcciones de `host` (A y AAAA intercaladas); usa la caché si está vigente
+
+        Raises:
+            socket.gaierror: si el nombre no resuelve (también desde la caché negativa)
+        """
+        literal = parse_literal(host)
+        if literal is not None:
+            return [literal]
+
+        with self._lock:
+            entry = self._cache.get(host)
+            if entry is not None and entry[0] > time.monotonic():
+                if isinstance(entry[1], OSError):
+                    raise entry[1]
+                self._cache.move_to_end(host)
+                return list(entry[1])
+
+        try:
+            infos = socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            self._store(host, e, self.negative_ttl)
+            raise
+        addresses = interleave(
+            [
+                (family, sockaddr[0])
+                for family, _, _, _, sockaddr in infos
+                if family in (socket.AF_INET, socket.AF_INET6)
+            ]
+        )
+        if not addresses:
+            error = socket.gaierror(socket.EAI_NONAME, f"Sin direcciones IP para {host}")
+            self._store(host, error, self.negative_ttl)
+            raise error
+        self._store(host, addresses, self.ttl)
+        return list(addresses)
+
+    def invalidate(self, host: Optional[str] = None):
+        """Descarta la entrada de `host`, o toda la caché"""
+        with self._lock:
+            if host is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(host, None)
+
+    def _store(self, host: str, value, ttl: float):
+        with self._lock:
+            self._cache[host] = (time.monotonic() + ttl, value)
+            self._cache.move_to_end(host)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+_default_resolver = Resolver()
+
+
+def get_resolver() -> Resolver:
+    """Resolver compartido del proceso (la caché sirve a todas las secuencias y hosts)"""
+    return _default_resolver
+
+
+def happy_eyeballs(
+    addresses: List[Address],
+    port: int,
+    timeout: float = 1.0,
+    attempt_delay: float = DEFAULT_HAPPY_EYEBALLS_DELAY,
+    require_open: bool = False,
+) -> Optional[Dict]:
+    """Connects TCP escalonados sobre `addresses`; gana el primero que responde
+
+    Cada intento arranca `attempt_delay` después del anterior, o apenas el
+    anterior falla. Con require_open=False un rechazo (RST) también cuenta
+    como respuesta: prueba que el camino funciona aunque el puerto esté cerrado.
+
+    Returns:
+        dict con family, ip, connected y latency (ms), o None si nadie
+        respondió antes del timeout
+    """
+    selector = selectors.DefaultSelector()
+    pending = list(addresses)
+    start = time.monotonic()
+    deadline = start + timeout
+    next_attempt = start
+
+    def answer(family, ip, connected):
+        return {
+            "family": family,
+            "ip": ip,
+            "connected": connected,
+            "latency": (time.monotonic() - start) * 1000,
+        }
+
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return None
+            if pending and (now >= next_attempt or not selector.get_map()):
+                family, ip = pending.pop(0)
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_ABORT)
+                sock.setblocking(False)
+                result = sock.connect_ex((ip, port))
+                if result in (errno.EINPROGRESS, errno.EAGAIN):
+                    selector.register(sock, selectors.EVENT_WRITE, (family, ip))
+                    next_attempt = time.monotonic() + attempt_delay
+                    continue
+                sock.close()
+                if result == 0 or (result == errno.ECONNREFUSED and not require_open):
+                    return answer(family, ip, result == 0)
+                next_attempt = time.monotonic()
+                continue
+            if not selector.get_map():
+                return None
+
+            wait = deadline - now
+            if pending:
+                wait = min(wait, next_attempt - now)
+            for key, _ in selector.select(max(0.0, wait)):
+                sock = key.fileobj
+                family, ip = key.data
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                selector.unregister(sock)
+                sock.close()
+                if error == 0 or (error == errno.ECONNREFUSED and not require_open):
+                    return answer(family, ip, error == 0)
+                # Falló este camino: el siguiente arranca sin esperar el escalonado
+                next_attempt = time.monotonic()
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
@@ -0,0 +1,75 @@
+"""
+Pool de sockets UDP reutilizables para knocks
+
+Un socket UDP no conectado puede enviar a cualquier destino, así que basta
+uno por familia de direcciones (AF_INET / AF_INET6) para todos los knocks
+UDP del proceso, en vez de crear y cerrar un descriptor por knock.
+
+La stdlib de Python no expone sendmmsg(2): las ráfagas se envían con un
+sendto() por datagrama sobre el mismo socket. Igual se ahorra el
+socket()/close() por knock, que es la mayor parte del costo.
+"""
+
+import socket
+import threading
+from typing import Dict, Iterable, Tuple, Union
+
+from .resolver import address_family
+
+Payload = Union[bytes, str]
+
+
+def encode_payload(payload: Payload) -> bytes:
+    """Normaliza el payload de un knock a bytes (str se codifica en UTF-8)"""
+    if isinstance(payload, str):
+        return payload.encode("utf-8")
+    return bytes(payload)
+
+
+class UDPSocketPool:
+    """Un socket UDP por familia de direcciones, compartido entre knocks y threads"""
+
+    def __init__(self):
+        self._sockets: Dict[int, socket.socket] = {}
+        self._lock = threading.Lock()
+
+    def socket_for(self, family: int) -> socket.socket:
+        """Socket de la familia dada; lo crea la primera vez"""
+        sock = self._sockets.get(family)
+        if sock is None:
+            with self._lock:
+                sock = self._sockets.get(family)
+                if sock is None:
+                    sock = socket.socket(family, socket.SOCK_DGRAM)
+                    self._sockets[family] = sock
+        return sock
+
+    def send(self, ip: str, port: int, payload: Payload = b"") -> int:
+        """Envía un knock UDP; retorna los bytes enviados"""
+        return self.socket_for(address_family(ip)).sendto(encode_payload(payload), (ip, port))
+
+    def send_burst(self, knocks: Iterable[Tuple[str, int, Payload]]) -> int:
+        """Envía varios knocks (ip, puerto, payload) seguidos; retorna cuántos salieron
+
+        Un error de envío corta la ráfaga y se propaga.
+        """
+        sent = 0
+        for ip, port, payload in knocks:
+            self.send(ip, port, payload)
+            sent += 1
+        return sent
+
+    def close(self):
+        with self._lock:
+            sockets, self._sockets = list(self._sockets.values()), {}
+        for sock in sockets:
+            sock.close()
+
+    def __len__(self) -> int:
+        return len(self._sockets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -5,9 +5,11 @@ import time
 
 from core.config_manager import ConfigManager
 from core.port_knocker import PortKnocker
+from core.connection_pipeline import ConnectionPipeline
 from core.vpn_manager import get_vpn_manager
 from monitoring.logger import StructuredLogger
 from monitoring.metrics import MetricsCollector
+from network.udp_pool import UDPSocketPool
 from utils.exceptions import VPNToolError
 from utils.constants import DEFAULT_WINDOW_WIDTH, DEFAULT_WINDOW_HEIGHT, COLORS, STATUS_MESSAGES
 from ui.widgets.status_bar import StatusBar
@@ -23,8 +25,15 @@ class VPNConnectGUI:
         self.metrics = MetricsCollector()
 
         # Componentes de negocio
-        self.knocker = PortKnocker(verbose=False)
+        self.knocker = PortKnocker(
+            verbose=False,
+            knock_mode=self.config.get("knock_mode", "syn"),
+            udp_pool=UDPSocketPool(),
+            verify_mode=self.config.get("verify_mode", "concurrent"),
+            verify_quorum=self.config.get("verify_quorum", 1),
+        )
         self.vpn_manager = get_vpn_manager()
+        self.pipeline = ConnectionPipeline(self.knocker, self.vpn_manager, self.config)
 
         # Ventana principal
         self.window = tk.Tk()
@@ -88,30 +97,16 @@ class VPNConnectGUI:
     def do_connection(self):
         """Proceso completo: Port Knocking + VPN (MVP sin 2FA)"""
         try:
-            # Fase 1: Port Knocking
-            self.status_bar.update("Secuencia de puertos...", "connecting")
-            self.progress.set_progress(10)
-
-            success = self.knocker.execute_sequence(
-                self.config.get("target_ip"),
-                self.config.get("knock_sequence"),
-                self.config.get("interval"),
-                self.config.get("target_port"),
-                progressive_check=False,
-            )
-
-            if not success:
-                raise VPNToolError("La secuencia de Port Knocking falló.")
-
-            self.progress.set_progress(50)
+            result = self.pipeline.run("profile.ovpn", "credentials.txt", on_stage=self._on_stage)
 
-            # Fase 2: Conectar VPN
-            self.status_bar.update(STATUS_MESSAGES["connecting"], "connecting")
-
-            vpn_success = self.vpn_manager.connect("profile.ovpn", "credentials.txt")
+            readiness = result["readiness"]
+            if readiness is not None:
+                self.metrics.record_firewall_latency(readiness["open"], readiness["elapsed"])
 
-            if not vpn_success:
-                raise VPNToolError("La conexión VPN falló.")
+            if not result["success"]:
+                if result["failed_stage"] in ("knock", "readiness"):
+                    raise VPNToolError("La secuencia de Port Knocking falló.")
+                raise VPNToolError(f"La conexión VPN falló: {result['error']}")
 
             self.progress.set_progress(100)
 
@@ -130,6 +125,15 @@ class VPNConnectGUI:
         except Exception as e:
             self.handle_connection_error(f"Error inesperado: {e}")
 
+    def _on_stage(self, stage: str):
+        """Refleja en la UI la etapa actual del pipeline"""
+        if stage == "knock":
+            self.status_bar.update("Secuencia de puertos...", "connecting")
+            self.progress.set_progress(10)
+        elif stage == "launch":
+            self.progress.set_progress(50)
+            self.status_bar.update(STATUS_MESSAGES["connecting"], "connecting")
+
     def handle_connection_error(self, error_msg: str):
         """Maneja errores de conexión"""
         duration = time.time() - self.connection_start_time if self.connection_start_time else 0
@@ -6,6 +6,24 @@ DEFAULT_KNOCK_TIMEOUT = 2
 DEFAULT_VPN_CONNECT_TIMEOUT = 30
 DEFAULT_FIREWALL_PROCESS_TIME = 5
 
+# Sondeo de apertura tras la secuencia (backoff exponencial hasta el deadline)
+DEFAULT_READINESS_INITIAL_DELAY = 0.02
+DEFAULT_READINESS_MAX_DELAY = 0.5
+
+# Knocks SYN no bloqueantes: tiempo que el socket semiabierto sigue vivo antes del abort
+DEFAULT_SYN_HOLD_TIME = 0.25
+
+# progressive_check: pausa entre sondeos del puerto objetivo durante la secuencia
+DEFAULT_PROGRESSIVE_PROBE_INTERVAL = 0.05
+
+# Resolución de nombres: TTL de la caché (positiva / negativa) y escalonado
+# entre intentos IPv6/IPv4 (RFC 8305 recomienda 250 ms)
+DEFAULT_DNS_TTL = 300
+DEFAULT_DNS_NEGATIVE_TTL = 30
+DEFAULT_HAPPY_EYEBALLS_DELAY = 0.25
+# Tope de la carrera IPv6/IPv4 antes de la secuencia; sin respuesta se usa la primera IP
+DEFAULT_HAPPY_EYEBALLS_TIMEOUT = 0.5
+
 # Puertos por defecto
 DEFAULT_VPN_PORT = 1194
 
@@ -17,6 +35,27 @@ LOG_DIRECTORY = "logs"
 CONFIG_FILENAME = "config.json"
 HIDDEN_CONFIG_FILENAME = ".config.json"
 
+# Logging asíncrono
+# Registros en cola antes de aplicar la política de desborde
+DEFAULT_LOG_QUEUE_SIZE = 10000
+# Espera máxima por lugar en la cola con la política "block" (segundos)
+DEFAULT_LOG_BLOCK_TIMEOUT = 1.0
+# Buffer del archivo de eventos JSONL (bytes)
+DEFAULT_EVENT_BUFFER_SIZE = 64 * 1024
+
+# Rotación de logs: tope por archivo, antigüedad y cantidad de archivos rotados
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_RETENTION_DAYS = 14
+DEFAULT_LOG_MAX_BACKUPS = 30
+
+# Métricas: registro append-only escrito por lotes y compactado en metrics.json
+# Segundos máximos que un registro espera en memoria / registros por lote
+DEFAULT_METRICS_FLUSH_INTERVAL = 1.0
+DEFAULT_METRICS_BATCH_SIZE = 256
+# Compactación periódica (segundos) o al superar este tamaño de registro (bytes)
+DEFAULT_METRICS_COMPACT_INTERVAL = 300.0
+DEFAULT_METRICS_COMPACT_BYTES = 1024 * 1024
+
 # UI
 DEFAULT_WINDOW_WIDTH = 450
 DEFAULT_WINDOW_HEIGHT = 250
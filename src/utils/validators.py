@@ -65,14 +65,17 @@ class ConfigValidator:
             return False
 
         for knock in sequence:
-            if not isinstance(knock, list) or len(knock) != 2:
+            if not isinstance(knock, list) or len(knock) not in (2, 3):
                 return False
 
-            port, protocol = knock
+            port, protocol = knock[0], knock[1]
             if not isinstance(port, int) or not (1 <= port <= 65535):
                 return False
             if protocol not in ["tcp", "udp"]:
                 return False
+            # Tercer elemento opcional: payload (texto) de un knock UDP
+            if len(knock) == 3 and (protocol != "udp" or not isinstance(knock[2], str)):
+                return False
 
         return True
 
@@ -35,8 +35,10 @@ print(f"  ✓ Total intentos: {report['total_attempts']}")
 print(f"  ✓ Exitosos: {report['successful_connections']}")
 print(f"  ✓ Fallidos: {report['failed_attempts']}")
 
-# Cleanup
-Path("test_metrics.json").unlink()
+# Cleanup (close() baja el registro y lo compacta en test_metrics.json)
+metrics.close()
+for name in ("test_metrics.json", "test_metrics.jsonl", "test_metrics.lock"):
+    Path(name).unlink(missing_ok=True)
 
 print("\n" + "=" * 60)
 print("  ✓ TEST MONITORING COMPLETADO")
@@ -0,0 +1,81 @@
+import asyncio
+import socket
+
+from src.knockd.async_server import AsyncKnockServer
+
+
+def free_port(kind=socket.SOCK_STREAM):
+    s = socket.socket(socket.AF_INET, kind)
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+async def tcp_knock(port):
+    try:
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.close()
+    except OSError:
+        pass
+
+
+def udp_knock(port):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.sendto(b"", ("127.0.0.1", port))
+    s.close()
+
+
+async def wait_for(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+def test_mixed_tcp_udp_sequence_opens_port():
+    tcp_port = free_port()
+    udp_port = free_port(socket.SOCK_DGRAM)
+    opened = []
+
+    async def scenario():
+        server = AsyncKnockServer([tcp_port, f"{udp_port}/udp"], 1194, override_interval=5)
+        server.open_vpn_port = lambda *a: opened.append(True)
+        task = asyncio.create_task(server.serve())
+        await server.wait_started()
+
+        await tcp_knock(tcp_port)
+        await wait_for(lambda: server.sources.state_of("127.0.0.1"))
+        udp_knock(udp_port)
+
+        assert await wait_for(lambda: opened == [True])
+        server.stop()
+        await asyncio.wait_for(task, 2)
+
+    asyncio.run(scenario())
+
+
+def test_udp_knock_on_tcp_port_does_not_match():
+    port = free_port()
+    opened = []
+
+    async def scenario():
+        server = AsyncKnockServer([port], 1194, override_interval=5)
+        server.open_vpn_port = lambda *a: opened.append(True)
+        task = asyncio.create_task(server.serve())
+        await server.wait_started()
+
+        # Nadie escucha UDP en ese puerto: el knock no debe contar
+        udp_knock(port)
+        await asyncio.sleep(0.1)
+        assert opened == []
+
+        await tcp_knock(port)
+        assert await wait_for(lambda: opened == [True])
+        server.stop()
+        await asyncio.wait_for(task, 2)
+
+    asyncio.run(scenario())
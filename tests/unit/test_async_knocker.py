@@ -0,0 +1,65 @@
+import asyncio
+import socket
+import time
+
+from src.core.async_knocker import AsyncPortKnocker
+from src.server_knock import KnockServer
+
+
+def free_ports(count):
+    socks, ports = [], []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        socks.append(s)
+        ports.append(s.getsockname()[1])
+    for s in socks:
+        s.close()
+    return ports
+
+
+def test_knock_many_unlocks_hosts_concurrently():
+    *knock_ports, target = free_ports(3)
+    server = KnockServer(
+        knock_ports, target, override_interval=2, engine="selector", host="0.0.0.0"
+    )
+    server.start(block=False)
+    try:
+        knocker = AsyncPortKnocker(firewall_wait=0.05, verify_attempts=1)
+        hosts = [f"127.0.0.{i}" for i in range(2, 42)]
+        sequence = [(port, "tcp") for port in knock_ports]
+
+        start = time.monotonic()
+        results = asyncio.run(knocker.knock_many(hosts, sequence, 0.2, target))
+        elapsed = time.monotonic() - start
+    finally:
+        server.stop()
+
+    assert [r["target_ip"] for r in results] == hosts
+    assert all(r["success"] and r["error"] is None for r in results)
+    # 40 hosts cuestan aproximadamente lo mismo que uno (secuencia + espera + verificación)
+    assert elapsed < 2.5
+    for r in results:
+        assert [k["planned"] for k in r["knocks"]] == [0.0, 0.2]
+        assert all(abs(k["fired"] - k["planned"]) < 0.1 for k in r["knocks"])
+
+
+def test_knock_many_reports_per_host_failures():
+    (target,) = free_ports(1)
+    knocker = AsyncPortKnocker(firewall_wait=0, verify_attempts=1)
+    targets = [
+        {
+            "target_ip": "127.0.0.1",
+            "knock_sequence": [(target, "udp")],
+            "interval": 0,
+            "target_port": target,
+        },
+        {"target_ip": "127.0.0.1"},
+    ]
+
+    results = asyncio.run(knocker.knock_many(targets))
+
+    assert results[0]["success"] is False
+    assert results[0]["verification"]["success_count"] == 0
+    assert results[0]["knocks"][0]["ok"] is True
+    assert results[1]["error"]
@@ -0,0 +1,172 @@
+import logging
+import socket
+import threading
+
+import pytest
+
+from src.monitoring.logger import (
+    StructuredLogger,
+    disable_async_logging,
+    enable_async_logging,
+    get_queue_handler,
+)
+
+
+class RecordingHandler(logging.Handler):
+    """Guarda mensajes y thread de escritura; puede frenarse con un Event"""
+
+    def __init__(self, gate=None):
+        super().__init__()
+        self.gate = gate
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        self.messages.append(record.getMessage())
+        self.threads.add(threading.current_thread().name)
+
+
+@pytest.fixture
+def logger(request):
+    logger = logging.getLogger(f"test.async.{request.node.name}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    yield logger
+    disable_async_logging(logger)
+    logger.handlers[:] = []
+
+
+def test_records_are_written_by_background_listener(logger):
+    sink = RecordingHandler()
+    logger.addHandler(sink)
+    handler = enable_async_logging(logger)
+    assert get_queue_handler(logger) is handler and sink not in logger.handlers
+    assert enable_async_logging(logger) is handler
+
+    for i in range(100):
+        logger.info("evento %d", i)
+    assert handler.flush()
+    assert sink.messages == [f"evento {i}" for i in range(100)]
+    assert threading.current_thread().name not in sink.threads
+
+
+def test_exception_text_is_captured_on_caller(logger):
+    sink = RecordingHandler()
+    sink.setFormatter(logging.Formatter("%(message)s"))
+    lines = []
+    sink.emit = lambda record: lines.append(sink.format(record))
+    logger.addHandler(sink)
+    handler = enable_async_logging(logger)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("falló")
+    handler.flush()
+    assert "falló" in lines[0] and "ValueError: boom" in lines[0]
+
+
+def test_drop_policy_counts_and_reports_dropped(logger):
+    gate = threading.Event()
+    sink = RecordingHandler(gate)
+    logger.addHandler(sink)
+    handler = enable_async_logging(logger, queue_size=4, overflow="drop")
+
+    for i in range(50):
+        logger.info("evento %d", i)
+    assert handler.dropped >= 40
+    gate.set()
+    handler.flush()
+    logger.info("final")
+    handler.flush()
+
+    assert "final" in sink.messages
+    notices = [m for m in sink.messages if "se descartaron" in m]
+    assert notices and f"se descartaron {handler.dropped} registros" in notices[0]
+
+
+def test_block_policy_applies_backpressure(logger):
+    gate = threading.Event()
+    sink = RecordingHandler(gate)
+    logger.addHandler(sink)
+    handler = enable_async_logging(logger, queue_size=2, overflow="block", block_timeout=5)
+
+    writer = threading.Thread(target=lambda: [logger.info("evento %d", i) for i in range(20)])
+    writer.start()
+    writer.join(timeout=0.2)
+    assert writer.is_alive()  # frenado por la cola llena
+    gate.set()
+    writer.join()
+    handler.flush()
+    assert handler.dropped == 0
+    assert len(sink.messages) == 20
+
+
+def test_disable_flushes_queue_and_restores_handlers(logger):
+    gate = threading.Event()
+    sink = RecordingHandler(gate)
+    logger.addHandler(sink)
+    enable_async_logging(logger)
+    for i in range(10):
+        logger.info("evento %d", i)
+    gate.set()
+    disable_async_logging(logger)
+    assert get_queue_handler(logger) is None
+    assert sink in logger.handlers
+    assert len(sink.messages) == 10
+
+
+def test_invalid_overflow_policy(logger):
+    with pytest.raises(ValueError):
+        enable_async_logging(logger, overflow="ignore")
+
+
+def test_structured_logger_async_mode(tmp_path):
+    log_file = tmp_path / "async.log"
+    # Sin los handlers de captura que pytest agrega a loggers sin propagación
+    logging.getLogger("VPNConnect").handlers[:] = []
+    try:
+        structured = StructuredLogger(log_file=str(log_file), async_mode=True)
+        handler = get_queue_handler(structured.logger)
+        assert handler is not None
+        # Otra instancia reutiliza la cola y los handlers existentes
+        StructuredLogger(log_file=str(log_file))
+        assert get_queue_handler(structured.logger) is handler
+        file_handlers = [h for h in handler.listener.handlers if isinstance(h, logging.FileHandler)]
+        assert len(file_handlers) == 1
+        assert not any(isinstance(h, logging.FileHandler) for h in structured.logger.handlers)
+
+        structured.log_info("mensaje asíncrono")
+        assert structured.flush()
+        assert "mensaje asíncrono" in log_file.read_text(encoding="utf-8")
+    finally:
+        disable_async_logging(logging.getLogger("VPNConnect"))
+
+
+def test_knock_server_lines_go_through_log(capsys):
+    from src.knockd.selector_loop import drain_accept
+    from src.knockd.timer_wheel import TimerWheel
+    from src.server_knock import KnockServer
+
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    lines = []
+    server = KnockServer([port], 1194, engine="selector", log=lines.append)
+    server._start_selector()
+    server.stop()
+    assert any("Escuchando knocks" in line for line in lines)
+
+    class Broken:
+        def accept(self):
+            raise OSError(9, "Bad file descriptor")
+
+    drain_accept(Broken(), 7000, None, 8, lines.append)
+    wheel = TimerWheel(tick=0.01, log=lines.append)
+    wheel.schedule(0, lambda: 1 / 0)
+    wheel.advance(wheel._origin + 1)
+    assert any(line.startswith("Error en puerto 7000") for line in lines)
+    assert any("Error en timer" in line for line in lines)
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from src.core.config_cache import ConfigCache
+from src.core.config_manager import ConfigManager
+from src.utils.exceptions import ConfigurationError
+
+
+def _config(target_ip="10.0.0.1"):
+    return {
+        "target_ip": target_ip,
+        "knock_sequence": [[7000, "tcp"], [8000, "udp"]],
+        "interval": 0.5,
+        "target_port": 1194,
+    }
+
+
+def _replace(path, config):
+    """Reemplazo atómico como el de un editor: temporal + rename"""
+    tmp = path.with_name(path.name + ".new")
+    tmp.write_text(json.dumps(config))
+    os.replace(tmp, path)
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(_config()))
+    return path
+
+
+def test_unchanged_file_returns_same_snapshot(config_file):
+    cache = ConfigCache()
+    snapshot = cache.load(config_file)
+    assert cache.load(str(config_file)) is snapshot
+    assert snapshot.plan is snapshot.plan
+    assert snapshot.config["target_ip"] == "10.0.0.1"
+
+
+def test_changed_file_is_reloaded(config_file):
+    cache = ConfigCache()
+    first = cache.load(config_file)
+    _replace(config_file, _config("10.0.0.2"))
+    second = cache.load(config_file)
+    assert second is not first
+    assert second.config["target_ip"] == "10.0.0.2"
+    assert second.plan.host == "10.0.0.2"
+
+
+def test_invalid_file_is_not_cached(config_file):
+    cache = ConfigCache()
+    first = cache.load(config_file)
+    _replace(config_file, {"target_ip": "10.0.0.3"})
+    with pytest.raises(ConfigurationError):
+        cache.load(config_file)
+    with pytest.raises(ConfigurationError):
+        cache.load(config_file)
+    assert cache.snapshot(config_file) is first
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watch_applies_edit_and_keeps_last_valid(config_file, use_inotify):
+    cache = ConfigCache(poll_interval=0.02, use_inotify=use_inotify)
+    reloaded = []
+    try:
+        cache.watch(config_file, reloaded.append)
+        if not use_inotify:
+            assert cache.watching == "polling"
+
+        _replace(config_file, _config("10.0.0.4"))
+        assert _wait_for(lambda: cache.snapshot(config_file).config["target_ip"] == "10.0.0.4")
+        assert reloaded and reloaded[-1].config["target_ip"] == "10.0.0.4"
+
+        # Una edición inválida se reporta y no reemplaza el snapshot vigente
+        _replace(config_file, {"target_ip": "10.0.0.5"})
+        time.sleep(0.2)
+        assert cache.snapshot(config_file).config["target_ip"] == "10.0.0.4"
+    finally:
+        cache.stop()
+    assert cache.watching == ""
+
+
+def test_readers_see_complete_snapshots_during_reloads(config_file):
+    cache = ConfigCache(poll_interval=0.01)
+    cache.load(config_file)
+    seen = set()
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            config = cache.snapshot(config_file).config
+            seen.add((config["target_ip"], len(config["knock_sequence"])))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(20):
+            _replace(config_file, _config(f"10.0.1.{i}"))
+            cache.load(config_file, force=True)
+    finally:
+        stop.set()
+        thread.join()
+    assert all(length == 2 for _, length in seen)
+
+
+def test_config_manager_hot_reload(config_file):
+    cache = ConfigCache(poll_interval=0.02)
+    try:
+        manager = ConfigManager(str(config_file), hot_reload=True, cache=cache)
+        other = ConfigManager(str(config_file), cache=cache)
+        assert manager.get_knock_plan() is other.get_knock_plan()
+
+        _replace(config_file, _config("10.0.0.6"))
+        assert _wait_for(lambda: manager.get_target_ip() == "10.0.0.6")
+        assert manager.get_knock_plan().host == "10.0.0.6"
+        manager.close()
+    finally:
+        cache.stop()
+
+
+def test_config_manager_update_writes_atomically(config_file):
+    cache = ConfigCache()
+    manager = ConfigManager(str(config_file), cache=cache)
+    inode = os.stat(config_file).st_ino
+    manager.update("interval", 0.25)
+    assert manager.get_interval() == 0.25
+    assert json.loads(config_file.read_text())["interval"] == 0.25
+    assert os.stat(config_file).st_ino != inode
+    assert not list(config_file.parent.glob("*.tmp"))
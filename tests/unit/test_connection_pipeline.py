@@ -0,0 +1,125 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from src.core.connection_pipeline import ConnectionPipeline
+from src.core.knock_plan import KnockPlan
+from src.core.vpn_manager import LinuxVPNManager
+
+
+class FakeConfig(dict):
+    def get_knock_plan(self):
+        return KnockPlan.compile(self)
+
+
+CONFIG = FakeConfig(
+    target_ip="127.0.0.1", knock_sequence=[[7000, "tcp"]], interval=0.01, target_port=1194
+)
+
+
+class FakeKnocker:
+    def __init__(self, opened=True, duration=0.05, firewall=0.02):
+        self.opened = opened
+        self.duration = duration
+        self.firewall = firewall
+        self.last_readiness = None
+
+    def execute_plan(self, plan, **kwargs):
+        assert plan.knocks == ((7000, "tcp"),)
+        assert kwargs["readiness_probe"] is True
+        time.sleep(self.duration)
+        self.last_readiness = {"open": self.opened, "elapsed": self.firewall, "probes": 2}
+        return self.opened
+
+
+class FakeVPN:
+    def __init__(self, prepare_time=0.0):
+        self.prepare_time = prepare_time
+        self.launched = None
+        self.cancelled = []
+
+    def prepare(self, profile_path, credentials_path=None):
+        time.sleep(self.prepare_time)
+        return ["openvpn", "--config", profile_path]
+
+    def spawn_gated(self, command):
+        return None
+
+    def launch(self, command, gated=None):
+        self.launched = command
+        return True
+
+    def cancel_gated(self, gated):
+        self.cancelled.append(gated)
+
+
+def test_pipeline_overlaps_prepare_with_knocks():
+    vpn = FakeVPN(prepare_time=0.04)
+    stages = []
+    pipeline = ConnectionPipeline(FakeKnocker(duration=0.08), vpn, CONFIG)
+
+    result = pipeline.run("profile.ovpn", None, on_stage=stages.append)
+
+    assert result["success"] is True
+    assert stages == ["knock", "launch", "connected"]
+    assert vpn.launched == ["openvpn", "--config", "profile.ovpn"]
+    timings = result["timings"]
+    assert set(timings) >= {"prepare", "knock", "readiness", "prepare_wait", "launch", "total"}
+    # La preparación corrió durante los knocks: nada que esperar después
+    assert timings["prepare_wait"] < 0.02
+    assert timings["total"] < 0.08 + 0.04
+    assert timings["readiness"] == pytest.approx(0.02)
+
+
+def test_pipeline_reports_failed_readiness_without_launching():
+    vpn = FakeVPN()
+    pipeline = ConnectionPipeline(FakeKnocker(opened=False), vpn, CONFIG)
+
+    result = pipeline.run()
+
+    assert result["success"] is False
+    assert result["failed_stage"] == "readiness"
+    assert vpn.launched is None
+
+
+def test_pipeline_reports_missing_profile():
+    vpn = LinuxVPNManager()
+    pipeline = ConnectionPipeline(FakeKnocker(), vpn, CONFIG)
+
+    result = pipeline.run("no-existe.ovpn")
+
+    assert result["success"] is False
+    assert result["failed_stage"] == "prepare"
+    assert "no-existe.ovpn" in result["error"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requiere POSIX")
+def test_gated_process_runs_command_only_on_go(tmp_path):
+    vpn = LinuxVPNManager()
+    marker = tmp_path / "launched"
+    command = [sys.executable, "-c", f"open({str(marker)!r}, 'w').close()"]
+
+    cancelled = vpn.spawn_gated(command)
+    vpn.cancel_gated(cancelled)
+    assert cancelled.returncode == 0
+    assert not marker.exists()
+
+    gated = vpn.spawn_gated(command)
+    assert vpn.launch(command, gated) is True
+    assert marker.exists()
+    assert vpn.connected is True
+
+
+def test_prepare_resolves_credentials_next_to_profile(monkeypatch, tmp_path):
+    profile = tmp_path / "profile.ovpn"
+    credentials = tmp_path / "credentials.txt"
+    profile.write_text("dummy")
+    credentials.write_text("user\npass\n")
+    monkeypatch.chdir(tmp_path)
+
+    command = LinuxVPNManager().prepare("profile.ovpn", "credentials.txt")
+
+    assert command[command.index("--config") + 1] == str(Path.cwd() / "profile.ovpn")
+    assert command[command.index("--auth-user-pass") + 1] == str(Path.cwd() / "credentials.txt")
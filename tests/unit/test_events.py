@@ -0,0 +1,110 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from src.monitoring.events import (
+    EventLayout,
+    JsonlEventSink,
+    TimestampCache,
+    encode_value,
+    get_event_sink,
+    read_events,
+)
+from src.monitoring.logger import StructuredLogger
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "10.0.0.1",
+        'comillas " y \\ barras',
+        "línea\nnueva\tcon ñ",
+        "",
+        0,
+        -17,
+        2**70,
+        1.25,
+        float("nan"),
+        None,
+        True,
+        False,
+        {"knock": 0.5, "launch": 12.3},
+        [{"port": 7000, "ok": True}],
+    ],
+)
+def test_encode_value_round_trips(value):
+    decoded = json.loads(encode_value(value))
+    if isinstance(value, float) and value != value:
+        assert decoded != decoded
+    else:
+        assert decoded == value
+        assert type(decoded) is type(value)
+
+
+def test_layout_encodes_one_json_line():
+    layout = EventLayout("connection_attempt", ("target_ip", "result", "duration_ms"))
+    line = layout.encode(b"2026-01-02T03:04:05.000006", ("10.0.0.1", "success", 12.5))
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    assert json.loads(line) == {
+        "timestamp": "2026-01-02T03:04:05.000006",
+        "event": "connection_attempt",
+        "target_ip": "10.0.0.1",
+        "result": "success",
+        "duration_ms": 12.5,
+    }
+    with pytest.raises(ValueError):
+        layout.encode(b"", ("10.0.0.1",))
+
+
+def test_timestamp_cache_matches_local_time():
+    before = datetime.now()
+    stamp = datetime.fromisoformat(TimestampCache().now().decode())
+    after = datetime.now()
+    assert before <= stamp <= after
+
+
+def test_sink_buffers_until_flush(tmp_path):
+    path = tmp_path / "events.jsonl"
+    layout = EventLayout("audit", ("action",))
+    with JsonlEventSink(path) as sink:
+        sink.emit(layout, "login")
+        assert not path.exists() or path.read_bytes() == b""
+        sink.flush()
+        assert len(path.read_bytes().splitlines()) == 1
+        sink.emit(layout, "logout", flush=True)
+        assert len(path.read_bytes().splitlines()) == 2
+    assert [e["action"] for e in read_events(path)] == ["login", "logout"]
+
+
+def test_read_events_filters_and_skips_truncated_lines(tmp_path):
+    path = tmp_path / "events.jsonl"
+    with JsonlEventSink(path) as sink:
+        for i in range(5):
+            sink.emit(EventLayout("a", ("n",)), i)
+            sink.emit(EventLayout("b", ("n",)), i)
+    with open(path, "ab") as f:
+        f.write(b'{"timestamp":"2026-01-0')
+
+    assert [e["n"] for e in read_events(path, events=["b"])] == list(range(5))
+    assert len(list(read_events(path))) == 10
+    with pytest.raises(ValueError):
+        list(read_events(path, strict=True))
+
+
+def test_event_sinks_are_shared_per_path(tmp_path):
+    assert get_event_sink(tmp_path / "x.jsonl") is get_event_sink(str(tmp_path / "x.jsonl"))
+
+
+def test_structured_logger_writes_events(tmp_path):
+    events_file = tmp_path / "events.jsonl"
+    logger = StructuredLogger(log_file=str(tmp_path / "text.log"), events_file=str(events_file))
+    logger.log_connection_attempt("10.0.0.1", True, 0.0123)
+    logger.log_pipeline("10.0.0.1", False, "knock", {"knock": 0.5})
+    logger.log_audit("config_update", "interval=0.25")
+
+    events = list(read_events(events_file))
+    assert [e["event"] for e in events] == ["connection_attempt", "connection_pipeline", "audit"]
+    assert events[0]["result"] == "success" and events[0]["duration_ms"] == 12.3
+    assert events[1]["stages_ms"] == {"knock": 500.0}
+    assert events[2]["details"] == "interval=0.25"
@@ -0,0 +1,45 @@
+from src.knockd.grants import GrantTable
+
+
+def test_grant_is_per_source():
+    table = GrantTable()
+    grant, new = table.grant("10.0.0.1", 1194, expiry=30.0)
+
+    assert new and grant.ip == "10.0.0.1"
+    assert table.allows("10.0.0.1", 1194, now=10.0)
+    assert not table.allows("10.0.0.2", 1194, now=10.0)
+    assert not table.allows("10.0.0.1", 22, now=10.0)
+    assert not table.allows("10.0.0.1", 1194, now=30.0)
+
+
+def test_regrant_extends_window():
+    table = GrantTable()
+    first, _ = table.grant("10.0.0.1", 1194, expiry=30.0)
+    second, new = table.grant("10.0.0.1", 1194, expiry=45.0)
+
+    assert second is first and not new
+    assert first.expiry == 45.0
+    assert table.active_on(1194) == 1
+
+
+def test_revoke_counts_remaining_per_port():
+    table = GrantTable()
+    table.grant("10.0.0.1", 1194, expiry=30.0)
+    table.grant("10.0.0.2", 1194, expiry=30.0)
+    table.grant("10.0.0.1", 22, expiry=30.0)
+
+    assert table.revoke("10.0.0.1", 1194) == 1
+    assert table.revoke("10.0.0.2", 1194) == 0
+    assert table.revoke("10.0.0.2", 1194) == 0
+    assert table.active_on(22) == 1
+    assert len(table) == 1
+
+
+def test_thousands_of_concurrent_grants():
+    table = GrantTable()
+    for i in range(5000):
+        table.grant(f"10.0.{i // 256}.{i % 256}", 1194, expiry=60.0)
+
+    assert len(table) == 5000
+    assert table.active_on(1194) == 5000
+    assert table.allows("10.0.19.135", 1194, now=1.0)
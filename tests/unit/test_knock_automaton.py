@@ -0,0 +1,51 @@
+import pytest
+
+from src.knockd.automaton import KnockAutomaton
+
+A, B, C = (7000, "tcp"), (8000, "tcp"), (9000, "udp")
+
+
+def run(automaton, knocks):
+    state = 0
+    for knock in knocks:
+        state = automaton.step(state, knock)
+    return state
+
+
+def test_exact_sequence_completes():
+    automaton = KnockAutomaton([A, B, C])
+    assert automaton.is_complete(run(automaton, [A, B, C]))
+
+
+def test_protocol_is_part_of_the_knock():
+    automaton = KnockAutomaton([A, B, C])
+    assert run(automaton, [A, B, (9000, "tcp")]) == 0
+
+
+def test_overlapping_prefix_is_recovered():
+    automaton = KnockAutomaton([A, B, A, C])
+    # Tras A B A el knock B rompe la secuencia pero "A B" sigue siendo prefijo válido
+    assert run(automaton, [A, B, A, B]) == 2
+    assert automaton.is_complete(run(automaton, [A, B, A, B, A, C]))
+
+
+def test_repeated_first_knock_keeps_progress():
+    automaton = KnockAutomaton([A, B])
+    assert automaton.is_complete(run(automaton, [A, A, A, B]))
+
+
+def test_unknown_knock_resets_to_zero():
+    automaton = KnockAutomaton([A, B, C])
+    assert run(automaton, [A, B, (1234, "tcp")]) == 0
+
+
+def test_state_after_completion_allows_overlap():
+    automaton = KnockAutomaton([A, B, A])
+    complete = run(automaton, [A, B, A])
+    assert automaton.is_complete(complete)
+    assert automaton.step(complete, B) == 2
+
+
+def test_empty_sequence_rejected():
+    with pytest.raises(ValueError):
+        KnockAutomaton([])
@@ -0,0 +1,87 @@
+import json
+import socket
+import time
+
+import pytest
+
+from src.core.config_manager import ConfigManager
+from src.core.knock_plan import KnockPlan
+from src.core.port_knocker import PortKnocker
+
+CONFIG = {
+    "target_ip": "127.0.0.1",
+    "knock_sequence": [[7000, "tcp"], [8000, "udp", "abc"], [9000, "TCP"]],
+    "interval": 0.25,
+    "target_port": 1194,
+}
+
+
+def test_compile_builds_immutable_tuples():
+    plan = KnockPlan.compile(CONFIG)
+
+    assert plan.knocks == ((7000, "tcp"), (8000, "udp", b"abc"), (9000, "tcp"))
+    assert plan.offsets == (0.0, 0.25, 0.5)
+    assert plan.labels == ("7000/tcp", "8000/udp", "9000/tcp")
+    assert plan.addresses == ((socket.AF_INET, "127.0.0.1"),)
+    assert plan.families == (socket.AF_INET,)
+    assert plan.fresh_addresses() == [(socket.AF_INET, "127.0.0.1")]
+    assert len(plan) == 3
+    assert not hasattr(plan, "__dict__")
+    with pytest.raises(AttributeError):
+        plan.interval = 1
+    with pytest.raises(AttributeError):
+        del plan.knocks
+
+
+def test_unresolvable_host_compiles_without_addresses(monkeypatch):
+    def fail(*args, **kwargs):
+        raise socket.gaierror(socket.EAI_NONAME, "no existe")
+
+    monkeypatch.setattr(socket, "getaddrinfo", fail)
+    plan = KnockPlan.compile(dict(CONFIG, target_ip="no-existe.invalid"))
+
+    assert plan.addresses == ()
+    assert plan.fresh_addresses() is None
+
+
+def test_config_manager_caches_plan_until_file_changes(tmp_path):
+    config = dict(CONFIG, knock_sequence=[[7000, "tcp"], [8000, "udp", "abc"]])
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config))
+    manager = ConfigManager(str(path))
+
+    plan = manager.get_knock_plan()
+    assert manager.get_knock_plan() is plan
+
+    path.write_text(json.dumps(dict(config, interval=1.5)))
+    replanned = manager.get_knock_plan()
+    assert replanned is not plan
+    assert replanned.interval == 1.5
+    assert manager.get_interval() == 1.5
+
+
+def test_execute_plan_uses_compiled_addresses_and_offsets(monkeypatch):
+    class NoDNS:
+        def resolve(self, host):
+            raise AssertionError("no debe resolver")
+
+    pk = PortKnocker(verbose=False, resolver=NoDNS())
+    fired = []
+    monkeypatch.setattr(pk, "_knock_port", lambda ip, *knock: fired.append((ip,) + knock) or True)
+    monkeypatch.setattr(pk, "_tcp_ping", lambda ip, port, timeout=1: False)
+    monkeypatch.setattr(
+        pk,
+        "_verify_port_open",
+        lambda ip, port: {"open": True, "success_count": 1, "total_attempts": 1, "avg_latency": 0},
+    )
+    real_sleep = time.sleep
+    monkeypatch.setattr(time, "sleep", lambda s: real_sleep(s) if s < 1 else None)
+    plan = KnockPlan.compile(dict(CONFIG, interval=0.02))
+
+    assert pk.execute_plan(plan, precise_timing=True)
+    assert fired == [
+        ("127.0.0.1", 7000, "tcp"),
+        ("127.0.0.1", 8000, "udp", b"abc"),
+        ("127.0.0.1", 9000, "tcp"),
+    ]
+    assert [k["planned"] for k in pk.last_schedule["knocks"]] == list(plan.offsets)
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from src.knockd.automaton import KnockAutomaton
+from src.knockd.policies import KnockPolicy, load_policies
+from src.server_knock import KnockServer
+
+
+def policy_dict(name, sequence, target_port, **extra):
+    return {"name": name, "knock_sequence": sequence, "target_port": target_port, **extra}
+
+
+def test_load_policies_from_config():
+    cfg = {
+        "policies": [
+            policy_dict("a", [[7000, "tcp"], [8000, "udp"]], 1194, ttl=10),
+            policy_dict("b", [[9000, "tcp"]], 2222, allowed_cidrs=["10.0.0.0/8"]),
+        ]
+    }
+    policies = load_policies(cfg)
+
+    assert [p.name for p in policies] == ["a", "b"]
+    assert policies[0].sequence == ((7000, "tcp"), (8000, "udp"))
+    assert policies[0].ttl == 10
+    assert policies[1].allows("10.1.2.3")
+    assert not policies[1].allows("192.168.0.1")
+
+
+def test_grant_window_is_default_policy_ttl():
+    cfg = {
+        "grant_window": 90,
+        "policies": [
+            policy_dict("a", [[7000, "tcp"]], 1194),
+            policy_dict("b", [[9000, "tcp"]], 2222, ttl=10),
+        ],
+    }
+
+    assert [p.ttl for p in load_policies(cfg)] == [90, 10]
+    assert [p.ttl for p in load_policies(cfg, default_ttl=5)] == [5, 10]
+
+
+def test_load_policies_missing_field():
+    with pytest.raises(ValueError):
+        load_policies({"policies": [{"name": "x", "target_port": 1194}]})
+
+
+def test_shared_trie_matches_each_policy():
+    sequences = [
+        [(7000, "tcp"), (8000, "tcp")],
+        [(7000, "tcp"), (9000, "tcp")],
+        [(8000, "tcp"), (9000, "tcp"), (7000, "tcp")],
+    ]
+    automaton = KnockAutomaton.from_sequences(sequences)
+    # Prefijo común compartido: 1 raíz + 7000 + 8000/9000 + 8000-9000-7000
+    assert automaton.state_count == 7
+
+    state = 0
+    for knock in [(8000, "tcp"), (9000, "tcp"), (7000, "tcp"), (9000, "tcp")]:
+        state = automaton.step(state, knock)
+        if knock == (7000, "tcp"):
+            assert automaton.matches(state) == (2,)
+    assert automaton.matches(state) == (1,)
+
+
+def test_server_opens_port_of_matching_policy(tmp_path):
+    cfg = {
+        "interval": 5,
+        "policies": [
+            policy_dict("a", [[7000, "tcp"], [8000, "tcp"]], 1194),
+            policy_dict("b", [[7000, "tcp"], [9000, "udp"]], 2222, ttl=5),
+            policy_dict("c", [[7000, "tcp"], [8000, "tcp"]], 3333, allowed_cidrs=["10.9.0.0/16"]),
+        ],
+    }
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(cfg))
+
+    server = KnockServer(None, None, config_path=str(path))
+    opened = []
+    server.open_vpn_port = lambda policy=None, ip=None: opened.append(policy.name)
+
+    server.handle_knock("10.0.0.1", 7000, "tcp")
+    server.handle_knock("10.0.0.1", 9000, "udp")
+    assert opened == ["b"]
+
+    # La política "c" comparte secuencia con "a" pero restringe el origen
+    server.handle_knock("10.0.0.1", 7000, "tcp")
+    server.handle_knock("10.0.0.1", 8000, "tcp")
+    assert opened == ["b", "a"]
+
+    server.handle_knock("10.9.1.1", 7000, "tcp")
+    server.handle_knock("10.9.1.1", 8000, "tcp")
+    assert opened == ["b", "a", "a", "c"]
+
+    assert set(server.listen_knocks) == {(7000, "tcp"), (8000, "tcp"), (9000, "udp")}
+
+
+def test_policy_validation():
+    with pytest.raises(ValueError):
+        KnockPolicy("x", [], 1194)
+    with pytest.raises(ValueError):
+        KnockPolicy("x", [7000], 70000)
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from src.core.knock_scheduler import KnockScheduler
+from src.core.port_knocker import PortKnocker
+
+
+def test_slow_knock_does_not_delay_next():
+    release = threading.Event()
+
+    def fire(port, protocol):
+        if port == 1:
+            # Primer knock "filtrado": tarda mucho más que el intervalo
+            release.wait(1)
+        return True
+
+    report = KnockScheduler(0.05).run([(1, "tcp"), (2, "tcp"), (3, "udp")], fire)
+    release.set()
+
+    assert report["completed"]
+    assert [k["planned"] for k in report["knocks"]] == pytest.approx([0.0, 0.05, 0.1])
+    assert report["knocks"][2]["actual"] < 0.5
+    assert report["max_lag"] < 0.04
+    assert all(k["ok"] for k in report["knocks"])
+
+
+def test_failed_knock_is_reported():
+    def fire(port, protocol):
+        if protocol == "udp":
+            raise OSError("sin ruta")
+        return port != 2
+
+    report = KnockScheduler(0).run([(1, "tcp"), (2, "tcp"), (3, "udp")], fire)
+
+    assert [k["ok"] for k in report["knocks"]] == [True, False, False]
+
+
+def test_should_stop_cancels_remaining():
+    calls = []
+    report = KnockScheduler(0).run(
+        [(1, "tcp"), (2, "tcp"), (3, "tcp")],
+        lambda port, protocol: calls.append(port) or True,
+        should_stop=lambda: len(calls) >= 1,
+    )
+
+    assert not report["completed"]
+    assert [k["port"] for k in report["knocks"]] == [1]
+
+
+def test_negative_interval_rejected():
+    with pytest.raises(ValueError):
+        KnockScheduler(-1)
+
+
+def test_execute_sequence_precise_timing(monkeypatch):
+    pk = PortKnocker(verbose=False)
+    monkeypatch.setattr(pk, "_tcp_ping", lambda ip, port, timeout=1: False)
+    monkeypatch.setattr(pk, "_knock_port", lambda ip, port, protocol: True)
+    monkeypatch.setattr(
+        pk,
+        "_verify_port_open",
+        lambda ip, port: {"open": True, "success_count": 1, "total_attempts": 3, "avg_latency": 1},
+    )
+    real_sleep = time.sleep
+    # La espera del firewall se omite; las del planificador son reales y cortas
+    monkeypatch.setattr(time, "sleep", lambda s: real_sleep(s) if s < 1 else None)
+
+    assert pk.execute_sequence(
+        "127.0.0.1", [(7000, "tcp"), (8000, "udp")], 0.02, 1194, precise_timing=True
+    )
+    assert pk.last_schedule["completed"]
+    assert [k["port"] for k in pk.last_schedule["knocks"]] == [7000, 8000]
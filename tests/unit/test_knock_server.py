@@ -0,0 +1,226 @@
+import socket
+import time
+
+import pytest
+
+from src.core.port_knocker import PortKnocker
+from src.knockd.policies import KnockPolicy
+from src.server_knock import KnockServer
+
+
+def free_ports(count):
+    socks, ports = [], []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        socks.append(s)
+        ports.append(s.getsockname()[1])
+    for s in socks:
+        s.close()
+    return ports
+
+
+def knock(port):
+    s = socket.socket()
+    s.settimeout(1)
+    try:
+        s.connect(("127.0.0.1", port))
+    finally:
+        s.close()
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_handle_knock_opens_on_correct_sequence(monkeypatch):
+    server = KnockServer([7000, 8000], 1194, override_interval=5)
+    opened = []
+    monkeypatch.setattr(server, "open_vpn_port", lambda *a: opened.append(True))
+
+    server.handle_knock("10.0.0.1", 7000)
+    server.handle_knock("10.0.0.1", 8000)
+
+    assert opened == [True]
+    assert server.sources.state_of("10.0.0.1") == 0
+
+
+def test_handle_knock_wrong_sequence_resets(monkeypatch):
+    server = KnockServer([7000, 8000], 1194, override_interval=5)
+    opened = []
+    monkeypatch.setattr(server, "open_vpn_port", lambda *a: opened.append(True))
+
+    server.handle_knock("10.0.0.1", 7000)
+    server.handle_knock("10.0.0.1", 9000)
+
+    assert opened == []
+    assert server.sources.state_of("10.0.0.1") == 0
+
+    # Un knock equivocado que inicia la secuencia se conserva como prefijo
+    server.handle_knock("10.0.0.1", 8000)
+    server.handle_knock("10.0.0.1", 7000)
+    assert server.sources.state_of("10.0.0.1") == 1
+
+
+def test_handle_knock_interval_exceeded_resets(monkeypatch):
+    server = KnockServer([7000, 8000], 1194, override_interval=1)
+    opened = []
+    monkeypatch.setattr(server, "open_vpn_port", lambda *a: opened.append(True))
+
+    server.handle_knock("10.0.0.1", 7000)
+    server.sources.get("10.0.0.1").last_seen -= 2
+    server.handle_knock("10.0.0.1", 8000)
+
+    assert opened == []
+    assert server.sources.state_of("10.0.0.1") == 0
+
+
+def test_stalled_sequence_expires_from_timer_wheel(monkeypatch):
+    server = KnockServer([7000, 8000, 9000], 1194, override_interval=1)
+    monkeypatch.setattr(server, "open_vpn_port", lambda *a: None)
+
+    server.handle_knock("10.0.0.1", 7000)
+    entry = server.sources.get("10.0.0.1")
+    assert entry.timer.active
+
+    # Un knock nuevo reprograma el timer en vez de sumar otro
+    server.handle_knock("10.0.0.1", 8000)
+    assert len(server.timers) == 1
+
+    server.timers.advance(now=time.monotonic() + 1.5)
+    assert "10.0.0.1" not in server.sources
+    assert len(server.timers) == 0
+
+
+def test_vpn_port_closes_from_timer_wheel():
+    (target,) = free_ports(1)
+    server = KnockServer([7000], target)
+
+    server.open_vpn_port(KnockPolicy("p", [7000], target, ttl=2), "127.0.0.1")
+    assert server.vpn_port_open
+    knock(target)
+
+    server.timers.advance(now=time.monotonic() + 1)
+    assert server.vpn_port_open
+
+    server.timers.advance(now=time.monotonic() + 2.5)
+    assert not server.vpn_port_open
+    assert len(server.grants) == 0
+    with pytest.raises(ConnectionRefusedError):
+        knock(target)
+
+
+def test_grants_are_per_client_with_own_window(monkeypatch):
+    (target,) = free_ports(1)
+    server = KnockServer([7000, 8000], target, override_interval=5, window=10)
+    try:
+        for ip in ["10.0.0.1", "10.0.0.2"]:
+            server.handle_knock(ip, 7000)
+            server.handle_knock(ip, 8000)
+
+        assert server.grants.allows("10.0.0.1", target)
+        assert server.grants.allows("10.0.0.2", target)
+        assert not server.grants.allows("127.0.0.1", target)
+        assert server.grants.get("10.0.0.1", target).expiry <= time.monotonic() + 10
+
+        # Vence la ventana del primero; el puerto sigue abierto para el segundo
+        server.grants.get("10.0.0.1", target).timer.cancel()
+        server._expire_grant(server.grants.get("10.0.0.1", target))
+        assert not server.grants.allows("10.0.0.1", target)
+        assert server.vpn_port_open
+    finally:
+        server.stop()
+    assert not server.vpn_port_open
+
+
+def test_protected_port_drops_sources_without_grant(capsys):
+    (target,) = free_ports(1)
+    server = KnockServer([7000], target, engine="selector")
+    server.start(block=False)
+    knocker = PortKnocker(verbose=False)
+    try:
+        # Otra IP tiene autorización, ésta no: el SYN se descarta antes del handshake
+        server.open_vpn_port(server.policies[0], "10.0.0.9")
+        assert server.vpn_port_open
+        with pytest.raises(socket.timeout):
+            knock(target)
+        assert not knocker._tcp_ping("127.0.0.1", target, timeout=0.2)
+
+        server.open_vpn_port(server.policies[0], "127.0.0.1")
+        knock(target)
+        assert wait_for(
+            lambda: f"Conexión de 127.0.0.1 a puerto {target} autorizada" in capsys.readouterr().out
+        )
+
+        # Vence la propia ventana y la otra sigue vigente: vuelve a descartarse
+        grant = server.grants.get("127.0.0.1", target)
+        grant.timer.cancel()
+        server._expire_grant(grant)
+        assert server.vpn_port_open
+        assert not knocker._tcp_ping("127.0.0.1", target, timeout=0.2)
+        assert "rechazada" not in capsys.readouterr().out
+    finally:
+        server.stop()
+
+
+def test_handle_knock_distinguishes_protocol(monkeypatch):
+    server = KnockServer([7000, "8000/udp"], 1194, override_interval=5)
+    opened = []
+    monkeypatch.setattr(server, "open_vpn_port", lambda *a: opened.append(True))
+
+    server.handle_knock("10.0.0.1", 7000, "tcp")
+    server.handle_knock("10.0.0.1", 8000, "tcp")
+    assert opened == []
+
+    server.handle_knock("10.0.0.1", 7000, "tcp")
+    server.handle_knock("10.0.0.1", 8000, "udp")
+    assert opened == [True]
+
+
+def test_selector_engine_accepts_knocks_from_single_loop(monkeypatch):
+    ports = free_ports(3)
+    server = KnockServer(ports, 1194, override_interval=5, engine="selector")
+    opened = []
+    monkeypatch.setattr(server, "open_vpn_port", lambda *a: opened.append(True))
+
+    server.start(block=False)
+    try:
+        for port in ports:
+            knock(port)
+        assert wait_for(lambda: opened == [True])
+        assert len(server._loop.listeners) == 3
+    finally:
+        server.stop()
+
+    # Tras stop() los puertos quedan libres para reutilizarse
+    assert wait_for(lambda: not server._loop.listeners)
+
+
+def test_selector_engine_handles_udp_knocks(monkeypatch):
+    tcp_port, udp_port = free_ports(2)
+    server = KnockServer(
+        [tcp_port, (udp_port, "udp")], 1194, override_interval=5, engine="selector"
+    )
+    opened = []
+    monkeypatch.setattr(server, "open_vpn_port", lambda *a: opened.append(True))
+
+    server.start(block=False)
+    try:
+        knock(tcp_port)
+        assert wait_for(lambda: server.sources.state_of("127.0.0.1"))
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp.sendto(b"", ("127.0.0.1", udp_port))
+        udp.close()
+        assert wait_for(lambda: opened == [True])
+    finally:
+        server.stop()
+
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError):
+        KnockServer([7000], 1194, engine="fork")
@@ -0,0 +1,132 @@
+import gzip
+import logging
+import os
+import threading
+import time
+
+import pytest
+
+from src.monitoring import rotation as rotation_module
+from src.monitoring.events import EventLayout, JsonlEventSink, read_events
+from src.monitoring.rotation import DailyRotatingFileHandler, LogRotation, wait_for_rotation
+
+
+def _lines(directory):
+    """Todas las líneas de la familia, comprimidas o no"""
+    lines = []
+    for path in directory.iterdir():
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    return lines
+
+
+@pytest.fixture
+def file_logger(tmp_path, request):
+    def make(rotation):
+        handler = DailyRotatingFileHandler(rotation)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger(f"test.rotation.{request.node.name}")
+        logger.handlers[:] = [handler]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        return logger, handler
+
+    yield make
+    logging.getLogger(f"test.rotation.{request.node.name}").handlers[:] = []
+
+
+def test_size_rotation_compresses_in_background(tmp_path, file_logger):
+    rotation = LogRotation(
+        tmp_path, "app_{date}.log", max_bytes=500, retention_days=0, max_backups=0
+    )
+    logger, handler = file_logger(rotation)
+    for i in range(200):
+        logger.info("evento %04d", i)
+    handler.close()
+    assert wait_for_rotation()
+
+    active = rotation.current_path()
+    backups = rotation.backups()
+    assert active.exists() and backups
+    assert all(path.name.endswith(".log.gz") for path in backups)
+    assert sorted(_lines(tmp_path)) == [f"evento {i:04d}" for i in range(200)]
+
+
+def test_day_change_switches_file(tmp_path):
+    rotation = LogRotation(tmp_path, "app_{date}.log", max_bytes=0)
+    today = rotation.current_path()
+    today.write_text("ayer\n")
+    tomorrow = rotation.rollover(today, time.time() + 86400)
+    assert wait_for_rotation()
+    assert tomorrow != today and tomorrow.name.startswith("app_")
+    assert not today.exists()
+    assert gzip.open(f"{today}.gz", "rt").read() == "ayer\n"
+
+
+def test_midnight_triggers_handler_rollover(tmp_path, file_logger):
+    rotation = LogRotation(tmp_path, "app.log", max_bytes=0)
+    logger, handler = file_logger(rotation)
+    logger.info("antes")
+    handler.rollover_at = 0  # simula que pasó la medianoche
+    logger.info("después")
+    handler.close()
+    assert wait_for_rotation()
+    assert (tmp_path / "app.log").read_text() == "después\n"
+    assert gzip.open(tmp_path / "app.1.log.gz", "rt").read() == "antes\n"
+    assert handler.rollover_at > time.time()
+
+
+def test_retention_by_age_and_count(tmp_path):
+    rotation = LogRotation(tmp_path, "app_{date}.log", retention_days=7, max_backups=3)
+    now = time.time()
+    for age_days in (1, 2, 3, 4, 10):
+        path = tmp_path / f"app_202001{age_days:02d}.log.gz"
+        path.write_bytes(b"")
+        os.utime(path, (now - age_days * 86400, now - age_days * 86400))
+    unrelated = tmp_path / "otro.log"
+    unrelated.write_text("x")
+    active = rotation.current_path()
+    active.write_text("x")
+
+    removed = rotation.prune()
+    assert sorted(p.name for p in removed) == ["app_20200104.log.gz", "app_20200110.log.gz"]
+    assert unrelated.exists() and active.exists()
+    assert len(rotation.backups()) == 3
+
+
+def test_rollover_does_not_wait_for_compression(tmp_path, file_logger, monkeypatch):
+    gate = threading.Event()
+    real_compress = rotation_module.compress_file
+
+    def slow_compress(path):
+        gate.wait(5)
+        return real_compress(path)
+
+    monkeypatch.setattr(rotation_module, "compress_file", slow_compress)
+    rotation = LogRotation(tmp_path, "app.log", max_bytes=100)
+    logger, handler = file_logger(rotation)
+
+    start = time.monotonic()
+    for i in range(50):
+        logger.info("evento %04d con algo de texto", i)
+    elapsed = time.monotonic() - start
+    gate.set()
+    handler.close()
+    assert wait_for_rotation()
+    assert elapsed < 1.0
+    assert len(_lines(tmp_path)) == 50
+
+
+def test_event_sink_rotates_by_size(tmp_path):
+    rotation = LogRotation(tmp_path, "events_{date}.jsonl", max_bytes=300, max_backups=0)
+    layout = EventLayout("knock", ("n",))
+    with JsonlEventSink(rotation=rotation, buffer_size=0) as sink:
+        for i in range(40):
+            sink.emit(layout, i)
+    assert wait_for_rotation()
+
+    files = [rotation.current_path()] + rotation.backups()
+    assert len(files) > 2
+    numbers = sorted(e["n"] for path in files for e in read_events(path))
+    assert numbers == list(range(40))
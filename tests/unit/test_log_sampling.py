@@ -0,0 +1,102 @@
+import pytest
+
+from src.knockd.sampling import LogSampler
+from src.server_knock import KnockServer
+
+
+def test_token_bucket_limits_each_source_independently():
+    lines = []
+    sampler = LogSampler(lines.append, rate=1, burst=3, global_rate=0, schedule=lambda *a: None)
+    allowed = [sampler.allow("10.0.0.1", "knock", now=100.0) for _ in range(10)]
+    assert allowed == [True] * 3 + [False] * 7
+    # Otra IP tiene su propia ráfaga
+    assert sampler.allow("10.0.0.2", "knock", now=100.0)
+    # Tras 2 s la primera IP recupera 2 tokens
+    assert [sampler.allow("10.0.0.1", "knock", now=102.0) for _ in range(3)] == [True, True, False]
+    assert sampler.suppressed == 8
+    assert lines == []
+
+
+def test_flush_summarizes_suppressed_events_by_source_and_kind():
+    lines = []
+    sampler = LogSampler(
+        lines.append, rate=1, burst=1, global_rate=0, top=2, schedule=lambda *a: None
+    )
+    for ip, extra in (("10.0.0.1", 5), ("10.0.0.2", 3), ("10.0.0.3", 2), ("10.0.0.4", 1)):
+        for _ in range(extra + 1):
+            sampler.allow(ip, "knock", now=1.0)
+    sampler.allow("10.0.0.1", "secuencia incorrecta", now=1.0)
+
+    assert sampler.flush() == [
+        "[knockd] 6 eventos suprimidos de 10.0.0.1 (knock: 5, secuencia incorrecta: 1)",
+        "[knockd] 3 eventos suprimidos de 10.0.0.2 (knock: 3)",
+        "[knockd] 3 eventos suprimidos de 2 IPs más (knock: 3)",
+    ]
+    assert lines[-1].startswith("[knockd] 3 eventos suprimidos de 2 IPs más")
+    # Lo ya resumido no se repite
+    assert sampler.flush() == []
+
+
+def test_summary_is_scheduled_once_per_interval():
+    scheduled = []
+    sampler = LogSampler(
+        lambda line: None, rate=1, burst=1, interval=5, schedule=lambda *a: scheduled.append(a)
+    )
+    for _ in range(50):
+        sampler.allow("10.0.0.1", "knock", now=1.0)
+    assert len(scheduled) == 1 and scheduled[0] == (5.0, sampler.flush)
+    sampler.flush()
+    sampler.allow("10.0.0.1", "knock", now=1.0)
+    assert len(scheduled) == 2
+
+
+def test_global_bucket_and_eviction_bound_spoofed_floods():
+    lines = []
+    sampler = LogSampler(
+        lines.append, rate=1, burst=2, global_rate=10, max_sources=8, schedule=lambda *a: None
+    )
+    ips = [f"10.0.{i // 256}.{i % 256}" for i in range(1000)]
+    allowed = sum(sampler.allow(ip, "knock", now=1.0) for ip in ips)
+    assert allowed == 10
+    summary = sampler.flush()
+    assert len(summary) == 6 and "de otros orígenes" in summary[-1]
+    assert sum(int(line.split()[1]) for line in summary) == 990 == sampler.suppressed
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        LogSampler(print, burst=0)
+
+
+def test_scan_keeps_security_events_and_bounds_log_volume(monkeypatch):
+    lines = []
+    server = KnockServer([7000, 8000], 1194, override_interval=5, log=lines.append, log_rate=1)
+    server.sampler.burst = 4.0
+    granted = []
+    monkeypatch.setattr(server, "open_vpn_port", lambda policy, ip: granted.append(ip))
+
+    # Escaneo: miles de knocks fuera de secuencia desde una IP
+    for i in range(2000):
+        server.handle_knock("10.9.9.9", 7000 if i % 2 else 9000)
+    # Un cliente legítimo en medio del escaneo
+    server.handle_knock("10.0.0.1", 7000)
+    server.handle_knock("10.0.0.1", 8000)
+    server.stop()
+
+    assert granted.count("10.0.0.1") == 1
+    assert any("SECUENCIA CORRECTA de 10.0.0.1" in line for line in lines)
+    scanner = [line for line in lines if "10.9.9.9" in line]
+    assert len(scanner) < 20
+    summary = [line for line in scanner if "eventos suprimidos" in line]
+    assert len(summary) == 1 and "(knock: " in summary[0]
+    suppressed = int(summary[0].split()[1])
+    # 2000 knocks + 999 secuencias incorrectas: cada uno escrito o contado
+    assert len(scanner) - 1 + suppressed == 2999
+
+
+def test_log_rate_zero_disables_sampling():
+    lines = []
+    server = KnockServer([7000, 8000], 1194, override_interval=5, log=lines.append, log_rate=0)
+    for _ in range(100):
+        server.handle_knock("10.9.9.9", 9000)
+    assert sum("Knock recibido" in line for line in lines) == 100
@@ -0,0 +1,137 @@
+import json
+import multiprocessing
+import time
+
+import pytest
+
+from src.monitoring.metrics import MetricsCollector
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def collector(tmp_path):
+    created = []
+
+    def make(**kwargs):
+        kwargs.setdefault("flush_interval", 60)
+        instance = MetricsCollector(str(tmp_path / "metrics.json"), **kwargs)
+        created.append(instance)
+        return instance
+
+    yield make
+    for instance in created:
+        instance.close()
+
+
+def test_record_does_no_io_until_flush(collector, tmp_path):
+    metrics = collector()
+    metrics.record_attempt(True, 1.5)
+    metrics.record_attempt(False, 0.0)
+    metrics.record_firewall_latency(True, 0.25)
+
+    assert metrics.metrics["total_attempts"] == 2
+    assert metrics.metrics["average_duration"] == 1.5
+    assert metrics.get_success_rate() == 50.0
+    assert not (tmp_path / "metrics.jsonl").exists()
+    assert not (tmp_path / "metrics.json").exists()
+
+    metrics.flush()
+    assert len((tmp_path / "metrics.jsonl").read_bytes().splitlines()) == 3
+
+
+def test_writer_flushes_full_batches_in_background(collector, tmp_path):
+    metrics = collector(batch_size=10)
+    for _ in range(10):
+        metrics.record_attempt(True, 0.1)
+    journal = tmp_path / "metrics.jsonl"
+    assert wait_for(lambda: journal.exists() and len(journal.read_bytes().splitlines()) == 10)
+
+
+def test_compaction_writes_snapshot_and_empties_journal(collector, tmp_path):
+    metrics = collector()
+    for i in range(5):
+        metrics.record_attempt(i % 2 == 0, 2.0)
+    metrics.record_firewall_latency(False, 3.0)
+    metrics.flush()
+    metrics.compact()
+
+    assert not (tmp_path / "metrics.jsonl").exists()
+    snapshot = json.loads((tmp_path / "metrics.json").read_text())
+    assert snapshot["total_attempts"] == 5 and snapshot["successful_connections"] == 3
+    assert snapshot["firewall_latency"]["timeouts"] == 1
+    assert snapshot["journal_generation"] == 1
+
+    metrics.record_attempt(True, 2.0)
+    metrics.flush()
+    reloaded = collector()
+    assert reloaded.export_report()["total_attempts"] == 6
+    assert "journal_generation" not in reloaded.metrics
+
+
+def test_interrupted_compaction_is_neither_lost_nor_counted_twice(collector, tmp_path):
+    metrics = collector()
+    metrics.record_attempt(True, 1.0)
+    metrics.flush()
+    metrics.compact()
+    metrics.record_attempt(True, 1.0)
+    metrics.flush()
+
+    # Corte tras retirar el registro, antes de escribir la instantánea
+    (tmp_path / "metrics.jsonl").rename(tmp_path / "metrics.2.jsonl")
+    assert collector().metrics["total_attempts"] == 2
+
+    # Corte tras escribir la instantánea, antes de borrar el registro retirado
+    metrics.compact()
+    (tmp_path / "metrics.2.jsonl").write_bytes(
+        b'{"timestamp":"x","event":"attempt","success":true,"duration":1.0}\n'
+    )
+    assert collector().metrics["total_attempts"] == 2
+    metrics.compact()
+    assert not (tmp_path / "metrics.2.jsonl").exists()
+
+
+def test_loads_legacy_snapshot(tmp_path, collector):
+    legacy = {
+        "total_attempts": 4,
+        "successful_connections": 1,
+        "failed_attempts": 3,
+        "total_duration": 2.0,
+        "average_duration": 2.0,
+        "last_updated": "2026-01-01T00:00:00",
+    }
+    (tmp_path / "metrics.json").write_text(json.dumps(legacy, indent=2))
+    metrics = collector()
+    metrics.record_attempt(True, 4.0)
+    assert metrics.metrics["average_duration"] == 3.0
+    assert metrics.metrics["firewall_latency"]["samples"] == 0
+
+
+def _record_many(path, count):
+    metrics = MetricsCollector(path, flush_interval=0.01, batch_size=7, compact_bytes=2000)
+    for i in range(count):
+        metrics.record_attempt(i % 3 != 0, 0.5)
+    metrics.close()
+
+
+def test_concurrent_processes_do_not_lose_records(tmp_path):
+    path = str(tmp_path / "metrics.json")
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_record_many, args=(path, 300)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    metrics = MetricsCollector(path)
+    assert metrics.metrics["total_attempts"] == 1200
+    assert metrics.metrics["successful_connections"] == 800
+    metrics.close()
@@ -0,0 +1,112 @@
+import os
+import socket
+import struct
+import time
+
+import pytest
+
+from src.knockd.capture import PacketCapture, build_knock_filter, parse_knock_packet
+from src.server_knock import KnockServer
+
+needs_root = pytest.mark.skipif(
+    not hasattr(socket, "AF_PACKET") or os.geteuid() != 0, reason="requiere AF_PACKET y root"
+)
+
+
+def ipv4(src, dst, proto, payload, options=b""):
+    ihl = (20 + len(options)) // 4
+    header = struct.pack(
+        "!BBHHHBBH4s4s",
+        (4 << 4) | ihl,
+        0,
+        20 + len(options) + len(payload),
+        0,
+        0,
+        64,
+        proto,
+        0,
+        socket.inet_aton(src),
+        socket.inet_aton(dst),
+    )
+    return header + options + payload
+
+
+def tcp(dst_port, flags):
+    return struct.pack("!HHIIBBHHH", 40000, dst_port, 0, 0, 5 << 4, flags, 1024, 0, 0)
+
+
+def parse(packet):
+    buffer = bytearray(96)
+    buffer[: len(packet)] = packet[:96]
+    return parse_knock_packet(memoryview(buffer), min(len(packet), 96))
+
+
+def test_parse_tcp_syn():
+    packet = ipv4("10.1.2.3", "10.0.0.1", socket.IPPROTO_TCP, tcp(7000, 0x02))
+    assert parse(packet) == ("10.1.2.3", 7000, "tcp")
+
+
+def test_parse_honours_ip_options():
+    packet = ipv4("10.1.2.3", "10.0.0.1", socket.IPPROTO_TCP, tcp(7000, 0x02), options=b"\x01" * 8)
+    assert parse(packet) == ("10.1.2.3", 7000, "tcp")
+
+
+def test_parse_ignores_syn_ack_and_ack():
+    for flags in (0x12, 0x10, 0x04):
+        packet = ipv4("10.1.2.3", "10.0.0.1", socket.IPPROTO_TCP, tcp(7000, flags))
+        assert parse(packet) is None
+
+
+def test_parse_udp_and_truncated():
+    udp = struct.pack("!HHHH", 40000, 8000, 8, 0)
+    assert parse(ipv4("10.1.2.3", "10.0.0.1", socket.IPPROTO_UDP, udp)) == ("10.1.2.3", 8000, "udp")
+    assert parse(ipv4("10.1.2.3", "10.0.0.1", socket.IPPROTO_TCP, b"\x00" * 4)) is None
+    assert parse(ipv4("10.1.2.3", "10.0.0.1", socket.IPPROTO_ICMP, b"\x00" * 8)) is None
+
+
+def test_filter_rejects_too_many_ports():
+    assert build_knock_filter([(port, "tcp") for port in range(7000, 7200)])
+    with pytest.raises(ValueError):
+        build_knock_filter([(port, "tcp") for port in range(7000, 7300)])
+
+
+@needs_root
+def test_capture_sees_syns_without_handshake():
+    capture = PacketCapture([(17901, "tcp"), (17902, "udp")], host="127.0.0.1")
+    try:
+        s = socket.socket()
+        # Sin listener: el kernel responde RST, el puerto se ve cerrado
+        assert s.connect_ex(("127.0.0.1", 17901)) != 0
+        s.close()
+        s = socket.socket()
+        s.connect_ex(("127.0.0.1", 17903))
+        s.close()
+        u = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        u.sendto(b"", ("127.0.0.1", 17902))
+        u.close()
+        time.sleep(0.1)
+
+        knocks = []
+        capture.drain(lambda *k: knocks.append(k))
+        assert knocks == [("127.0.0.1", 17901, "tcp"), ("127.0.0.1", 17902, "udp")]
+    finally:
+        capture.close()
+
+
+@needs_root
+def test_capture_engine_completes_sequence(monkeypatch):
+    server = KnockServer([17911, 17912], 1194, override_interval=5, engine="capture")
+    opened = []
+    monkeypatch.setattr(server, "open_vpn_port", lambda *a: opened.append(a[1]))
+    server.start(block=False)
+    try:
+        for port in (17911, 17912):
+            s = socket.socket()
+            s.connect_ex(("127.0.0.1", port))
+            s.close()
+        deadline = time.time() + 2
+        while not opened and time.time() < deadline:
+            time.sleep(0.01)
+        assert opened == ["127.0.0.1"]
+    finally:
+        server.stop()
@@ -1,4 +1,10 @@
+import errno
+import select
+import socket
 import time
+
+import pytest
+
 from src.core.port_knocker import PortKnocker
 
 
@@ -51,3 +57,272 @@ def test_execute_sequence_failure(monkeypatch):
 
     result = pk.execute_sequence("127.0.0.1", [(7000, "tcp")], 0.01, 1194)
     assert result is False
+
+
+def test_readiness_probe_returns_as_soon_as_port_opens(monkeypatch):
+    pk = PortKnocker(verbose=False)
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", lambda s: sleeps.append(s))
+    monkeypatch.setattr(pk, "_knock_port", lambda ip, port, protocol: True)
+
+    # Cerrado al inicio y en los primeros 3 sondeos; abre en el cuarto
+    answers = iter([False, False, False, False, True])
+    monkeypatch.setattr(pk, "_tcp_ping", lambda ip, port, timeout=1: next(answers))
+
+    def no_verify(ip, port):
+        raise AssertionError("no debe usar la verificación fija")
+
+    monkeypatch.setattr(pk, "_verify_port_open", no_verify)
+
+    result = pk.execute_sequence(
+        "127.0.0.1", [(7000, "tcp")], 0.01, 1194, readiness_probe=True, readiness_deadline=5
+    )
+
+    assert result is True
+    # Intervalo del knock y luego backoff exponencial; nunca la espera fija de 5 s
+    assert sleeps == [0.01, 0.02, 0.04, 0.08]
+    assert pk.last_readiness["open"] is True
+    assert pk.last_readiness["probes"] == 4
+
+
+def test_readiness_probe_gives_up_at_deadline(monkeypatch):
+    pk = PortKnocker(verbose=False)
+    monkeypatch.setattr(pk, "_knock_port", lambda ip, port, protocol: True)
+    monkeypatch.setattr(pk, "_tcp_ping", lambda ip, port, timeout=1: False)
+
+    start = time.monotonic()
+    result = pk.execute_sequence(
+        "127.0.0.1", [(7000, "tcp")], 0, 1194, readiness_probe=True, readiness_deadline=0.3
+    )
+
+    assert result is False
+    assert time.monotonic() - start < 1
+    assert pk.last_readiness["open"] is False
+    assert pk.last_readiness["elapsed"] >= 0.3
+
+
+def test_syn_knock_reaches_listener_without_waiting():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+    port = listener.getsockname()[1]
+    pk = PortKnocker(verbose=False, knock_mode="syn", syn_hold_time=10)
+
+    try:
+        assert pk._knock_port("127.0.0.1", port, "tcp") is True
+        # El socket queda pendiente hasta su propio cierre
+        assert len(pk._pending_syns) == 1
+        readable, _, _ = select.select([listener], [], [], 1)
+        assert readable == [listener]
+
+        pk._abort_pending_syns(force=True)
+        assert pk._pending_syns == []
+    finally:
+        listener.close()
+
+
+def test_syn_knock_survives_slow_accept(monkeypatch):
+    # knockd que cuenta el knock en accept(): el último SYN no debe abortarse
+    # antes de que el servidor llegue a aceptarlo
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+    port = listener.getsockname()[1]
+    pk = PortKnocker(verbose=False, knock_mode="syn", syn_hold_time=1.0)
+    monkeypatch.setattr(pk, "_tcp_ping", lambda ip, port, timeout=1: False)
+    accepted = {}
+
+    def slow_server(ip, target_port, deadline):
+        time.sleep(0.1)
+        conn, _ = listener.accept()
+        conn.settimeout(0.2)
+        try:
+            accepted["alive"] = conn.recv(1) != b""
+        except socket.timeout:
+            accepted["alive"] = True
+        except ConnectionResetError:
+            accepted["alive"] = False
+        finally:
+            conn.close()
+        return {"open": True, "elapsed": 0.1, "probes": 1, "latency": 0.1}
+
+    monkeypatch.setattr(pk, "_wait_for_port", slow_server)
+    try:
+        assert pk.execute_sequence("127.0.0.1", [(port, "tcp")], 0.01, 1194, readiness_probe=True)
+    finally:
+        listener.close()
+
+    assert accepted == {"alive": True}
+    assert pk._pending_syns == []
+
+
+def test_syn_knock_cost_independent_of_answer():
+    pk = PortKnocker(verbose=False, knock_mode="syn", syn_hold_time=0)
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    port = closed.getsockname()[1]
+    closed.close()
+
+    start = time.monotonic()
+    for _ in range(20):
+        assert pk._knock_port("127.0.0.1", port, "tcp") is True
+    assert time.monotonic() - start < 0.5
+    pk._abort_pending_syns(force=True)
+
+
+def test_syn_knock_reports_unreachable(monkeypatch):
+    pk = PortKnocker(verbose=False, knock_mode="syn")
+    monkeypatch.setattr(socket.socket, "connect_ex", lambda self, addr: errno.ENETUNREACH)
+
+    assert pk._knock_port("192.0.2.1", 7000, "tcp") is False
+    assert pk._pending_syns == []
+
+
+def test_unknown_knock_mode_rejected():
+    with pytest.raises(ValueError):
+        PortKnocker(knock_mode="raw")
+
+
+def test_concurrent_verify_open_port_reports_latency_percentiles():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+    pk = PortKnocker(verbose=False, verify_mode="concurrent", verify_quorum=2)
+
+    try:
+        result = pk._verify_port_open("127.0.0.1", listener.getsockname()[1])
+    finally:
+        listener.close()
+
+    assert result["open"] is True
+    assert result["success_count"] >= 2
+    latency = result["latency"]
+    assert 0 < latency["min"] <= latency["p50"] <= latency["max"]
+
+
+@pytest.mark.parametrize("verify_mode", ["sequential", "concurrent"])
+@pytest.mark.parametrize("quorum, expected", [(1, True), (2, False)])
+def test_verify_quorum_with_dropped_probes(monkeypatch, verify_mode, quorum, expected):
+    # Un solo sondeo de tres responde: abierto con el quórum por defecto (1)
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+    port = listener.getsockname()[1]
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+    targets = iter([port, closed_port, closed_port])
+    real_connect_ex = socket.socket.connect_ex
+
+    def connect_ex(sock, addr):
+        return real_connect_ex(sock, (addr[0], next(targets)))
+
+    monkeypatch.setattr(socket.socket, "connect_ex", connect_ex)
+    monkeypatch.setattr(time, "sleep", lambda s: None)
+    pk = PortKnocker(verbose=False, verify_mode=verify_mode, verify_quorum=quorum)
+
+    try:
+        result = pk._verify_port_open("127.0.0.1", port)
+    finally:
+        listener.close()
+
+    assert result["open"] is expected
+    assert result["success_count"] == 1
+
+
+def test_verify_quorum_must_be_positive():
+    with pytest.raises(ValueError):
+        PortKnocker(verify_quorum=0)
+
+
+def test_concurrent_verify_closed_port_fails_fast():
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    port = closed.getsockname()[1]
+    closed.close()
+    pk = PortKnocker(verbose=False, verify_mode="concurrent")
+
+    result = pk._verify_port_open("127.0.0.1", port)
+
+    assert result["open"] is False
+    assert result["failure_count"] >= 2
+    assert result["elapsed"] < 0.5
+
+
+def test_concurrent_verify_unanswered_probes_end_at_shared_deadline():
+    # Cola de accept llena: el kernel descarta los SYN y los sondeos no responden
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    fillers = []
+    for _ in range(3):
+        s = socket.socket()
+        s.setblocking(False)
+        s.connect_ex(("127.0.0.1", port))
+        fillers.append(s)
+    time.sleep(0.1)
+    pk = PortKnocker(verbose=False, verify_mode="concurrent")
+
+    try:
+        start = time.monotonic()
+        result = pk._verify_port_concurrent("127.0.0.1", port, attempts=3, timeout=0.3)
+        elapsed = time.monotonic() - start
+    finally:
+        for s in fillers:
+            s.close()
+        listener.close()
+
+    assert result["open"] is False
+    assert result["pending_count"] == 3
+    # Un único timeout, no tres más las pausas entre intentos
+    assert 0.3 <= elapsed < 0.6
+
+
+def test_unknown_verify_mode_rejected():
+    with pytest.raises(ValueError):
+        PortKnocker(verify_mode="parallel")
+
+
+def test_progressive_check_cancels_remaining_knocks(monkeypatch):
+    pk = PortKnocker(verbose=False)
+    knocked = []
+    monkeypatch.setattr(pk, "_knock_port", lambda ip, port, protocol: knocked.append(port) or True)
+    monkeypatch.setattr(pk, "_tcp_ping", lambda ip, port, timeout=1: len(knocked) >= 2)
+    monkeypatch.setattr(pk, "_verify_port_open", lambda ip, port: pytest.fail("no debe verificar"))
+
+    sequence = [(7000 + i, "tcp") for i in range(5)]
+    assert pk.execute_sequence("127.0.0.1", sequence, 0.2, 1194, progressive_check=True)
+    assert knocked == [7000, 7001]
+
+
+def test_progressive_check_slow_probe_does_not_delay_knocks(monkeypatch):
+    pk = PortKnocker(verbose=False)
+    fired = []
+
+    def slow_ping(ip, port, timeout=1):
+        time.sleep(0.3)
+        return False
+
+    monkeypatch.setattr(
+        pk, "_knock_port", lambda ip, port, protocol: fired.append(time.monotonic()) or True
+    )
+    monkeypatch.setattr(pk, "_tcp_ping", slow_ping)
+    monkeypatch.setattr(
+        pk,
+        "_verify_port_open",
+        lambda ip, port: {"open": False, "success_count": 0, "total_attempts": 3, "avg_latency": 0},
+    )
+    real_sleep = time.sleep
+    # Omitir sólo la espera fija del firewall
+    monkeypatch.setattr(time, "sleep", lambda s: real_sleep(s) if s < 1 else None)
+
+    sequence = [(7000 + i, "tcp") for i in range(4)]
+    pk.execute_sequence(
+        "127.0.0.1", sequence, 0.05, 1194, progressive_check=True, precise_timing=True
+    )
+
+    gaps = [b - a for a, b in zip(fired, fired[1:])]
+    assert len(fired) == 4
+    assert max(gaps) < 0.15
@@ -0,0 +1,283 @@
+import selectors
+import socket
+import threading
+import time
+
+import pytest
+
+from src.core.port_knocker import PortKnocker
+from src.network.resolver import Resolver, happy_eyeballs, interleave
+
+
+def fake_getaddrinfo(calls, answers):
+    def getaddrinfo(host, port, family=0, type=0, *args):
+        calls.append(host)
+        if host not in answers:
+            raise socket.gaierror(socket.EAI_NONAME, "no existe")
+        return [
+            (fam, socket.SOCK_STREAM, 6, "", (ip, 0) if fam == socket.AF_INET else (ip, 0, 0, 0))
+            for fam, ip in answers[host]
+        ]
+
+    return getaddrinfo
+
+
+def ipv6_loopback_available():
+    try:
+        s = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        s.bind(("::1", 0))
+        s.close()
+        return True
+    except OSError:
+        return False
+
+
+def test_literals_skip_dns_and_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo(calls, {}))
+    resolver = Resolver()
+
+    assert resolver.resolve("10.0.0.1") == [(socket.AF_INET, "10.0.0.1")]
+    assert resolver.resolve("2001:db8::1") == [(socket.AF_INET6, "2001:db8::1")]
+    assert calls == []
+    assert len(resolver) == 0
+
+
+def test_resolution_is_cached_until_ttl(monkeypatch):
+    calls = []
+    answers = {"vpn.example": [(socket.AF_INET, "192.0.2.10")]}
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo(calls, answers))
+    resolver = Resolver(ttl=0.05)
+
+    assert resolver.resolve("vpn.example") == [(socket.AF_INET, "192.0.2.10")]
+    assert resolver.resolve("vpn.example") == [(socket.AF_INET, "192.0.2.10")]
+    assert resolver.peek("vpn.example") == [(socket.AF_INET, "192.0.2.10")]
+    assert calls == ["vpn.example"]
+
+    time.sleep(0.06)
+    assert resolver.peek("vpn.example") is None
+    resolver.resolve("vpn.example")
+    assert calls == ["vpn.example", "vpn.example"]
+
+
+def test_failures_are_negatively_cached(monkeypatch):
+    calls = []
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo(calls, {}))
+    resolver = Resolver(negative_ttl=60)
+
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            resolver.resolve("no.existe")
+    assert calls == ["no.existe"]
+
+    resolver.invalidate("no.existe")
+    with pytest.raises(socket.gaierror):
+        resolver.resolve("no.existe")
+    assert len(calls) == 2
+
+
+def test_cache_is_bounded(monkeypatch):
+    answers = {f"h{i}": [(socket.AF_INET, f"192.0.2.{i}")] for i in range(5)}
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo([], answers))
+    resolver = Resolver(max_entries=3)
+
+    for host in answers:
+        resolver.resolve(host)
+
+    assert len(resolver) == 3
+    assert resolver.peek("h0") is None
+    assert resolver.peek("h4") is not None
+
+
+def test_aaaa_and_a_records_are_interleaved():
+    v6, v4 = socket.AF_INET6, socket.AF_INET
+    addresses = [(v6, "2001:db8::1"), (v6, "2001:db8::2"), (v4, "192.0.2.1"), (v6, "2001:db8::1")]
+
+    assert interleave(addresses) == [(v6, "2001:db8::1"), (v4, "192.0.2.1"), (v6, "2001:db8::2")]
+
+
+def test_happy_eyeballs_falls_back_when_first_path_is_silent():
+    if not ipv6_loopback_available():
+        pytest.skip("sin IPv6 en loopback")
+    # Primer camino mudo: cola de accept llena, el kernel descarta los SYN
+    silent = socket.socket()
+    silent.bind(("127.0.0.1", 0))
+    silent.listen(0)
+    port = silent.getsockname()[1]
+    fillers = []
+    for _ in range(3):
+        s = socket.socket()
+        s.setblocking(False)
+        s.connect_ex(("127.0.0.1", port))
+        fillers.append(s)
+    open_v6 = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+    open_v6.bind(("::1", port))
+    open_v6.listen(8)
+    time.sleep(0.05)
+
+    try:
+        winner = happy_eyeballs(
+            [(socket.AF_INET, "127.0.0.1"), (socket.AF_INET6, "::1")], port, attempt_delay=0.05
+        )
+    finally:
+        for s in fillers + [silent, open_v6]:
+            s.close()
+
+    assert winner["ip"] == "::1"
+    assert winner["connected"] is True
+    assert 50 <= winner["latency"] < 500
+
+
+def test_happy_eyeballs_refusal_counts_unless_open_required():
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    port = closed.getsockname()[1]
+    closed.close()
+    addresses = [(socket.AF_INET, "127.0.0.1")]
+
+    answered = happy_eyeballs(addresses, port)
+    assert answered["ip"] == "127.0.0.1"
+    assert answered["connected"] is False
+    assert happy_eyeballs(addresses, port, require_open=True) is None
+
+
+def test_port_knocker_resolves_once_per_host(monkeypatch):
+    calls = []
+    answers = {"vpn.example": [(socket.AF_INET, "127.0.0.1")]}
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo(calls, answers))
+    pk = PortKnocker(verbose=False, resolver=Resolver())
+    knocked = []
+    monkeypatch.setattr(pk, "_knock_port", lambda ip, port, protocol: knocked.append(ip) or True)
+    monkeypatch.setattr(pk, "_tcp_ping", lambda ip, port, timeout=1: False)
+    monkeypatch.setattr(
+        pk,
+        "_verify_port_open",
+        lambda ip, port: {"open": True, "success_count": 1, "total_attempts": 1, "avg_latency": 0},
+    )
+    monkeypatch.setattr(time, "sleep", lambda s: None)
+
+    for _ in range(2):
+        assert pk.execute_sequence("vpn.example", [(7000, "tcp"), (8000, "tcp")], 0, 1194)
+
+    assert calls == ["vpn.example"]
+    assert knocked == ["127.0.0.1"] * 4
+    assert pk.last_address == "127.0.0.1"
+
+
+def test_dual_stack_race_only_touches_target_port(monkeypatch):
+    from src.core import port_knocker
+
+    races, pings = [], []
+    winner = {"family": socket.AF_INET, "ip": "192.0.2.1", "connected": False, "latency": 1.0}
+    monkeypatch.setattr(
+        port_knocker,
+        "happy_eyeballs",
+        lambda addresses, port, timeout: races.append((port, timeout)) or winner,
+    )
+    pk = PortKnocker(verbose=False)
+    monkeypatch.setattr(
+        pk, "_tcp_ping", lambda ip, port, timeout=1: pings.append((ip, port)) or False
+    )
+    addresses = [(socket.AF_INET6, "2001:db8::1"), (socket.AF_INET, "192.0.2.1")]
+
+    assert pk._select_path(addresses, 1194) == ("192.0.2.1", False)
+    assert races == [(1194, port_knocker.DEFAULT_HAPPY_EYEBALLS_TIMEOUT)]
+
+    # Ninguna familia contesta (DROP): primera dirección en orden RFC 6724
+    winner = None
+    assert pk._select_path(addresses, 1194) == ("2001:db8::1", False)
+    assert pings == []
+
+
+class StrictKnockd:
+    """knockd estricto: cualquier knock fuera de orden reinicia la secuencia"""
+
+    def __init__(self, sequence, target):
+        self.sequence = sequence
+        self.target = target
+        self.received = []
+        self.progress = 0
+        self.opened = False
+        self.sockets = [listen(family, ip, port) for port in sequence for family, ip in LOOPBACKS]
+        self.selector = selectors.DefaultSelector()
+        for sock in self.sockets:
+            self.selector.register(sock, selectors.EVENT_READ)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            for key, _ in self.selector.select(0.05):
+                conn, _ = key.fileobj.accept()
+                conn.close()
+                self.knock(key.fileobj.getsockname()[1])
+
+    def knock(self, port):
+        self.received.append(port)
+        if port != self.sequence[self.progress]:
+            self.progress = 0
+            return
+        self.progress += 1
+        if self.progress == len(self.sequence):
+            self.progress = 0
+            self.opened = True
+            self.sockets += [listen(family, ip, self.target) for family, ip in LOOPBACKS]
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.selector.close()
+        for sock in self.sockets:
+            sock.close()
+
+
+LOOPBACKS = [(socket.AF_INET6, "::1"), (socket.AF_INET, "127.0.0.1")]
+
+
+def listen(family, ip, port):
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((ip, port))
+    sock.listen(8)
+    return sock
+
+
+def dual_stack_free_ports(count):
+    ports = []
+    while len(ports) < count:
+        probe = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        probe.bind(("::1", 0))
+        port = probe.getsockname()[1]
+        try:
+            listen(socket.AF_INET, "127.0.0.1", port).close()
+        except OSError:
+            continue
+        finally:
+            probe.close()
+        if port not in ports:
+            ports.append(port)
+    return ports
+
+
+def test_dual_stack_sequence_sends_no_extra_knock():
+    if not ipv6_loopback_available():
+        pytest.skip("sin IPv6 en loopback")
+    *knock_ports, target = dual_stack_free_ports(4)
+    knockd = StrictKnockd(knock_ports, target)
+    try:
+        pk = PortKnocker(verbose=False)
+        assert pk.execute_sequence(
+            "localhost",
+            [(port, "tcp") for port in knock_ports],
+            0.05,
+            target,
+            readiness_probe=True,
+            readiness_deadline=2,
+            addresses=LOOPBACKS,
+        )
+    finally:
+        knockd.close()
+
+    assert knockd.received == knock_ports
+    assert knockd.opened
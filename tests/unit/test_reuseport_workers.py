@@ -0,0 +1,152 @@
+import socket
+import time
+
+import pytest
+
+from src.core.port_knocker import PortKnocker
+from src.knockd.workers import ReusePortWorkers, attach_source_steering, reuseport_socket
+from src.server_knock import KnockServer
+
+
+def free_ports(count):
+    socks, ports = [], []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        socks.append(s)
+        ports.append(s.getsockname()[1])
+    for s in socks:
+        s.close()
+    return ports
+
+
+def knock_from(source, port, timeout=1):
+    s = socket.socket()
+    s.settimeout(timeout)
+    try:
+        s.bind((source, 0))
+        s.connect(("127.0.0.1", port))
+    finally:
+        s.close()
+
+
+def connect_from(source, port):
+    knock_from(source, port, timeout=0.3)
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def reuseport_group(port, workers):
+    socks = [reuseport_socket("127.0.0.1", port, "tcp") for _ in range(workers)]
+    try:
+        attach_source_steering(socks[0], workers)
+    except OSError as e:
+        for s in socks:
+            s.close()
+        pytest.skip(f"SO_ATTACH_REUSEPORT_CBPF no disponible: {e}")
+    return socks
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"), reason="requiere SO_REUSEPORT")
+def test_source_ip_always_lands_on_same_socket():
+    (port,) = free_ports(1)
+    socks = reuseport_group(port, 2)
+    try:
+        for s in socks:
+            s.setblocking(False)
+        for source, expected in [("127.0.0.2", 0), ("127.0.0.3", 1), ("127.0.0.4", 0)]:
+            hits = [0, 0]
+            for _ in range(8):
+                knock_from(source, port)
+                for i, s in enumerate(socks):
+                    try:
+                        s.accept()[0].close()
+                        hits[i] += 1
+                    except BlockingIOError:
+                        pass
+            # ip % 2: la misma IP va siempre al mismo socket, sin importar el puerto de origen
+            assert hits[expected] == 8 and hits[1 - expected] == 0
+    finally:
+        for s in socks:
+            s.close()
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"), reason="requiere SO_REUSEPORT")
+def test_workers_keep_per_ip_sequence_state():
+    ports = free_ports(2)
+    groups = {(port, "tcp"): reuseport_group(port, 2) for port in ports}
+    servers = []
+    try:
+        for index in range(2):
+            own = {endpoint: socks[index] for endpoint, socks in groups.items()}
+            server = KnockServer(ports, 1194, override_interval=5, engine="selector", sockets=own)
+            opened = []
+            server.open_vpn_port = lambda policy=None, ip=None, opened=opened: opened.append(ip)
+            server.start(block=False)
+            servers.append((server, opened))
+
+        for source in ["127.0.0.2", "127.0.0.3"]:
+            for port in ports:
+                knock_from(source, port)
+
+        assert wait_for(
+            lambda: sorted(ip for _, o in servers for ip in o) == ["127.0.0.2", "127.0.0.3"]
+        )
+        assert servers[0][1] == ["127.0.0.2"]
+        assert servers[1][1] == ["127.0.0.3"]
+    finally:
+        for server, _ in servers:
+            server.stop()
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"), reason="requiere SO_REUSEPORT")
+def test_workers_protected_port_answers_only_after_valid_knock():
+    *ports, target = free_ports(3)
+    cluster = ReusePortWorkers(
+        lambda sockets: KnockServer(
+            ports, target, override_interval=5, engine="selector", sockets=sockets
+        ),
+        workers=2,
+    )
+    cluster.bind()
+    if not cluster.steering:
+        cluster.close()
+        pytest.skip("SO_ATTACH_REUSEPORT_CBPF no disponible")
+    servers = [cluster.make_server(own) for own in cluster.sockets]
+    knocker = PortKnocker(verbose=False)
+    try:
+        for server in servers:
+            server.start(block=False)
+
+        # Secuencia incorrecta: el puerto protegido escucha pero no completa el handshake
+        for port in reversed(ports):
+            knock_from("127.0.0.2", port)
+        time.sleep(0.1)
+        assert not any(server.grants for server in servers)
+        with pytest.raises(socket.timeout):
+            connect_from("127.0.0.2", target)
+        assert not knocker._tcp_ping("127.0.0.1", target, timeout=0.2)
+
+        # Secuencia correcta desde otra IP: sólo ésa pasa
+        for port in ports:
+            knock_from("127.0.0.3", port)
+        assert wait_for(lambda: any(server.grants for server in servers))
+        connect_from("127.0.0.3", target)
+        with pytest.raises(socket.timeout):
+            connect_from("127.0.0.2", target)
+    finally:
+        for server in servers:
+            server.stop()
+        cluster.close()
+
+
+def test_inherited_sockets_require_selector_engine():
+    with pytest.raises(ValueError):
+        KnockServer([7000], 1194, sockets={(7000, "tcp"): None})
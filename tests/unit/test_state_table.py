@@ -0,0 +1,65 @@
+import pytest
+
+from src.knockd.state_table import SourceStateTable
+
+
+def test_put_and_get():
+    table = SourceStateTable(capacity=10, ttl=5)
+    table.put("10.0.0.1", 3, now=100.0)
+
+    entry = table.get("10.0.0.1")
+    assert entry.state == 3
+    assert entry.last_seen == 100.0
+    assert table.state_of("10.0.0.2") == 0
+
+
+def test_zero_state_releases_entry():
+    table = SourceStateTable(capacity=10, ttl=5)
+    table.put("10.0.0.1", 2, now=1.0)
+    table.put("10.0.0.1", 0, now=2.0)
+
+    assert "10.0.0.1" not in table
+    assert len(table) == 0
+
+
+def test_capacity_evicts_least_recently_used():
+    table = SourceStateTable(capacity=3, ttl=60)
+    for i, ip in enumerate(["a", "b", "c"]):
+        table.put(ip, 1, now=float(i))
+
+    # "a" vuelve a usarse: el menos reciente pasa a ser "b"
+    table.put("a", 2, now=3.0)
+    table.put("d", 1, now=4.0)
+
+    assert "b" not in table
+    assert all(ip in table for ip in ["a", "c", "d"])
+    assert table.stats()["evictions"] == 1
+
+
+def test_flood_stays_within_capacity():
+    table = SourceStateTable(capacity=1000, ttl=60)
+    for i in range(50_000):
+        table.put(f"ip-{i}", 1, now=float(i) / 1000)
+
+    stats = table.stats()
+    assert stats["size"] == 1000
+    assert stats["evictions"] == 49_000
+
+
+def test_ttl_expiration():
+    table = SourceStateTable(capacity=100, ttl=5)
+    table.put("a", 1, now=0.0)
+    table.put("b", 1, now=3.0)
+
+    assert table.expire(now=6.0) == 1
+    assert "a" not in table and "b" in table
+
+    # Las escrituras también barren entradas vencidas del frente
+    table.put("c", 1, now=20.0)
+    assert "b" not in table
+    assert table.stats()["expirations"] == 2
+
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        SourceStateTable(capacity=0)
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from src.knockd.timer_wheel import TimerWheel
+
+
+def test_fires_in_deadline_order():
+    wheel = TimerWheel(tick=1, slots=8, levels=2, now=0.0)
+    fired = []
+    for deadline in [5, 2, 9]:
+        wheel.schedule(deadline, fired.append, deadline)
+
+    assert wheel.advance(now=4.0) == 1
+    assert fired == [2]
+    wheel.advance(now=10.0)
+    assert fired == [2, 5, 9]
+    assert len(wheel) == 0
+
+
+def test_cancel_removes_timer():
+    wheel = TimerWheel(tick=1, slots=8, levels=2, now=0.0)
+    fired = []
+    timer = wheel.schedule(3, fired.append, "x")
+    assert timer.active
+
+    timer.cancel()
+    timer.cancel()
+
+    assert not timer.active
+    assert len(wheel) == 0
+    wheel.advance(now=10.0)
+    assert fired == []
+
+
+def test_cascade_and_overflow_match_brute_force():
+    # 4 casilleros x 2 niveles = 16 ticks; lo demás pasa por el overflow
+    rng = random.Random(7)
+    wheel = TimerWheel(tick=1, slots=4, levels=2, now=0.0)
+    clock = [0.0]
+    fired = []
+    expected = []
+    for _ in range(300):
+        deadline = clock[0] + rng.uniform(0, 60)
+        wheel.schedule(deadline, lambda d: fired.append((d, clock[0])), deadline)
+        expected.append(deadline)
+        clock[0] += rng.uniform(0, 2)
+        wheel.advance(now=clock[0])
+    last_step = clock[0]
+    clock[0] += 100
+    wheel.advance(now=clock[0])
+
+    assert sorted(d for d, _ in fired) == sorted(expected)
+    # Nunca antes de tiempo; a lo sumo un tick más un paso del reloj tarde
+    assert all(d <= at for d, at in fired)
+    assert all(at - d <= 3 for d, at in fired if at <= last_step)
+
+
+def test_past_deadline_fires_on_next_tick():
+    wheel = TimerWheel(tick=0.5, now=10.0)
+    fired = []
+    wheel.advance(now=20.0)
+    wheel.schedule(12.0, fired.append, "late")
+
+    assert wheel.time_until_next_tick(now=20.0) == pytest.approx(0.5)
+    wheel.advance(now=20.5)
+    assert fired == ["late"]
+    assert wheel.time_until_next_tick() is None
+
+
+def test_callback_error_does_not_stop_wheel():
+    wheel = TimerWheel(tick=1, now=0.0)
+    fired = []
+    wheel.schedule(1, lambda: 1 / 0)
+    wheel.schedule(1, fired.append, "ok")
+
+    assert wheel.advance(now=2.0) == 2
+    assert fired == ["ok"]
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        TimerWheel(tick=0)
@@ -0,0 +1,85 @@
+import socket
+import threading
+
+from src.core.port_knocker import PortKnocker
+from src.network.udp_pool import UDPSocketPool
+
+
+def udp_listener(family=socket.AF_INET, host="127.0.0.1"):
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.bind((host, 0))
+    sock.settimeout(1)
+    return sock
+
+
+def test_pool_reuses_one_socket_per_family():
+    listener = udp_listener()
+    port = listener.getsockname()[1]
+    with UDPSocketPool() as pool:
+        sock = pool.socket_for(socket.AF_INET)
+        pool.send("127.0.0.1", port)
+        pool.send("127.0.0.1", port, "hola")
+
+        assert pool.socket_for(socket.AF_INET) is sock
+        assert len(pool) == 1
+        assert listener.recv(64) == b""
+        assert listener.recv(64) == b"hola"
+    assert len(pool) == 0
+    listener.close()
+
+
+def test_pool_sends_ipv6_on_its_own_socket():
+    if not socket.has_ipv6:
+        return
+    try:
+        listener = udp_listener(socket.AF_INET6, "::1")
+    except OSError:
+        return
+    port = listener.getsockname()[1]
+    with UDPSocketPool() as pool:
+        pool.send("::1", port, b"\x01\x02")
+        pool.send("127.0.0.1", port)
+
+        assert len(pool) == 2
+        assert listener.recv(64) == b"\x01\x02"
+    listener.close()
+
+
+def test_send_burst_counts_datagrams():
+    listener = udp_listener()
+    port = listener.getsockname()[1]
+    with UDPSocketPool() as pool:
+        assert pool.send_burst([("127.0.0.1", port, str(i)) for i in range(5)]) == 5
+
+    assert [listener.recv(64) for _ in range(5)] == [b"0", b"1", b"2", b"3", b"4"]
+    listener.close()
+
+
+def test_pool_creates_socket_once_across_threads():
+    with UDPSocketPool() as pool:
+        seen = []
+        threads = [
+            threading.Thread(target=lambda: seen.append(pool.socket_for(socket.AF_INET)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len({id(s) for s in seen}) == 1
+
+
+def test_port_knocker_udp_knock_with_payload_uses_pool():
+    listener = udp_listener()
+    port = listener.getsockname()[1]
+    with UDPSocketPool() as pool:
+        pk = PortKnocker(verbose=False, udp_pool=pool)
+
+        assert pk._knock_port("127.0.0.1", port, "udp", b"secreto") is True
+        assert pk._knock_port("127.0.0.1", port, "udp") is True
+        assert len(pool) == 1
+
+    assert listener.recv(64) == b"secreto"
+    assert listener.recv(64) == b""
+    listener.close()
@@ -72,3 +72,9 @@ class TestConfigValidator:
         assert ConfigValidator.validate_port(70000) is False
         assert ConfigValidator.validate_port("80") is True
         assert ConfigValidator.validate_port("invalid") is False
+
+    def test_knock_sequence_udp_payload(self):
+        """Test de knock UDP con payload (sólo UDP, sólo texto)"""
+        assert ConfigValidator.validate_knock_sequence([[7000, "tcp"], [8000, "udp", "abc"]])
+        assert not ConfigValidator.validate_knock_sequence([[7000, "tcp", "abc"]])
+        assert not ConfigValidator.validate_knock_sequence([[8000, "udp", 5]])